@@ -4,86 +4,103 @@
 import streamlit as st
 st.set_page_config(page_title="EV Charging Monitor", layout="wide")
 
-from geopy.distance import geodesic
-from charging_map import render_station_map, load_real_stations
-from streamlit_folium import st_folium
-from geopy.geocoders import Nominatim
-from typing import Optional, Tuple, cast
-from geopy.location import Location
-import pandas as pd
 import os
-import json
-import streamlit.components.v1 as components
+import time
+import spans
+from spans import span
+
+# Debug panel (DEBUG_PANEL=1 in the server's environment; never from the URL,
+# since it profiles the process and writes span files): stage timings of each
+# rerun, with optional cProfile / tracemalloc capture. Started before the
+# other imports so the first rerun's profile includes them.
+DEBUG_PANEL = os.environ.get("DEBUG_PANEL") == "1"
+rerun_trace = None
+if DEBUG_PANEL:
+    # a rerun interrupted by the next one never reached stop()
+    previous = st.session_state.pop("debug_trace", None)
+    if previous is not None:
+        previous.stop()
+    if st.session_state.get("debug_spans", True):
+        rerun_trace = spans.Trace("rerun", profile=st.session_state.get("debug_profile", False),
+                                  memory=st.session_state.get("debug_memory", False)).start()
+        st.session_state.debug_trace = rerun_trace
+
+from data_cache import (
+    load_cluster_index,
+    load_geocoder,
+    load_search_index,
+    load_session_filter,
+    load_sessions_csv,
+    load_sessions_store,
+    live_status_poller,
+    load_live_station_table,
+    load_station_index,
+    session_rollups,
+    station_distances,
+)
+from session_store import session_date_bounds, store_exists
+from session_export import EXPORT_FORMATS, MAX_DOWNLOAD_BYTES, export_frame
+from live_ingest import CsvLogTail, StoreTail
+from route_panner import MIN_SOC, plan_route
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+# folium, streamlit_folium and the map modules (about a second of imports) are
+# imported where the maps are drawn, after the session table and stats are up
 
 st.title("EV Charging Monitor - San Francisco")
 
-# ----------------------------
-# Load station data
-# ----------------------------
-with open("data/ev_api_results.json") as f:
-    station_data = json.load(f)
+LIVE_REFRESH_SECONDS = 5
+MAX_SESSION_BARS = 500
+MAX_CHART_POINTS = 500
+# Above this many matching stations the map is clustered server-side per viewport
+VIEWPORT_MAP_MIN_STATIONS = 2000
+SF_CENTER = (37.7749, -122.4194)
 
 # ----------------------------
-# Normalize station data for consistency across JSON versions
-# ----------------------------    
-def normalize_stations(stations):
-    for s in stations:
-        # cannonical id/title/coords keys
-        s["station_id"] = (
-            s.get("station_id")
-            or s.get("id") 
-            or s.get("stationId") 
-            or s.get("station_id_str")
-            or str(s.get("id", "") or "")
-        )
-        s["title"] = (
-            s.get("title") 
-            or s.get("station_name") 
-            or s.get("name") 
-            or s.get("title_name") 
-            or "Unknown Station"
-        )
-
-        # latitude/longitude: try common variants, coerce to float or None
-        lat = s.get("latitude") or s.get("lat") or s.get("y") or s.get("Latitude")
-        lon = s.get("longitude") or s.get("lng") or s.get("lon") or s.get("x") or s.get("Longitude")
-        try:
-            s["latitude"] = float(lat) if lat not in (None, "", "NaN") else None
-            s["longitude"] = float(lon) if lon not in (None, "", "NaN") else None
-        except Exception:
-            s["latitude"] = None
-            s["longitude"] = None
-
-    return stations
+# Load station data (normalized once into a columnar table; data_cache keeps
+# it across reruns and reloads when the JSON file changes). With
+# STATION_STATUS_SOURCE set, availability comes from the background status
+# poller's live table.
+# ----------------------------
+with span("load.stations"):
+    stations = load_live_station_table()
+    status_poller = live_status_poller()
 
-station_data = normalize_stations(station_data)    
+    # Spatial index for map-click and "near me" lookups (positions index the table)
+    station_index = load_station_index()
 
 # Extract unique charger levels
-all_levels = sorted(set(
-    level for station in station_data
-    for level in station.get("charger_levels", [])
-))
+all_levels = stations.all_levels()
 level_map = {1: "Level 1", 2: "Level 2", 3: "Level 3"}
 level_options = [level_map.get(lvl, f"Level {lvl}") for lvl in all_levels]
 
 # ----------------------------
 # Load session data
 # ----------------------------
-def load_data(csv_path="data/charging_log.csv"):
+def load_data(csv_path="data/charging_log.csv", station_ids=None, start=None, end=None):
+    # Parquet store (after `python session_store.py migrate`) pushes the
+    # station/date filters down to the files; otherwise read the CSV log
+    if store_exists():
+        return load_sessions_store(station_ids=station_ids, start=start, end=end)
     if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path, parse_dates=["start_time"])
-        return df
+        return load_sessions_csv(csv_path)
     else:
         st.warning("No session data found. Run the simulator first")
         return pd.DataFrame()
-    
-data = load_data()
 
-if not data.empty:
-    min_date = data["start_time"].min().date()
-    max_date = data["start_time"].max().date()
-else:
-    min_date = max_date = None
+with span("load.sessions"):
+    if store_exists():
+        # Sessions are read later with filters applied; bounds come from partition names
+        data = None
+        min_date, max_date = session_date_bounds()
+    else:
+        data = load_data()
+        if not data.empty:
+            min_date = data["start_time"].min().date()
+            max_date = data["start_time"].max().date()
+        else:
+            min_date = max_date = None
 
 # ----------------------------
 #  Initialize session state defaults BEFORE creating widgets
@@ -146,35 +163,26 @@ with st.sidebar:
     st.markdown("---")
     st.subheader("Location (for distance)")
     default_location = "Mission Dolores Park, San Francisco"
-    geolocator = Nominatim(user_agent="ev-charging-monitor")
+    # Local gazetteer + shared SQLite cache; the network is only a fallback
+    # when GEOCODE_NETWORK is set
+    geocoder = load_geocoder()
 
     user_input_location = st.text_input("Enter your location (address or landmark):", default_location)
 
-    # cached safe geocode to avoid repeated network calls during dev
-    @st.cache_data(ttl=60 * 60 * 24)
     def cache_geocode(query: str, fallback: str = default_location) -> Optional[Tuple[float, float]]:
-        try:
-            loc = geolocator.geocode(query)
-            if loc:
-                loc = cast(Location, loc)
-                return (float(loc.latitude), float(loc.longitude))
-        except Exception:
-            pass
-        try:
-            loc = geolocator.geocode(fallback)
-            if loc:
-                loc = cast(Location, loc)
-                return (float(loc.latitude), float(loc.longitude))
-        except Exception:
-            pass
-        return None
-        
-
-    user_coords = cache_geocode(user_input_location)
+        return geocoder.geocode(query) or geocoder.geocode(fallback)
+
+    with span("geocode"):
+        user_coords = cache_geocode(user_input_location)
     if user_coords is None:
-        st.sidebar.error("Location lookup failed. (or rate-limited). Using a generic SF center.")
+        st.sidebar.error("Location lookup failed. Using a generic SF center.")
         user_coords = (37.7749, -122.4194)
 
+    # Closest stations to the user straight from the spatial index
+    st.caption("Nearest to you:")
+    for pos, miles in station_index.k_nearest(*user_coords, k=3):
+        st.caption(f"{stations.title[pos]} - {miles:.2f} mi")
+
     st.markdown("---")
     # Distance sort toggle (single widget)
     distance_sort_order = st.radio(
@@ -186,33 +194,34 @@ with st.sidebar:
     # Reset button
     st.button("Reset Filters", on_click=reset_filters)
 
+    # Live view: follows the session log instead of reloading it
+    st.markdown("---")
+    live_updates = st.checkbox("Live session feed (auto-refresh)", key="live_updates")
+    if status_poller is not None:
+        age = time.time() - status_poller.table.updated if status_poller.table.updated else None
+        st.caption(f"Live status: {len(status_poller.table)} stations"
+                   + (f", updated {age:.0f}s ago" if age is not None else ", waiting for the first poll")
+                   + (f" ({status_poller.errors} failed requests)" if status_poller.errors else ""))
+
 # ----------------------------
 # Compute distance in miles for popups & sorting (after user_coords available)
 # ----------------------------
-for s in station_data:
-    lat = s.get("latitude")
-    lon = s.get("longitude")
-    if lat is not None and lon is not None:
-        try:
-            s["distance_miles"] = round(geodesic(user_coords, (lat, lon)).miles, 2)
-        except Exception:
-            s["distance_miles"] = float("inf")
-    else:
-        s["distance_miles"] = float("inf")
+with span("distances", stations=len(stations)):
+    stations = stations.with_distances(station_distances(user_coords))
 
 # ----------------------------
 # Show sidebar station list (sorted by distance order)
 # ----------------------------
 st.sidebar.subheader("Charging Stations")
 reverse = distance_sort_order == "Farthest first"
-sorted_stations = sorted(station_data, key=lambda x: x.get("distance_miles", float("inf")), reverse=reverse)
-for s in sorted_stations:
-    name = s.get("title", "Unknown Station")
-    dist = s.get("distance_miles", float("inf"))
-    if dist is None or dist == float("inf"):
-        st.sidebar.write(f"{name}")
-    else:
-        st.sidebar.write(f"{name} - {dist:.2f} mi")
+with span("sidebar.station_list"):
+    for i in stations.sort_order("Distance", reverse=reverse):
+        name = stations.title[i]
+        dist = stations.distance_miles[i]
+        if not np.isfinite(dist):
+            st.sidebar.write(f"{name}")
+        else:
+            st.sidebar.write(f"{name} - {dist:.2f} mi")
 
 # ----------------------------
 # Map selected level labels back to numeric codes
@@ -222,137 +231,325 @@ labels = st.session_state.get("selected_levels_label", [])
 selected_levels = [num for num, label in level_map.items() if label in labels]
 
 # ----------------------------
-# Apply Search Filter to stations (for map)
+# Apply Search Filter to stations (prebuilt index over titles, addresses and
+# operators; typo-tolerant). The result's mask drives the map, its id set the
+# session filters.
 # ----------------------------
-filtered_station_data = station_data
 search_query = st.session_state.get("search_query", "").strip()
-
-if search_query:
-    filtered_station_data = [
-        station for station in station_data 
-        if search_query.lower() in station.get("title", "").lower()
-    ]
-if not filtered_station_data:
+with span("search", query=search_query) as search_span:
+    search_result = load_search_index().search(search_query)
+    search_span.set(matches=len(search_result))
+search_mask = search_result.mask
+# An empty query filters nothing, so the session loads and rollups get no id list
+search_ids = search_result.station_ids if search_query else None
+filtered_stations = stations.take(search_mask)
+
+if not len(filtered_stations):
     st.warning(f"No stations found matching '{search_query}'.")
                 
 # ----------------------------
-# Visual Layout (Map)
+# Visual Layout (Map): the slot keeps the map's place on the page, but it is
+# drawn last, by a fragment. Pans, zooms and clicks rerun only the fragment; a
+# click that selects a station reruns the app so the session table follows.
 # ----------------------------
 st.subheader("Charging Station Map (San Francisco)")
-map_ = render_station_map(
-    filtered_station_data, 
-    charger_level_filter=selected_levels, 
-    sort_by=st.session_state.get("sort_option", "Distance"),
-)
-returned = st_folium(map_, width=900, height=700, returned_objects=["last_clicked"])
-
-# returned last click --> find nearest station and set session_state selected_station
-click = returned.get("last_clicked")
-if click and click.get("lat") is not None and click.get("lng") is not None:
-    clicked_lat = click["lat"]
-    clicked_lng = click["lng"]
-
-    # find nearest station to clicked coords
-    def find_nearest_station_id(lat, lng, stations):
-        best = None
-        best_d = float("inf")
-        for stn in stations:
-            lat2 = stn.get("latitude")
-            lon2 = stn.get("longitude")
-            if lat2 is None or lon2 is None:
-                continue
-            try:
-                d = geodesic((lat, lng), (lat2, lon2)).miles
-            except Exception:
-                continue
-            if d < best_d:
-                best = stn
-                best_d = d
-        return best.get("station_id") if best else None
-            
-    nearest_id = find_nearest_station_id(clicked_lat, clicked_lng, filtered_station_data)
-    if nearest_id:
-        # set session_state so the table updates
-        st.session_state.selected_station = nearest_id
+map_slot = st.container()
+
+# With live status on, the map also redraws itself every poll interval
+@st.fragment(run_every=status_poller.interval if status_poller is not None else None)
+def station_map(stations, search_mask, selected_levels, sort_by):
+    from map_clusters import render_viewport_map, station_ranks, viewport_bounds
+    from map_layers import show_station_map, station_marker_layer
+
+    # Statuses polled since the script run that passed `stations` in
+    live = load_live_station_table()
+    if live.availability is not stations.availability and len(live) == len(stations):
+        stations = stations.with_availability(live.availability)
+
+    selected = st.session_state.get("selected_station", "ALL")
+    visible = search_mask & stations.level_filter_mask(selected_levels)
+    if int(search_mask.sum()) < VIEWPORT_MAP_MIN_STATIONS:
+        # Fixed base map + cached station layer: filter changes re-render only the
+        # markers that became visible, sort changes only send new popup ranks
+        with span("map.layer"):
+            layer = station_marker_layer(stations, visible, station_ranks(stations, sort_by, search_mask))
+        with span("map.st_folium", markers=layer.count):
+            returned = show_station_map(layer, width=900, height=700, returned_objects=["last_clicked"])
+    else:
+        from streamlit_folium import st_folium
+
+        # Large catalogues: only the clusters/markers inside the last reported
+        # viewport are sent, and only the clicked station gets a popup
+        view = st.session_state.get("station_map") or {}
+        center = view.get("center") or {}
+        map_center = (center.get("lat", SF_CENTER[0]), center.get("lng", SF_CENTER[1]))
+        map_zoom = view.get("zoom") or 12
+        map_bounds = view.get("bounds") or viewport_bounds(map_center, map_zoom)
+        clusters = load_cluster_index().query(map_zoom, map_bounds, mask=visible)
+
+        # A click on a marker drawn last run: zoom into a cluster, or open a station's popup
+        clicked = view.get("last_object_clicked")
+        last = st.session_state.get("map_clusters")
+        if clicked and clicked != st.session_state.get("map_handled_click") and last is not None:
+            st.session_state.map_handled_click = clicked
+            hit = last.hit(clicked["lat"], clicked["lng"])
+            if hit is not None and last.position[hit] < 0:
+                map_center, map_zoom = (clicked["lat"], clicked["lng"]), min(map_zoom + 2, 18)
+                clusters = load_cluster_index().query(map_zoom, viewport_bounds(map_center, map_zoom), mask=visible)
+            elif hit is not None:
+                st.session_state.map_popup = int(last.position[hit])
+                st.session_state.selected_station = stations.id_at(int(last.position[hit]))
+        st.session_state.map_clusters = clusters
+
+        with span("map.viewport", clusters=len(clusters.position)):
+            ranks = station_ranks(stations, sort_by, search_mask)
+            map_ = render_viewport_map(stations, clusters, ranks, map_center, map_zoom,
+                                       popup_position=st.session_state.get("map_popup"))
+        with span("map.st_folium"):
+            returned = st_folium(map_, width=900, height=700, center=map_center, zoom=map_zoom, key="station_map",
+                                 returned_objects=["last_clicked", "last_object_clicked", "bounds", "zoom", "center"])
+
+    # returned last click --> find nearest station and set session_state selected_station
+    click = returned.get("last_clicked")
+    if (click and click.get("lat") is not None and click.get("lng") is not None
+            and click != st.session_state.get("map_handled_last_click")):
+        st.session_state.map_handled_last_click = click
+
+        # find nearest visible station to clicked coords
+        hit = station_index.nearest(click["lat"], click["lng"], mask=search_mask)
+        nearest_id = stations.id_at(hit[0]) if hit else None
+        if nearest_id:
+            st.session_state.selected_station = nearest_id
+
+    if st.session_state.get("selected_station", "ALL") != selected:
+        # the session table and stats live outside this fragment
+        st.rerun()
 
 # ----------------------------
-# Charging Session Log Table (robust pipeline)
+# Live session feed (only newly appended rows are parsed on each refresh)
 # ----------------------------
-df = data.copy()
-
-# filter by search query station titles (if present)
-search_query = st.session_state.get("search_query", "").strip()
-if search_query:
-    matching_ids = {s["station_id"] for s in station_data if search_query.lower() in s.get("title", "").lower()}
-    df = df[df["station_id"].isin(matching_ids)]
-
-# filter to stations currently visible on the map
-visible_ids = {s["station_id"] for s in filtered_station_data}
-df = df[df["station_id"].isin(visible_ids)]
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_session_feed():
+    if "log_tail" not in st.session_state:
+        st.session_state.log_tail = StoreTail() if store_exists() else CsvLogTail()
+    tail = st.session_state.log_tail
+    with span("live.poll"):
+        for _ in tail.batches():
+            pass  # each batch is folded into the tail's totals and recent rows
+
+    st.subheader("Live Session Feed")
+    totals = tail.totals
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Sessions Logged", totals.sessions)
+    col2.metric("Energy (kWh)", f"{totals.sums['energy_kwh']:.2f}")
+    col3.metric("Cost (USD)", f"${totals.sums['cost_usd']:.2f}")
+    st.dataframe(tail.tail(10))
 
-# if a single station selected (map click), filter down
-sel = st.session_state.get("selected_station", "ALL")
-if sel != "ALL":
-    df = df[df["station_id"] == sel]
+if live_updates:
+    live_session_feed()
 
-# apply date filter (if both provided)
+# ----------------------------
+# Charging Session Log Table (robust pipeline)
+# ----------------------------
+# date range (if both provided)
+sd = ed = None
 dr = st.session_state.get("date_range")
 if isinstance(dr, tuple) and len(dr) == 2:
     sd, ed = dr
-    if sd and ed:
-        df = df[(df["start_time"].dt.date >= sd) & (df["start_time"].dt.date <= ed)]
 
-# attach distance_miles to sessions for sorting
-dist_map = {s["station_id"]: s.get("distance_miles", float("inf")) for s in station_data}
-if not df.empty:
-    df["distance_miles"] = df["station_id"].map(dist_map)
-
-# session-table sorting to mirror map sort
-sort_choice = st.session_state.get("sort_option", "Distance")
-if sort_choice == "Distance" and "distance_miles" in df.columns:
-    df = df.sort_values("distance_miles")
-elif sort_choice == "Availability" and "availability" in df.columns:
-    df = df.sort_values("availability")
-elif sort_choice == "Charger Level" and "charger_level" in df.columns:
-    df = df.sort_values("charger_level")
+# One combined mask over the prepared session columns (search matches, the
+# clicked station, the date range), then a single take in display order
+sel = st.session_state.get("selected_station", "ALL")
+if data is None or not data.empty:
+    with span("sessions.prepare"):
+        sessions = load_session_filter(station_ids=search_ids, start=sd, end=ed)
+    with span("sessions.filter", sessions=len(sessions)) as filter_span:
+        df = sessions.select(
+            station_mask=search_mask if search_query else None,
+            station=None if sel == "ALL" else sel,
+            start=sd if sd and ed else None,
+            end=ed if sd and ed else None,
+            sort_by=st.session_state.get("sort_option", "Distance"),
+            distances=stations.distance_miles,
+        )
+        filter_span.set(rows=len(df))
+else:
+    df = data
+
+# Export: the file is written chunk by chunk only when requested, and
+# offered for download while the filters that produced it are unchanged. A
+# fragment, so choosing a format or preparing a file reruns only this. The
+# download button holds the file in memory, so exports over
+# MAX_DOWNLOAD_BYTES are left on disk with a pointer to the CLI instead.
+@st.fragment
+def export_controls(df, filters_key):
+    fmt_col, prep_col, dl_col = st.columns([2, 1, 1])
+    export_fmt = fmt_col.selectbox("Export format", list(EXPORT_FORMATS), key="export_format")
+    export_key = (*filters_key, export_fmt)
+    if prep_col.button("Prepare download"):
+        with st.spinner(f"Exporting {len(df):,} sessions..."), span("sessions.export", rows=len(df), format=export_fmt):
+            st.session_state["export"] = (export_key, *export_frame(df, export_fmt))
+    export = st.session_state.get("export")
+    if export and export[0] == export_key and os.path.exists(export[1]):
+        _, export_path, export_name, export_mime = export
+        size = os.path.getsize(export_path)
+        if size > MAX_DOWNLOAD_BYTES:
+            st.info(f"The export is {size / 2**20:,.0f} MB, too large to download here. It was written to "
+                    f"`{export_path}`; for the full log use `python session_export.py --format {export_fmt}`.")
+        else:
+            with open(export_path, "rb") as f:
+                dl_col.download_button(label="Download", data=f, file_name=export_name, mime=export_mime,
+                                       on_click="ignore")
 
 # Display sessions
 if df.empty:
     st.warning("No matching sessions for the selected stations/filters. Please try adjusting your filters.")
 else:    
     st.subheader("Charging Session Log")
-    st.dataframe(df.drop(columns=["distance_miles"], errors="ignore"))
+    with span("sessions.table", rows=len(df)):
+        st.dataframe(df)
+
+    export_controls(df, (search_query, sel, sd, ed, st.session_state.get("sort_option", "Distance"), len(df)))
 
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(label="Download CSV", data=csv, file_name="charging_sessions_filtered.csv", mime="text/csv")
+    # Summary stats (answered from the session rollups, not the filtered frame)
+    sel_ids = search_ids
+    if sel != "ALL":
+        sel_ids = [sel] if sel_ids is None else [sid for sid in sel_ids if sid == sel]
+    with span("sessions.rollups"):
+        rollups = session_rollups()
+        totals = rollups.totals(station_ids=sel_ids, start=sd, end=ed)
 
-    # Summary stats
     st.subheader("Charging Stats")
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Sessions", len(df))
-    col2.metric("Total Energy (kWh)", f"{df['energy_kwh'].sum():.2f}")
-    col3.metric("Total Cost (USD)", f"${df['cost_usd'].sum():.2f}")
-
-    # Charts
-    st.subheader("Energy Usage per Session")
-    st.bar_chart(df.set_index("session_id")["energy_kwh"])
-    st.subheader("Session Duration (minutes)")
-    st.bar_chart(df.set_index("session_id")["duration_min"])
-    st.subheader("Cost per Session (USD)")
-    st.bar_chart(df.set_index("session_id")["cost_usd"])
+    col1.metric("Total Sessions", totals["count"])
+    col2.metric("Total Energy (kWh)", f"{totals['energy_kwh']:.2f}")
+    col3.metric("Total Cost (USD)", f"${totals['cost_usd']:.2f}")
+    st.caption(
+        f"Median session: {totals['energy_kwh_p50']:.1f} kWh, "
+        f"{totals['duration_min_p50']:.0f} min, ${totals['cost_usd_p50']:.2f}"
+    )
+
+# Station map, now that the table and stats are on the page
+with map_slot:
+    station_map(stations, search_mask, selected_levels, st.session_state.get("sort_option", "Distance"))
+
+# Charts: one bar per session while that stays readable, otherwise
+# downsampled time series from the rollups
+if not df.empty:
+    with span("sessions.charts", rows=len(df)):
+        if len(df) <= MAX_SESSION_BARS:
+            st.subheader("Energy Usage per Session")
+            st.bar_chart(df.set_index("session_id")["energy_kwh"])
+            st.subheader("Session Duration (minutes)")
+            st.bar_chart(df.set_index("session_id")["duration_min"])
+            st.subheader("Cost per Session (USD)")
+            st.bar_chart(df.set_index("session_id")["cost_usd"])
+        else:
+            series = rollups.time_series(max_points=MAX_CHART_POINTS, station_ids=sel_ids, start=sd, end=ed)
+            st.subheader("Energy Usage over Time (kWh)")
+            st.bar_chart(series["energy_kwh"])
+            st.subheader("Session Duration over Time (minutes)")
+            st.bar_chart(series["duration_min"])
+            st.subheader("Cost over Time (USD)")
+            st.bar_chart(series["cost_usd"])
 
 # ----------------------------
-# Coming Soon: Route Planner
+# Route Planner (offline: corridor stations from the spatial index + A* over
+# charge stops). A fragment: planning a route reruns only this section.
 # ----------------------------
 st.markdown("---")
-st.subheader("Coming Soon: Route Planner")
-st.markdown(
-    """"
-    Imagine entering your destination and getting:
-    - Nearby charging stations along your route
-    - Estimated cost and time to charge
-    - Smart recommendations based on battery % and station availability
-
-    Actively building this next - stay tuned!
-    """
-)
\ No newline at end of file
+st.subheader("Route Planner")
+
+@st.fragment
+def route_planner(stations, origin, level_mask):
+    with st.form("route_form"):
+        col1, col2 = st.columns(2)
+        route_origin = col1.text_input("From", origin)
+        route_destination = col2.text_input("To", "Sacramento, CA")
+        col1, col2, col3 = st.columns(3)
+        battery_kwh = col1.number_input("Battery (kWh)", min_value=10.0, max_value=200.0, value=75.0, step=5.0)
+        route_soc = col2.slider("Current charge (%)", int(MIN_SOC * 100), 100, 80)
+        kwh_per_mile = col3.number_input("Consumption (kWh/mi)", min_value=0.1, max_value=1.0, value=0.3, step=0.05)
+        plan_requested = st.form_submit_button("Plan route")
+
+    if plan_requested:
+        start, end = geocoder.geocode(route_origin), geocoder.geocode(route_destination)
+        if start is None or end is None:
+            st.session_state.route_plan = None
+            st.error("Could not find one of the route's locations.")
+        else:
+            with span("route.plan"):
+                st.session_state.route_plan = plan_route(
+                    stations, station_index, start, end, battery_kwh=battery_kwh, soc=route_soc / 100,
+                    kwh_per_mile=kwh_per_mile, mask=level_mask,
+                )
+            if st.session_state.route_plan is None:
+                st.warning("No route found: the destination is out of range of the stations along the way.")
+
+    plan = st.session_state.get("route_plan")
+    if plan is None:
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Time", f"{plan.total_min / 60:.1f} h")
+    col2.metric("Driving", f"{plan.miles:.0f} mi")
+    col3.metric("Charging", f"{plan.charge_min:.0f} min")
+    col4.metric("Charge Stops", len(plan.stops))
+    st.caption(f"Arriving with {plan.arrive_soc:.0%} charge. Road distance and times are estimates "
+               f"from straight-line legs ({plan.candidates} stations considered along the route).")
+    if plan.stops:
+        st.dataframe(pd.DataFrame([{
+            "Station": stop["title"],
+            "Level": stop["level"],
+            "Leg (mi)": stop["leg_miles"],
+            "Arrive": f"{stop['arrive_soc']:.0%}",
+            "Depart": f"{stop['depart_soc']:.0%}",
+            "Charge (min)": round(stop["charge_min"]),
+        } for stop in plan.stops]))
+
+    import folium
+    from streamlit_folium import st_folium
+
+    route_map = folium.Map()
+    route_map.fit_bounds([[min(p[0] for p in plan.path), min(p[1] for p in plan.path)],
+                          [max(p[0] for p in plan.path), max(p[1] for p in plan.path)]])
+    folium.PolyLine(plan.path, weight=4).add_to(route_map)
+    folium.Marker(plan.path[0], tooltip="Start", icon=folium.Icon(color="blue", icon="play", prefix="fa")).add_to(route_map)
+    folium.Marker(plan.path[-1], tooltip="Destination", icon=folium.Icon(color="red", icon="flag", prefix="fa")).add_to(route_map)
+    for i, stop in enumerate(plan.stops, 1):
+        folium.Marker([stop["latitude"], stop["longitude"]], tooltip=f"{i}. {stop['title']}",
+                      icon=folium.Icon(color="green", icon="bolt", prefix="fa")).add_to(route_map)
+    st_folium(route_map, width=900, height=500, key="route_map", returned_objects=[])
+
+route_planner(stations, user_input_location, stations.level_filter_mask(selected_levels))
+
+# ----------------------------
+# Debug panel: this rerun's stage timings (and profile / memory capture)
+# ----------------------------
+SPANS_EXPORT = "data/spans.jsonl"
+
+if DEBUG_PANEL:
+    with st.sidebar.expander("Debug: rerun timings", expanded=True):
+        st.checkbox("Record stage timings", value=True, key="debug_spans")
+        st.checkbox("cProfile this rerun", key="debug_profile")
+        st.checkbox("tracemalloc this rerun", key="debug_memory")
+        st.caption("Capture toggles apply from the next rerun.")
+        if rerun_trace is not None:
+            rerun_trace.stop()
+            st.session_state.pop("debug_trace", None)
+            st.caption(f"Rerun: {rerun_trace.seconds * 1e3:.0f} ms, {len(rerun_trace.spans)} spans")
+            rows = rerun_trace.records()
+            if rows:
+                table = pd.DataFrame(rows)
+                table["stage"] = ["  " * d + n for d, n in zip(table["depth"], table["name"])]
+                table["info"] = [", ".join(f"{k}={v}" for k, v in a.items()) if isinstance(a, dict) else ""
+                                 for a in table.get("attrs", [None] * len(table))]
+                columns = ["stage", "ms"] + (["mem_kb"] if "mem_kb" in table else []) + ["info"]
+                st.dataframe(table[columns], hide_index=True)
+            if st.button(f"Append spans to {SPANS_EXPORT}"):
+                rerun_trace.export(SPANS_EXPORT)
+                st.caption(f"Wrote {len(rows)} spans.")
+            if rerun_trace.profile is not None:
+                st.code(rerun_trace.profile_text(), language=None)
+            for where, kib in rerun_trace.memory_top():
+                st.caption(f"{kib:,.0f} KiB  {where}")
+
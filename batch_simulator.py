@@ -0,0 +1,183 @@
+# batch_simulator.py
+# Vectorized session generator for load testing. Whole chunks of sessions are
+# drawn with NumPy from a seeded RNG and written in bulk to CSV or Parquet.
+#
+#   python batch_simulator.py --sessions 10000000 --out data/load_test.csv
+#   python batch_simulator.py --sessions 10000000 --format parquet --out data/load_test_sessions
+
+import argparse
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from session_store import write_sessions
+from spans import span, timed
+
+# Same columns (and order) as data/charging_log.csv
+SESSION_COLUMNS = [
+    "session_id", "station_id", "start_time", "duration_min",
+    "energy_kwh", "cost_usd", "charger_level", "availability",
+]
+AVAILABILITY_STATUSES = np.array(["Available", "In Use", "Offline"], dtype=object)
+
+# Relative arrival rate per hour of day: quiet overnight, commute and
+# lunchtime bumps, evening peak when people get home
+HOURLY_ARRIVAL_WEIGHTS = np.array([
+    0.6, 0.4, 0.3, 0.3, 0.4, 0.8,    # 00-05
+    1.6, 2.8, 3.4, 2.6, 2.0, 2.2,    # 06-11
+    2.6, 2.4, 2.0, 2.1, 2.7, 3.6,    # 12-17
+    4.0, 3.6, 2.8, 2.0, 1.4, 0.9,    # 18-23
+])
+HOURLY_ARRIVAL_P = HOURLY_ARRIVAL_WEIGHTS / HOURLY_ARRIVAL_WEIGHTS.sum()
+
+# Per charger level: power (kW), median session length (min), price ($/kWh)
+LEVEL_POWER_KW = np.array([0.0, 1.9, 7.2, 50.0])
+LEVEL_MEDIAN_MIN = np.array([0.0, 180.0, 95.0, 32.0])
+LEVEL_PRICE_USD = np.array([0.0, 0.20, 0.28, 0.45])
+DEFAULT_LEVEL_P = np.array([0.1, 0.7, 0.2])  # when stations have no level info
+
+
+def station_catalogue(stations=None):
+    # (station_ids, highest charger level per station) from ev_api_results.json records
+    if stations is None:
+        # charging_map pulls in folium; keep it out of pool workers that never need it
+        from charging_map import load_real_stations
+        stations = load_real_stations()
+    ids, levels = [], []
+    for s in stations:
+        sid = s.get("station_id") or s.get("id")
+        if sid is None or sid == "":
+            continue
+        ids.append(str(sid))
+        levels.append(max(s.get("charger_levels") or [0]))
+    return np.array(ids, dtype=object), np.array(levels, dtype=np.int8)
+
+
+def session_ids(first, n):
+    # "S000000001"-style ids for n consecutive sessions starting at `first`
+    return np.char.add("S", np.char.zfill(np.arange(first, first + n).astype(str), 9)).astype(object)
+
+
+def draw_sessions(n, level, start, days, rng):
+    # Column arrays (no ids, no station) for n sessions at the given charger
+    # level(s); `level` is a scalar or a per-session array
+    level = np.broadcast_to(np.asarray(level, dtype=np.int8), (n,))
+
+    # Arrival time: uniform day, hour from the time-of-day profile, uniform within the hour
+    day = rng.integers(0, days, n)
+    hour = rng.choice(24, size=n, p=HOURLY_ARRIVAL_P)
+    offset_us = (day * 86_400 + hour * 3_600) * 1_000_000 + rng.integers(0, 3_600_000_000, n)
+    start_time = np.datetime64(pd.Timestamp(start).to_datetime64(), "us") + offset_us.astype("timedelta64[us]")
+
+    # Duration: log-normal around the level's typical session, 5 min .. 12 h
+    duration_min = np.clip(
+        np.rint(LEVEL_MEDIAN_MIN[level] * rng.lognormal(0.0, 0.45, n)), 5, 720
+    ).astype(np.int64)
+    # Energy: charger power x time, scaled by how hard the car actually pulls
+    energy_kwh = np.round(LEVEL_POWER_KW[level] * duration_min / 60 * rng.uniform(0.55, 0.95, n), 2)
+    cost_usd = np.round(energy_kwh * LEVEL_PRICE_USD[level] * rng.uniform(0.9, 1.1, n), 2)
+    return {
+        "start_time": start_time,
+        "duration_min": duration_min,
+        "energy_kwh": energy_kwh,
+        "cost_usd": cost_usd,
+        "charger_level": level.astype(np.int64),
+        "availability": AVAILABILITY_STATUSES[rng.integers(0, len(AVAILABILITY_STATUSES), n)],
+    }
+
+
+@timed("sim.generate_sessions")
+def generate_sessions(n, station_ids, station_levels=None, start=None, days=30, rng=None, id_offset=0):
+    # n sessions as a DataFrame with SESSION_COLUMNS. `rng` is a numpy Generator
+    # (or seed); the same seed always produces the same sessions.
+    rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+    if start is None:
+        start = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    station_ids = np.asarray(station_ids, dtype=object)
+
+    station = rng.integers(0, len(station_ids), n)
+    level = None if station_levels is None else np.asarray(station_levels, dtype=np.int8)[station]
+    if level is None or (level == 0).any():
+        drawn = rng.choice(np.array([1, 2, 3], dtype=np.int8), size=n, p=DEFAULT_LEVEL_P)
+        level = drawn if level is None else np.where(level == 0, drawn, level)
+
+    columns = draw_sessions(n, level, start, days, rng)
+    columns["session_id"] = session_ids(id_offset + 1, n)
+    columns["station_id"] = station_ids[station]
+    return pd.DataFrame(columns, columns=SESSION_COLUMNS)
+
+
+def iter_session_chunks(total, station_ids, station_levels=None, chunk_size=1_000_000, seed=0, start=None, days=30):
+    # Yields DataFrames of at most chunk_size rows. Each chunk has its own RNG
+    # stream spawned from `seed`, so output does not depend on chunk timing.
+    if start is None:
+        start = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    n_chunks = -(-total // chunk_size)
+    streams = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, stream in enumerate(streams):
+        n = min(chunk_size, total - i * chunk_size)
+        yield generate_sessions(n, station_ids, station_levels, start=start, days=days,
+                                rng=np.random.default_rng(stream), id_offset=i * chunk_size)
+
+
+def write_csv(chunks, path, append=False):
+    # Bulk CSV writer: one header, then each chunk encoded by Arrow in one call.
+    # A new file is written under a temporary name and renamed into place, so
+    # anything tailing path (the dashboard, charging_simulator) sees either the
+    # old log or the complete new one, never a half-written mix.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = 0
+    write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+    options = pacsv.WriteOptions(include_header=False, quoting_style="none")
+    target = path if append else f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(target, "ab" if append else "wb") as f:
+            for chunk in chunks:
+                if write_header:
+                    f.write((",".join(chunk.columns) + "\n").encode("utf-8"))
+                    write_header = False
+                with span("sim.write_csv_chunk", rows=len(chunk)):
+                    pacsv.write_csv(pa.Table.from_pandas(chunk, preserve_index=False), f, options)
+                rows += len(chunk)
+        if not append:
+            os.replace(target, path)
+    except BaseException:
+        if not append and os.path.exists(target):
+            os.unlink(target)
+        raise
+    return rows
+
+
+@timed("sim.write_parquet")
+def write_parquet(chunks, root):
+    # Appends each chunk to the day-partitioned session store at root
+    return sum(write_sessions(chunk, root=root) for chunk in chunks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk synthetic session generator")
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--start", type=datetime.fromisoformat, metavar="YYYY-MM-DD",
+                        help="first simulated day (default: --days before today)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--out", default="data/load_test_sessions.csv")
+    args = parser.parse_args()
+
+    ids, levels = station_catalogue()
+    if not len(ids):
+        raise SystemExit("No stations available to simulate sessions.")
+    chunks = iter_session_chunks(args.sessions, ids, levels, chunk_size=args.chunk_size,
+                                 seed=args.seed, start=args.start, days=args.days)
+    if args.format == "csv":
+        rows = write_csv(chunks, args.out)
+    else:
+        rows = write_parquet(chunks, args.out)
+    print(f"Generated {rows} sessions -> {args.out}")
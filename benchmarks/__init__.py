@@ -0,0 +1,3 @@
+# benchmarks/
+# Standalone timing scripts. Run from the repo root, e.g.
+#   python -m benchmarks.distance
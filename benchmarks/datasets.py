@@ -0,0 +1,77 @@
+# benchmarks/datasets.py
+# Synthetic scale datasets on disk, shaped like the dashboard's real inputs: a
+# station catalogue like data/ev_api_results.json and a session log like
+# data/charging_log.csv (or a day-partitioned Parquet store). Files are named
+# by size and seed and reused once generated; they are written under a
+# temporary name first, so an interrupted run is never mistaken for a dataset.
+#   python -m benchmarks.datasets --stations 100000 --sessions 50000000 --format parquet
+
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from batch_simulator import iter_session_chunks, write_csv, write_parquet
+from data_cache import write_json_atomic
+from benchmarks._common import text_stations
+
+BENCH_DIR = "data/bench"
+# Sessions cover a fixed window, so date filters select the same rows every run
+SESSION_START = datetime(2025, 1, 1)
+SESSION_DAYS = 30
+CHUNK_ROWS = 1_000_000
+
+
+def station_catalogue(n, seed=0, directory=BENCH_DIR):
+    # Path of an n-station catalogue (titles, addresses, operators, levels)
+    path = os.path.join(directory, f"stations_{n}_s{seed}.json")
+    if not os.path.exists(path):
+        write_json_atomic(path, text_stations(n, seed=seed))
+    return path
+
+
+def session_log(rows, stations_path, fmt="csv", seed=0, directory=BENCH_DIR, chunk_rows=CHUNK_ROWS):
+    # Path of a `rows`-session log over the catalogue's stations: a CSV file,
+    # or a Parquet store directory for fmt="parquet". Generated chunk by chunk,
+    # so any size fits in memory.
+    catalogue = os.path.splitext(os.path.basename(stations_path))[0]
+    name = f"sessions_{rows}_s{seed}_{catalogue}"
+    path = os.path.join(directory, name + (".csv" if fmt == "csv" else ""))
+    if os.path.exists(path):
+        return path
+
+    with open(stations_path) as f:
+        records = json.load(f)
+    station_ids = [str(s["id"]) for s in records]
+    levels = np.array([max(s.get("charger_levels") or [0]) for s in records], dtype=np.int8)
+    chunks = iter_session_chunks(rows, station_ids, levels, chunk_size=chunk_rows, seed=seed,
+                                 start=SESSION_START, days=SESSION_DAYS)
+    tmp = path + ".tmp"
+    if fmt == "csv":
+        write_csv(chunks, tmp)
+        os.replace(tmp, path)
+    else:
+        shutil.rmtree(tmp, ignore_errors=True)
+        write_parquet(chunks, tmp)
+        os.rename(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark datasets")
+    parser.add_argument("--stations", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--sessions", type=int, nargs="*", default=[1_000_000],
+                        help="session log sizes, over the largest catalogue")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=BENCH_DIR)
+    args = parser.parse_args()
+
+    paths = [station_catalogue(n, args.seed, args.dir) for n in args.stations]
+    for path in paths:
+        print(path)
+    for rows in args.sessions:
+        print(session_log(rows, station_catalogue(max(args.stations), args.seed, args.dir), args.format, args.seed, args.dir))
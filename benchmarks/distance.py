@@ -0,0 +1,41 @@
+# benchmarks/distance.py
+# Per-station geodesic() loop vs batched geodesic/haversine from distance.py
+#   python -m benchmarks.distance --sizes 100 1000 10000
+
+import argparse
+import numpy as np
+from geopy.distance import geodesic
+
+from distance import StationCoords
+from benchmarks._common import best_of, fmt_seconds, synthetic_stations
+
+
+def loop_miles(origin, stations):
+    # The original app.py / get_ev_data.py path
+    return np.array([geodesic(origin, (s["latitude"], s["longitude"])).miles for s in stations])
+
+
+def run(sizes, repeat):
+    origin = (37.7680, -122.4313)
+    print(f"{'stations':>9} {'loop':>11} {'geodesic':>11} {'haversine':>11} "
+          f"{'geo max err (mi)':>17} {'hav max err (mi)':>17}")
+    for n in sizes:
+        stations = synthetic_stations(n, seed=n)
+        coords = StationCoords.from_stations(stations)
+        reference = loop_miles(origin, stations)
+
+        t_loop = best_of(lambda: loop_miles(origin, stations), repeat=max(1, repeat // 2))
+        t_geo = best_of(lambda: coords.distances_from(origin, "geodesic"), repeat=repeat)
+        t_hav = best_of(lambda: coords.distances_from(origin, "haversine"), repeat=repeat)
+        geo_err = np.max(np.abs(coords.distances_from(origin, "geodesic") - reference))
+        hav_err = np.max(np.abs(coords.distances_from(origin, "haversine") - reference))
+        print(f"{n:>9} {fmt_seconds(t_loop):>11} {fmt_seconds(t_geo):>11} {fmt_seconds(t_hav):>11} "
+              f"{geo_err:>17.2e} {hav_err:>17.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
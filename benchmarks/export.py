@@ -0,0 +1,57 @@
+# benchmarks/export.py
+# Session export: the dashboard's old one-shot to_csv().encode() (whole log
+# as one string plus a bytes copy) vs session_export's chunked writers, by
+# wall time and peak traced memory
+#   python -m benchmarks.export --rows 2000000
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from batch_simulator import generate_sessions
+from session_export import EXPORT_FORMATS, export_frame
+from benchmarks._common import fmt_seconds
+
+
+def measure(fn):
+    # (seconds, peak traced MB) of one call
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def run(rows, n_stations):
+    data = generate_sessions(rows, [f"S{i}" for i in range(n_stations)], rng=1)
+    print(f"{rows:,} sessions")
+    print(f"{'export':>16} {'time':>11} {'peak MB':>9} {'file MB':>9}")
+
+    def one_shot():
+        return data.to_csv(index=False).encode("utf-8")
+
+    seconds, peak = measure(one_shot)
+    print(f"{'to_csv().encode':>16} {fmt_seconds(seconds):>11} {peak:>9.0f} {len(one_shot()) / 1e6:>9.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in EXPORT_FORMATS:
+            result = {}
+
+            def chunked():
+                result["path"] = export_frame(data, fmt, directory=directory)[0]
+
+            seconds, peak = measure(chunked)
+            size = os.path.getsize(result["path"]) / 1e6
+            print(f"{'chunked ' + fmt:>16} {fmt_seconds(seconds):>11} {peak:>9.0f} {size:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--stations", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.rows, args.stations)
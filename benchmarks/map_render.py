@@ -0,0 +1,64 @@
+# benchmarks/map_render.py
+# Full per-marker map (render_station_map), its GeoJSON backend and viewport
+# clustering (map_clusters): Python build time, HTML serialization time and
+# payload size sent to the browser
+#   python -m benchmarks.map_render --sizes 1000 10000 30000
+
+import argparse
+import numpy as np
+
+from charging_map import render_station_map
+from map_clusters import ClusterIndex, render_viewport_map, station_ranks, viewport_bounds
+from station_store import StationTable
+from benchmarks._common import SF_CENTER, best_of, fmt_seconds, synthetic_stations
+
+
+def html_of(m):
+    return m.get_root().render()
+
+
+def run(sizes, zoom, repeat):
+    print(f"{'stations':>9} {'path':>9} {'build':>11} {'to html':>11} {'payload':>11} {'markers':>8}")
+    for n in sizes:
+        table = StationTable.from_records(synthetic_stations(n, seed=n))
+        table = table.with_distances(np.round(np.random.default_rng(n).uniform(0, 12, n), 2))
+
+        m = render_station_map(table)
+        t_build = best_of(lambda: render_station_map(table), repeat=1)
+        t_html = best_of(lambda: html_of(m), repeat=1)
+        size = len(html_of(m).encode("utf-8"))
+        print(f"{n:>9} {'markers':>9} {fmt_seconds(t_build):>11} {fmt_seconds(t_html):>11} "
+              f"{size / 1e6:>9.2f}MB {n:>8}")
+
+        gm = render_station_map(table, backend="geojson")
+        t_build = best_of(lambda: render_station_map(table, backend="geojson"), repeat=repeat)
+        t_html = best_of(lambda: html_of(gm), repeat=repeat)
+        size = len(html_of(gm).encode("utf-8"))
+        print(f"{'':>9} {'geojson':>9} {fmt_seconds(t_build):>11} {fmt_seconds(t_html):>11} "
+              f"{size / 1e6:>9.2f}MB {n:>8}")
+
+        t_index = best_of(lambda: ClusterIndex.from_table(table), repeat=1)
+        index = ClusterIndex.from_table(table)
+        bounds = viewport_bounds(SF_CENTER, zoom)
+
+        def viewport():
+            clusters = index.query(zoom, bounds)
+            ranks = station_ranks(table, "Distance")
+            return render_viewport_map(table, clusters, ranks, SF_CENTER, zoom)
+
+        vm = viewport()
+        t_build = best_of(viewport, repeat=repeat)
+        t_html = best_of(lambda: html_of(vm), repeat=repeat)
+        size = len(html_of(vm).encode("utf-8"))
+        shown = len(index.query(zoom, bounds))
+        print(f"{'':>9} {'viewport':>9} {fmt_seconds(t_build):>11} {fmt_seconds(t_html):>11} "
+              f"{size / 1e6:>9.2f}MB {shown:>8}   (index build {fmt_seconds(t_index).strip()}, once per file)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--zoom", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.zoom, args.repeat)
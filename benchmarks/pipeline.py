@@ -0,0 +1,220 @@
+# benchmarks/pipeline.py
+# The dashboard's data path stage by stage, without a browser: what one
+# app.py run does for a station catalogue and a session log, timed on the
+# synthetic datasets from benchmarks/datasets.py. Results go to a JSON file
+# (with the git commit) so runs on different commits can be compared:
+#   python -m benchmarks.pipeline --stations 1000 10000 100000 --sessions 1000000 10000000
+#   python -m benchmarks.pipeline --sessions 50000000 --log-format parquet --repeat 1
+#   python -m benchmarks.pipeline --compare data/bench/results/pipeline-<old>.json
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from charging_map import render_station_map
+from distance import StationCoords
+from map_clusters import ClusterIndex, render_viewport_map, station_ranks, viewport_bounds
+from map_layers import station_marker_layer
+from session_export import export_frame
+from session_filter import SessionFilter
+from session_store import read_sessions
+from station_search import StationSearchIndex
+from station_store import StationTable
+from benchmarks._common import SF_CENTER, best_of, fmt_seconds
+from benchmarks.datasets import BENCH_DIR, SESSION_DAYS, SESSION_START, session_log, station_catalogue
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+MARKER_LIMIT = 10_000
+# the sidebar filters: one search word, two of three levels, a 10-day window
+QUERY = "market"
+LEVELS = [2, 3]
+WINDOW = (SESSION_START + timedelta(days=5), SESSION_START + timedelta(days=14))
+
+
+def git_commit():
+    # (short commit, whether the tree has uncommitted changes), or (None, None)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+class Recorder:
+    # Times stages with best_of and collects one result row per stage
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def time(self, stage, fn, stations=None, sessions=None, repeat=None, **extra):
+        seconds = best_of(fn, repeat=repeat or self.repeat)
+        row = {"stage": stage, "stations": stations, "sessions": sessions, "seconds": seconds, **extra}
+        self.results.append(row)
+        size = f"{stations or '':>7} {sessions or '':>9}"
+        notes = " ".join(f"{k}={v}" for k, v in extra.items())
+        print(f"{stage:>24} {size} {fmt_seconds(seconds):>11}  {notes}")
+        return seconds
+
+
+def station_stages(rec, n, seed):
+    # Catalogue load through map build, for an n-station catalogue
+    path = station_catalogue(n, seed)
+
+    def load():
+        with open(path) as f:
+            return json.load(f)
+
+    rec.time("load_stations", load, stations=n, repeat=1)
+    records = load()
+    rec.time("normalize", lambda: StationTable.from_records(records), stations=n)
+    table = StationTable.from_records(records)
+
+    coords = StationCoords(table.latitude, table.longitude)
+    rec.time("distances", lambda: coords.distances_from(SF_CENTER), stations=n)
+    table = table.with_distances(np.round(coords.distances_from(SF_CENTER), 2))
+
+    rec.time("search_index", lambda: StationSearchIndex(records, table.station_id), stations=n, repeat=1)
+    index = StationSearchIndex(records, table.station_id)
+
+    def search():
+        index._cache.clear()
+        return index.search(QUERY)
+
+    rec.time("search", search, stations=n, matches=len(search()))
+    visible = index.search(QUERY).mask & table.level_filter_mask(LEVELS)
+    rec.time("station_filter", lambda: index.search(QUERY).mask & table.level_filter_mask(LEVELS), stations=n)
+    rec.time("station_sort", lambda: table.sort_order("Distance"), stations=n)
+
+    def geojson_map():
+        return render_station_map(table, LEVELS, backend="geojson").get_root().render()
+
+    rec.time("map_geojson", geojson_map, stations=n, repeat=1, html_mb=round(len(geojson_map()) / 1e6, 2))
+    if n <= MARKER_LIMIT:
+        def marker_map():
+            return render_station_map(table, LEVELS, backend="markers").get_root().render()
+
+        rec.time("map_markers", marker_map, stations=n, repeat=1, html_mb=round(len(marker_map()) / 1e6, 2))
+
+    # app.py's cached marker layer (below VIEWPORT_MAP_MIN_STATIONS); timed once, cold
+    rec.time("map_layer", lambda: station_marker_layer(table, visible), stations=n, repeat=1)
+    rec.time("cluster_index", lambda: ClusterIndex.from_table(table), stations=n, repeat=1)
+    clusters = ClusterIndex.from_table(table)
+
+    def viewport_map():
+        ranks = station_ranks(table, "Distance", visible)
+        view = clusters.query(12, viewport_bounds(SF_CENTER, 12), mask=visible)
+        return render_viewport_map(table, view, ranks, SF_CENTER, 12).get_root().render()
+
+    rec.time("map_viewport", viewport_map, stations=n)
+    return table, visible
+
+
+def session_stages(rec, rows, n, table, visible, log_format, seed):
+    # Session log load through export, over the n-station catalogue
+    path = session_log(rows, station_catalogue(n, seed), log_format, seed)
+    start, end = WINDOW
+
+    def load():
+        if log_format == "parquet":
+            # the store path pushes the date window down to the files
+            return read_sessions(path, start=start.date(), end=end.date())
+        return pd.read_csv(path, parse_dates=["start_time"])
+
+    rec.time("load_sessions", load, stations=n, sessions=rows, repeat=1)
+    frame = load()
+    rec.time("prepare_sessions", lambda: SessionFilter(frame, table.station_id), stations=n, sessions=rows,
+             repeat=1, loaded=len(frame))
+    sessions = SessionFilter(frame, table.station_id)
+
+    def mask():
+        return sessions.mask(visible, None, start.date(), end.date())
+
+    rec.time("session_filter", mask, stations=n, sessions=rows)
+    matching = np.flatnonzero(mask())
+    rec.time("session_sort", lambda: sessions.sort_order(matching, "Distance", table.distance_miles),
+             stations=n, sessions=rows, matches=len(matching))
+    selected = sessions.select(visible, None, start.date(), end.date(), "Distance", table.distance_miles)
+    del frame, sessions
+
+    with tempfile.TemporaryDirectory() as directory:
+        rec.time("export_csv", lambda: export_frame(selected, "csv", directory=directory),
+                 stations=n, sessions=rows, repeat=1, rows=len(selected))
+
+
+def compare(results, baseline_path):
+    # Per-stage ratio against an earlier results file (>1 = slower now)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["stage"], r["stations"], r["sessions"]): r["seconds"] for r in baseline["results"]}
+    print(f"\nvs {baseline.get('commit')} ({os.path.basename(baseline_path)})")
+    for r in results:
+        old = before.get((r["stage"], r["stations"], r["sessions"]))
+        if old:
+            # ignore sub-millisecond jitter
+            flag = "  <-- slower" if r["seconds"] > 1.2 * old and r["seconds"] - old > 1e-3 else ""
+            print(f"{r['stage']:>24} {r['stations'] or '':>7} {r['sessions'] or '':>9} "
+                  f"{fmt_seconds(old):>11} -> {fmt_seconds(r['seconds']):>11} {r['seconds'] / old:>6.2f}x{flag}")
+
+
+def run(args):
+    commit, dirty = git_commit()
+    rec = Recorder(args.repeat)
+    print(f"{'stage':>24} {'stations':>7} {'sessions':>9} {'best':>11}")
+    tables = {}
+    for n in args.stations:
+        tables[n] = station_stages(rec, n, args.seed)
+    n = args.session_stations or max(args.stations)
+    if args.sessions and n not in tables:
+        tables[n] = station_stages(rec, n, args.seed)
+    for rows in args.sessions:
+        session_stages(rec, rows, n, *tables[n], args.log_format, args.seed)
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {"numpy": np.__version__, "pandas": pd.__version__},
+        "config": {"repeat": args.repeat, "seed": args.seed, "log_format": args.log_format,
+                   "session_stations": n, "query": QUERY, "levels": LEVELS,
+                   "window": [WINDOW[0].date().isoformat(), WINDOW[1].date().isoformat()],
+                   "session_days": SESSION_DAYS},
+        "results": rec.results,
+    }
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"pipeline-{commit or 'nogit'}{'-dirty' if dirty else ''}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults -> {out}")
+    if args.compare:
+        compare(rec.results, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--sessions", type=int, nargs="*", default=[1_000_000])
+    parser.add_argument("--session-stations", type=int, help="catalogue size for the session logs (default: largest)")
+    parser.add_argument("--log-format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="results JSON (default: data/bench/results/pipeline-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    run(args)
@@ -0,0 +1,52 @@
+# benchmarks/route_planner.py
+# route_panner.plan_route on synthetic state-scale station sets: corridor
+# search through the spatial index plus the A* charge-stop search, per route
+#   python -m benchmarks.route_planner --sizes 5000 20000 100000
+#
+# Budget: a plan (corridor included) well under a second at 100k stations.
+# Measured at 100k: San Diego -> Redding 93 ms (2464 candidates, 4 stops),
+# LA -> SF 36 ms, SF -> Tahoe 18 ms; with one stop overhead in the A*
+# heuristic instead of one per needed charge, San Diego -> Redding took 1.2 s.
+
+import argparse
+
+from route_panner import corridor_stations, plan_route
+from spatial_index import StationIndex
+from station_fetcher import REGIONS
+from station_store import StationTable
+from benchmarks._common import best_of, fmt_seconds, synthetic_stations
+
+ROUTES = {
+    "LA -> SF": ((34.0522, -118.2437), (37.7749, -122.4194)),
+    "San Diego -> Redding": ((32.7157, -117.1611), (40.5865, -122.3917)),
+    "SF -> Tahoe": ((37.7749, -122.4194), (38.9399, -119.9772)),
+}
+
+
+def run(sizes, soc, corridor_miles, repeat):
+    print(f"{'stations':>9} {'route':>21} {'corridor':>11} {'plan':>11} {'candidates':>11} {'stops':>6} {'trip':>8}")
+    for n in sizes:
+        table = StationTable.from_records(synthetic_stations(n, seed=n, bounds=REGIONS["CA"]))
+        t_index = best_of(lambda: StationIndex(table.latitude, table.longitude), repeat=1)
+        index = StationIndex(table.latitude, table.longitude)
+        for name, (origin, destination) in ROUTES.items():
+            t_corridor = best_of(lambda: corridor_stations(index, origin, destination, corridor_miles), repeat=repeat)
+            t_plan = best_of(lambda: plan_route(table, index, origin, destination, soc=soc,
+                                                corridor_miles=corridor_miles), repeat=repeat)
+            plan = plan_route(table, index, origin, destination, soc=soc, corridor_miles=corridor_miles)
+            stops = len(plan.stops) if plan else "-"
+            trip = f"{plan.total_min / 60:.1f} h" if plan else "none"
+            candidates = plan.candidates if plan else "-"
+            print(f"{n:>9} {name:>21} {fmt_seconds(t_corridor):>11} {fmt_seconds(t_plan):>11} "
+                  f"{candidates:>11} {stops:>6} {trip:>8}")
+        print(f"{'':>9} {'(index build ' + fmt_seconds(t_index).strip() + ', once per file)':>21}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 100000])
+    parser.add_argument("--soc", type=float, default=0.5)
+    parser.add_argument("--corridor-miles", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.soc, args.corridor_miles, args.repeat)
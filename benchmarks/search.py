@@ -0,0 +1,43 @@
+# benchmarks/search.py
+# Station search: the substring scan over titles (StationTable.title_search_mask)
+# vs the prebuilt word/trigram index (station_search), uncached per query
+#   python -m benchmarks.search --sizes 1000 10000 100000
+
+import argparse
+
+from station_search import StationSearchIndex
+from station_store import StationTable
+from benchmarks._common import best_of, fmt_seconds, text_stations
+
+QUERIES = {"exact": "safeway", "prefix": "electr", "infix": "ness", "typo": "walgrens",
+           "two words": "tesla market"}
+
+
+def run(sizes, repeat):
+    print(f"{'stations':>9} {'query':>10} {'scan':>11} {'index':>11} {'scan hits':>10} {'index hits':>11}")
+    for n in sizes:
+        stations = text_stations(n, seed=n)
+        table = StationTable.from_records(stations)
+        t_build = best_of(lambda: StationSearchIndex(stations, table.station_id), repeat=1)
+        index = StationSearchIndex(stations, table.station_id)
+
+        def uncached(query):
+            index._cache.clear()
+            return index.search(query)
+
+        for name, query in QUERIES.items():
+            t_scan = best_of(lambda: table.title_search_mask(query), repeat=repeat)
+            t_index = best_of(lambda: uncached(query), repeat=repeat)
+            print(f"{n:>9} {name:>10} {fmt_seconds(t_scan):>11} {fmt_seconds(t_index):>11} "
+                  f"{int(table.title_search_mask(query).sum()):>10} {len(index.search(query)):>11}")
+        t_cached = best_of(lambda: index.search("safeway"), repeat=repeat)
+        print(f"{'':>9} (index build {fmt_seconds(t_build).strip()}, once per file; "
+              f"repeated query {fmt_seconds(t_cached).strip()})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
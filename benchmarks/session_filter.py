@@ -0,0 +1,82 @@
+# benchmarks/session_filter.py
+# Session table pipeline: the chained pandas filters app.py used (copy, isin,
+# ==, dt.date comparisons, map join, sort_values) vs session_filter's single
+# mask over prepared columns
+#   python -m benchmarks.session_filter --rows 10000000
+
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from batch_simulator import generate_sessions
+from session_filter import SessionFilter
+from station_store import StationTable
+from benchmarks._common import best_of, fmt_seconds, synthetic_stations
+
+
+def legacy_pipeline(data, stations, search_ids, sel, sd, ed, sort_choice):
+    df = data.copy()
+    df = df[df["station_id"].isin(search_ids)]
+    if sel != "ALL":
+        df = df[df["station_id"] == sel]
+    if sd and ed:
+        df = df[(df["start_time"].dt.date >= sd) & (df["start_time"].dt.date <= ed)]
+    if not df.empty:
+        df["distance_miles"] = df["station_id"].map(stations.distance_series())
+    if sort_choice == "Distance" and "distance_miles" in df.columns:
+        df = df.sort_values("distance_miles")
+    elif sort_choice == "Availability" and "availability" in df.columns:
+        df = df.sort_values("availability")
+    elif sort_choice == "Charger Level" and "charger_level" in df.columns:
+        df = df.sort_values("charger_level")
+    return df.drop(columns=["distance_miles"], errors="ignore")
+
+
+def run(rows, n_stations, repeat):
+    start = datetime(2025, 1, 1)
+    table = StationTable.from_records(synthetic_stations(n_stations, seed=1))
+    table = table.with_distances(np.random.default_rng(2).uniform(0, 12, n_stations))
+    data = generate_sessions(rows, table.station_id, start=start, days=30, rng=3)
+
+    t_prepare = best_of(lambda: SessionFilter(data, table.station_id), repeat=1)
+    sessions = SessionFilter(data, table.station_id)
+
+    # Half the stations match the search; a 10-day window
+    search_mask = np.zeros(n_stations, dtype=bool)
+    search_mask[::2] = True
+    search_ids = set(table.station_id[search_mask].tolist())
+    sd, ed = (start + timedelta(days=5)).date(), (start + timedelta(days=14)).date()
+    one = table.id_at(2)
+
+    cases = {
+        "search + dates, by distance": dict(sel="ALL", sort="Distance"),
+        "search + dates, by availability": dict(sel="ALL", sort="Availability"),
+        "one station, by distance": dict(sel=one, sort="Distance"),
+    }
+    print(f"{rows:,} sessions, {n_stations:,} stations (prepare once per log: {fmt_seconds(t_prepare).strip()})")
+    print(f"{'case':>32} {'legacy':>11} {'engine':>11} {'rows':>10} {'speedup':>8}")
+    for name, case in cases.items():
+        sel = case["sel"]
+
+        def legacy():
+            return legacy_pipeline(data, table, search_ids, sel, sd, ed, case["sort"])
+
+        def engine():
+            return sessions.select(search_mask, None if sel == "ALL" else sel, sd, ed,
+                                   case["sort"], table.distance_miles)
+
+        old, new = legacy(), engine()
+        assert set(old["session_id"]) == set(new["session_id"]), name
+        t_old = best_of(legacy, repeat=repeat)
+        t_new = best_of(engine, repeat=repeat)
+        print(f"{name:>32} {fmt_seconds(t_old):>11} {fmt_seconds(t_new):>11} {len(new):>10,} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--stations", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.stations, args.repeat)
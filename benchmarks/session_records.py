@@ -0,0 +1,118 @@
+# benchmarks/session_records.py
+# charging_simulator's live-session path: memory per in-flight ChargingSession
+# and sessions written per second, the original class (per-instance dict,
+# datetime fields, random S#### id, one DictWriter append per session) vs the
+# __slots__ record and SessionLogger batches
+#   python -m benchmarks.session_records --sessions 100000 --legacy-writes 20000
+
+import argparse
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from charging_simulator import ChargingSession, SessionLogger, log_session
+
+
+class LegacySession:
+    # The class as it was: dict-backed, two datetimes per instance
+    def __init__(self, station_id, power_kw=7.2):
+        self.session_id = f"S{random.randint(1000, 9999)}"
+        self.station_id = station_id
+        self.power_kw = power_kw
+        self.start_time = datetime.now()
+        self.duration_min = random.randint(10, 60)
+        self.energy_kwh = round((self.power_kw * self.duration_min) / 60, 2)
+        self.cost_usd = round(self.energy_kwh * 0.25, 2)
+        self.end_time = self.start_time + timedelta(minutes=self.duration_min)
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "station_id": self.station_id,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "duration_min": self.duration_min,
+            "energy_kwh": self.energy_kwh,
+            "cost_usd": self.cost_usd
+        }
+
+
+def legacy_log_session(session, file_path):
+    # The old log_session: reopen, DictWriter, to_dict() twice
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    file_exists = os.path.isfile(file_path)
+    with open(file_path, mode="a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=session.to_dict().keys())
+        if not file_exists:
+            writer.writeheader()
+        writer.writerow(session.to_dict())
+
+
+def bytes_per_session(cls, n, station_ids):
+    # Traced bytes held by n live sessions (station id strings are shared)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [cls(random.choice(station_ids)) for _ in range(n)]
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return held / n
+
+
+def distinct_ids(cls, n):
+    return len({cls("1").session_id for _ in range(n)})
+
+
+def writes_per_second(fn, n):
+    t0 = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - t0)
+
+
+def run(n, legacy_writes, batch_rows):
+    station_ids = [str(340000 + i) for i in range(5000)]
+    print(f"memory, {n:,} in-flight sessions")
+    for name, cls in (("legacy dict + datetimes", LegacySession), ("__slots__ record", ChargingSession)):
+        print(f"  {name:<30} {bytes_per_session(cls, n, station_ids):>8.0f} B/session   "
+              f"distinct ids {distinct_ids(cls, n):>9,} of {n:,}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def legacy():
+            path = os.path.join(tmp, "legacy.csv")
+            for _ in range(legacy_writes):
+                legacy_log_session(LegacySession(random.choice(station_ids)), path)
+
+        def per_session():
+            path = os.path.join(tmp, "per_session.csv")
+            for _ in range(legacy_writes):
+                log_session(ChargingSession(random.choice(station_ids)), path)
+
+        def batched():
+            # no store under tmp, so SessionLogger appends to the CSV
+            with SessionLogger(os.path.join(tmp, "batched.csv"), root=os.path.join(tmp, "store"),
+                               max_rows=batch_rows, max_seconds=None) as logger:
+                for _ in range(n):
+                    logger.log(ChargingSession(random.choice(station_ids)))
+
+        print("\nwrite throughput")
+        for name, fn, rows in (
+            ("legacy log_session (DictWriter)", legacy, legacy_writes),
+            ("log_session, one per call", per_session, legacy_writes),
+            (f"SessionLogger, {batch_rows:,}/batch", batched, n),
+        ):
+            print(f"  {name:<36} {rows:>9,} sessions {writes_per_second(fn, rows):>12,.0f} sessions/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--legacy-writes", type=int, default=20_000)
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    args = parser.parse_args()
+    run(args.sessions, args.legacy_writes, args.batch_rows)
@@ -0,0 +1,94 @@
+# benchmarks/simulator.py
+# Session generation throughput: the original per-session paths vs batch_simulator
+#   python -m benchmarks.simulator --legacy-sessions 5000 --batch-sessions 2000000
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from batch_simulator import iter_session_chunks, station_catalogue, write_csv, write_parquet
+from charging_simulator import ChargingSession, log_session
+
+
+def legacy_generate_sessions(n, station_ids):
+    # The row-by-row dict loop simulate_sessions.py used before batch_simulator
+    sessions = []
+    now = datetime.now()
+    for i in range(n):
+        station_id = random.choice(station_ids)
+        start_time = now - timedelta(days=random.randint(0, 30), hours=random.randint(0, 23))
+        duration_min = random.randint(20, 120)
+        energy_kwh = round(duration_min * random.uniform(0.2, 0.4), 2)
+        cost_usd = round(energy_kwh * random.uniform(0.15, 0.30), 2)
+        sessions.append({
+            "session_id": f"S{i+1:03}",
+            "station_id": station_id,
+            "start_time": start_time,
+            "duration_min": duration_min,
+            "energy_kwh": energy_kwh,
+            "cost_usd": cost_usd,
+            "charger_level": random.choice([1, 2, 3]),
+            "availability": random.choice(["Available", "In Use", "Offline"]),
+        })
+    return sessions
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    rows = fn()
+    return rows, time.perf_counter() - t0
+
+
+def run(legacy_n, batch_n, chunk_size):
+    ids, levels = station_catalogue()
+    id_list = list(ids)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        def per_session_log():
+            path = os.path.join(tmp, "per_session.csv")
+            for _ in range(legacy_n):
+                log_session(ChargingSession(station_id=random.choice(id_list)), file_path=path)
+            return legacy_n
+
+        def dict_rows_to_csv():
+            pd.DataFrame(legacy_generate_sessions(legacy_n, id_list)).to_csv(
+                os.path.join(tmp, "dict_rows.csv"), index=False)
+            return legacy_n
+
+        def batch_csv():
+            chunks = iter_session_chunks(batch_n, ids, levels, chunk_size=chunk_size, seed=0)
+            return write_csv(chunks, os.path.join(tmp, "batch.csv"))
+
+        def batch_parquet():
+            chunks = iter_session_chunks(batch_n, ids, levels, chunk_size=chunk_size, seed=0)
+            return write_parquet(chunks, os.path.join(tmp, "batch_store"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, fn in (
+                ("charging_simulator log_session loop", per_session_log),
+                ("simulate_sessions dict rows + to_csv", dict_rows_to_csv),
+                ("batch_simulator -> CSV", batch_csv),
+                ("batch_simulator -> Parquet store", batch_parquet),
+            ):
+                rows, seconds = timed(fn)
+                results.append((name, rows, seconds))
+
+    print(f"{'path':<40} {'sessions':>11} {'seconds':>9} {'sessions/s':>12}")
+    for name, rows, seconds in results:
+        print(f"{name:<40} {rows:>11,} {seconds:>9.2f} {rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--legacy-sessions", type=int, default=5_000)
+    parser.add_argument("--batch-sessions", type=int, default=2_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.legacy_sessions, args.batch_sessions, args.chunk_size)
@@ -1,65 +1,171 @@
 # charging_map.py
 # Creates a Folium map with mock charging station markers in San Francisco
 
+import argparse
+import html
 import json
 import os
-from geopy.distance import geodesic
+import numpy as np
 import folium
 from folium.plugins import MarkerCluster
+from folium.template import Template
 from streamlit_folium import folium_static
+from spans import span, timed
+from station_store import AVAILABILITY_LABELS, StationTable
 
 # Loads stations from JSON file
 def load_real_stations(json_path="data/ev_api_results.json"):
     if os.path.exists(json_path):
-        with open(json_path, "r") as f:
+        with open(json_path, "r") as f, span("stations.json_load", path=json_path):
             return json.load(f)
     else:
         return []
 
-def render_station_map(station_data, charger_level_filter=None, sort_by="Distance"):
-    # Sort stations by selected method
-    if sort_by == "Distance":
-        station_data = sorted(station_data, key=lambda s: s.get("distance_miles", float("inf")))
-    elif sort_by == "Availability":
-        # Prioritize Available > In use > Offline > Unknown
-        priority = {"Available": 0, "In use": 1, "Offline": 2}
-        station_data = sorted(station_data, key=lambda s: priority.get(s.get("availability", ""), 3))
-    elif sort_by == "Charger Level":
-        # Sort by highest charger level available (Level 3 > 2 > 1)
-        def highest_level(station):
-            levels = station.get("charger_levels", [])
-            return -max(levels) if levels else float("inf")
-        station_data = sorted(station_data, key=highest_level)
+# Icon color by availability status
+AVAILABILITY_COLORS = {
+    "Available":"green",
+    "In use":"orange",
+    "Offline":"gray"
+}
+
+# GeoJSON backend marker glyph by highest charger level (index = level, 0 = unknown)
+LEVEL_ICONS = ["question", "battery-quarter", "plug", "bolt"]
+
+def availability_color(availability):
+    return AVAILABILITY_COLORS.get(availability, "blue") # fallback = blue
+
+def script_json(obj):
+    # JSON safe to paste into a <script> block: a title containing "</script>"
+    # (or "<!--") can't end or alter the block
+    text = json.dumps(obj, separators=(",", ":"))
+    return text.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+def station_popup_html(stations, pos, rank=None):
+    # rank: "#i" position in the current sort order, left out when None
+    distance = stations.distance_miles[pos]
+    prefix = "" if rank is None else f"#{rank} "
+    return f"""
+        <b>{prefix}{html.escape(str(stations.title[pos]))}</b><br>
+        Charger Levels: {', '.join(str(lvl) for lvl in stations.levels(pos))}<br>
+        Status: <b>{stations.availability_label(pos)}</b><br>
+        Distance: <b>{'N/A' if np.isnan(distance) else distance} mi</b>
+        """
+
+# GeoJSON backend: one FeatureCollection, markers and popups built in the browser
+class StationGeoJsonCluster(MarkerCluster):
+    # Marker cluster filled from a compact FeatureCollection. Feature
+    # properties: r = rank, t = title, l = charger levels, s = status index,
+    # m = highest charger level, d = distance text. Marker color shows the
+    # status and its glyph the highest level; popup HTML is only built when a
+    # marker is clicked.
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.markerClusterGroup({{ this.options|tojavascript }});
+            (function(cluster) {
+                var statuses = {{ this.statuses|tojson }};
+                var colors = {{ this.colors|tojson }};
+                var glyphs = {{ this.level_icons|tojson }};
+                function esc(text) {
+                    return String(text).replace(/[&<>"']/g, function(c) { return "&#" + c.charCodeAt(0) + ";"; });
+                }
+                var icons = colors.map(function(color) {
+                    return glyphs.map(function(glyph) {
+                        return L.AwesomeMarkers.icon({markerColor: color, iconColor: "white",
+                            icon: glyph, prefix: "fa", extraClasses: "fa-rotate-0"});
+                    });
+                });
+                L.geoJSON({{ this.data }}, {
+                    pointToLayer: function(feature, latlng) {
+                        return L.marker(latlng, {icon: icons[feature.properties.s][feature.properties.m]});
+                    },
+                    onEachFeature: function(feature, layer) {
+                        layer.bindPopup(function() {
+                            var p = feature.properties;
+                            return "<b>#" + p.r + " " + esc(p.t) + "</b><br>"
+                                + "Charger Levels: " + esc(p.l) + "<br>"
+                                + "Status: <b>" + esc(statuses[p.s]) + "</b><br>"
+                                + "Distance: <b>" + esc(p.d) + " mi</b>";
+                        }, {maxWidth: "100%"});
+                    }
+                }).eachLayer(function(marker) { cluster.addLayer(marker); });
+            })({{ this.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, feature_collection, statuses, colors, level_icons=LEVEL_ICONS, **kwargs):
+        super().__init__(**kwargs)
+        self.data = script_json(feature_collection)
+        self.statuses = list(statuses)
+        self.colors = list(colors)
+        self.level_icons = list(level_icons)
+
+
+def stations_feature_collection(stations, order, rank):
+    # FeatureCollection for the rows in `order`, straight from the table columns
+    lats = np.round(stations.latitude[order], 6).tolist()
+    lons = np.round(stations.longitude[order], 6).tolist()
+    distances = stations.distance_miles[order].tolist()
+    top_levels = stations.max_level()[order].tolist()
+    features = []
+    for i, pos, lat, lon, distance, top in zip(rank.tolist(), order.tolist(), lats, lons, distances, top_levels):
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "r": i,
+                "t": str(stations.title[pos]),
+                "l": ", ".join(str(lvl) for lvl in stations.levels(pos)),
+                "s": int(stations.availability[pos]),
+                "m": top,
+                "d": "N/A" if np.isnan(distance) else str(distance),
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+@timed("map.render_station_map")
+def render_station_map(station_data, charger_level_filter=None, sort_by="Distance", backend="markers", status=None):
+    # Accepts a StationTable or a list of station dicts
+    # backend: "markers" = one folium Marker per station,
+    #          "geojson" = one FeatureCollection rendered client-side (much
+    #          faster and smaller for large station sets)
+    # status: live availability laid over the stations' own, as a
+    #         station_status.StatusTable or a {station_id: label} mapping
+    if isinstance(station_data, StationTable):
+        stations = station_data
+    else:
+        stations = StationTable.from_records(station_data)
+    if status is not None:
+        labels = status.snapshot()[1] if hasattr(status, "snapshot") else status
+        stations = stations.with_status(labels)
+
+    # Sort stations by selected method (Distance: nearest first,
+    # Availability: Available > In use > Offline > Unknown,
+    # Charger Level: highest level available first)
+    order = stations.sort_order(sort_by)
+    rank = np.arange(1, len(order) + 1)
+    # Skip stations that don't have a selected level (or have no coordinates)
+    keep = (stations.level_filter_mask(charger_level_filter) & stations.has_coords())[order]
+    order, rank = order[keep], rank[keep]
 
     # Base map centered on SF
     m = folium.Map(location=[37.7749, -122.4194], zoom_start=12)
-    marker_cluster = MarkerCluster().add_to(m)
 
-    # Icon color by availability status
-    availability_colors = {
-        "Available":"green",
-        "In use":"orange",
-        "Offline":"gray"
-    }
-
-    for i, station in enumerate(station_data, start=1):
-        levels = station.get("charger_levels", [])
-        if charger_level_filter and not any(level in levels for level in charger_level_filter):
-            continue # Skip if station doesn't have selected level
-        
-        availability = station.get("availability", "Unknown")
-        icon_color = availability_colors.get(availability, "blue") # fallback = blue
-
-        popup_info = f"""
-        <b>#{i} {station['title']}</b><br>
-        Charger Levels: {', '.join(str(lvl) for lvl in levels)}<br>
-        Status: <b>{availability}</b><br>
-        Distance: <b>{station.get('distance_miles', 'N/A')} mi</b>
-        """
+    if backend == "geojson":
+        colors = [availability_color(label) for label in AVAILABILITY_LABELS]
+        StationGeoJsonCluster(stations_feature_collection(stations, order, rank),
+                              AVAILABILITY_LABELS, colors).add_to(m)
+        return m
+    if backend != "markers":
+        raise ValueError(f"Unknown map backend {backend!r}")
+
+    marker_cluster = MarkerCluster().add_to(m)
 
+    for i, pos in zip(rank.tolist(), order.tolist()):
+        icon_color = availability_color(stations.availability_label(pos))
         folium.Marker(
-            location=[station["latitude"], station["longitude"]],
-            popup=popup_info,
+            location=[float(stations.latitude[pos]), float(stations.longitude[pos])],
+            popup=station_popup_html(stations, pos, i),
             icon=folium.Icon(color=icon_color, icon="bolt", prefix="fa")
         ).add_to(marker_cluster)
 
@@ -67,7 +173,12 @@ def render_station_map(station_data, charger_level_filter=None, sort_by="Distanc
 
 # For standalone testing
 if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Export the station map to HTML")
+   parser.add_argument("--backend", choices=("markers", "geojson"), default="markers")
+   parser.add_argument("--out", default="sf_charging_map.html")
+   args = parser.parse_args()
+
    stations = load_real_stations() # Load from JSON
-   m = render_station_map(stations) # pass loaded data
-   m.save("sf_charging_map.html")
-   print("Map saved as sf_charging_map.html")
\ No newline at end of file
+   m = render_station_map(stations, backend=args.backend) # pass loaded data
+   m.save(args.out)
+   print(f"Map saved as {args.out}")
\ No newline at end of file
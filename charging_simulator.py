@@ -1,27 +1,96 @@
 # charging_simulator.py
-# Simulator to generate dummy stats for EV stations
+# Simulator to generate dummy stats for EV stations. Sessions are compact
+# __slots__ records (id and times held as integers, no per-session dict,
+# datetime or id string) with monotonic ids, and are written in batches by
+# SessionLogger: to the CSV log in its own column order, or to the Parquet
+# session store once the log has been migrated.
 
-import json
-import os
 import csv
 import os
 import random
+import threading
+import time
 from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
 from charging_map import load_real_stations
-    
+from session_export import csv_bytes
+from session_store import SESSION_STORE_DIR, store_exists, write_sessions
+from spans import span, timed
+
+# Columns a session record writes (the log's header when a new file is started)
+SESSION_FIELDS = ("session_id", "station_id", "start_time", "end_time", "duration_min",
+                  "energy_kwh", "cost_usd", "charger_level")
+# Charger power (kW) by level, as in batch_simulator
+LEVEL_POWER_KW = (1.9, 7.2, 50.0)
+PRICE_PER_KWH = 0.25
+_EPOCH = datetime(1970, 1, 1)
+# Batches at least this big are written through a DataFrame (Arrow CSV);
+# smaller ones, down to log_session's single row, row by row
+FRAME_WRITE_MIN_ROWS = 256
+
+
+def _local_now_us():
+    # Local wall-clock time (what datetime.now() returns) as microseconds
+    ns = time.time_ns()
+    return ns // 1000 + time.localtime(ns // 1_000_000_000).tm_gmtoff * 1_000_000
+
+
+class SessionIds:
+    # Session numbers: the allocation time in microseconds, bumped past the
+    # previous number when the clock has not moved (or went back), so within
+    # one process they never repeat and sort in allocation order. Later runs
+    # appending to the same log continue after earlier ones, but two
+    # simulators appending at the same moment can draw the same number.
+    # Written as "S" + 16 digits.
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._last = max(time.time_ns() // 1000, self._last + 1)
+            return self._last
+
+
+session_ids = SessionIds()
+
+
 class ChargingSession:
+    __slots__ = ("number", "station_id", "power_kw", "start_us", "duration_min", "energy_kwh", "cost_usd")
+
     def __init__(self, station_id, power_kw=7.2):
-        self.session_id = f"S{random.randint(1000, 9999)}"
+        if not station_id or not isinstance(station_id, str):
+            raise ValueError("Invalid station ID. Must be a non-empty string.")
+        self.number = session_ids.next()
         self.station_id = station_id
         self.power_kw = power_kw
-        self.start_time = datetime.now()
+        self.start_us = _local_now_us()
         self.duration_min = random.randint(10, 60)
         self.energy_kwh = round((self.power_kw * self.duration_min) / 60, 2)
-        self.cost_usd = round(self.energy_kwh * 0.25, 2)
-        self.end_time = self.start_time + timedelta(minutes=self.duration_min)
+        self.cost_usd = round(self.energy_kwh * PRICE_PER_KWH, 2)
 
-        if not station_id or not isinstance(station_id, str):
-            raise ValueError("Invalid station ID. Must be a non-empty string.")
+    @property
+    def session_id(self):
+        return f"S{self.number:016d}"
+
+    @property
+    def start_time(self):
+        return _EPOCH + timedelta(microseconds=self.start_us)
+
+    @property
+    def end_time(self):
+        return self.start_time + timedelta(minutes=self.duration_min)
+
+    @property
+    def charger_level(self):
+        # Level whose power is closest to power_kw
+        return 1 + min(range(3), key=lambda i: abs(LEVEL_POWER_KW[i] - self.power_kw))
+
+    def row(self, columns):
+        # Values for a CSV log row in the given column order ("" if unknown)
+        return [getattr(self, c) if c in SESSION_FIELDS else "" for c in columns]
 
     def to_dict(self):
         return {
@@ -33,33 +102,168 @@ class ChargingSession:
             "energy_kwh": self.energy_kwh,
             "cost_usd": self.cost_usd
         }
-    
+
+
+def sessions_frame(sessions):
+    # One DataFrame (SESSION_FIELDS) for a batch of records, built column-wise
+    n = len(sessions)
+    start = np.fromiter((s.start_us for s in sessions), dtype=np.int64, count=n)
+    duration = np.fromiter((s.duration_min for s in sessions), dtype=np.int64, count=n)
+    return pd.DataFrame({
+        "session_id": [f"S{s.number:016d}" for s in sessions],
+        "station_id": [s.station_id for s in sessions],
+        "start_time": start.astype("datetime64[us]"),
+        "end_time": (start + duration * 60_000_000).astype("datetime64[us]"),
+        "duration_min": duration,
+        "energy_kwh": np.fromiter((s.energy_kwh for s in sessions), dtype=np.float64, count=n),
+        "cost_usd": np.fromiter((s.cost_usd for s in sessions), dtype=np.float64, count=n),
+        "charger_level": [s.charger_level for s in sessions],
+    }, columns=list(SESSION_FIELDS))
+
+
+_headers = {}
+
+
+def _file_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _csv_header(file_path):
+    # Column names of an existing, non-empty CSV log, else None. Cached while
+    # the file is exactly as this process last left it (same inode, size and
+    # mtime); any other change, e.g. a simulator rewriting the log in place
+    # with new columns, makes it read the header again.
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    if st.st_size == 0:
+        return None
+    cached = _headers.get(file_path)
+    if cached is None or cached[0] != _file_key(st):
+        with open(file_path, newline="") as f:
+            cached = _headers[file_path] = (_file_key(st), f.readline().strip().split(","))
+    return cached[1]
+
+
+def append_sessions_csv(sessions, file_path="data/charging_log.csv"):
+    # Appends a batch to the CSV log in one write, in the file's own column
+    # order (columns the records don't have are left empty)
+    if not sessions:
+        return 0
+    header = _csv_header(file_path)
+    if header is None:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    if len(sessions) >= FRAME_WRITE_MIN_ROWS:
+        df = sessions_frame(sessions)
+        if header is not None:
+            df = df.reindex(columns=header)
+        with open(file_path, "ab") as f:
+            f.write(csv_bytes(df, header=header is None))
+            f.flush()
+            _headers[file_path] = (_file_key(os.fstat(f.fileno())), list(header or df.columns))
+        return len(df)
+    with open(file_path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if header is None:
+            header = list(SESSION_FIELDS)
+            writer.writerow(header)
+        writer.writerows(s.row(header) for s in sessions)
+        f.flush()
+        # our own append: the header stays valid for the file as it now is
+        _headers[file_path] = (_file_key(os.fstat(f.fileno())), header)
+    return len(sessions)
+
+
+@timed("sim.log_session")
 def log_session(session: ChargingSession, file_path="data/charging_log.csv"):
-    os.makedirs("data", exist_ok=True)
-    file_exists = os.path.isfile(file_path)
-    try: 
-        with open(file_path, mode="a", newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=session.to_dict().keys())
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(session.to_dict())
+    try:
+        append_sessions_csv([session], file_path)
     except Exception as e:
         print(f"Failed to log session: {e}")
 
+
+class SessionLogger:
+    # Buffers sessions and writes them in batches: when max_rows are waiting,
+    # or max_seconds after the first unwritten one (from a timer thread, so an
+    # idle simulator still gets its sessions out). close() writes the rest.
+    # Goes to the Parquet store once it exists, else to the CSV log.
+
+    def __init__(self, file_path="data/charging_log.csv", root=SESSION_STORE_DIR, max_rows=10_000,
+                 max_seconds=5.0):
+        self.file_path = file_path
+        self.root = root
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.written = 0
+        self._buffer = []
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def log(self, session):
+        with self._lock:
+            self._buffer.append(session)
+            if len(self._buffer) >= self.max_rows:
+                self.flush()
+            else:
+                self._arm_timer()
+
+    def _arm_timer(self):
+        if self._timer is None and self.max_seconds is not None:
+            self._timer = threading.Timer(self.max_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            with span("sim.flush_sessions", rows=len(batch)):
+                try:
+                    if store_exists(self.root):
+                        rows = write_sessions(sessions_frame(batch), root=self.root)
+                    else:
+                        rows = append_sessions_csv(batch, self.file_path)
+                except Exception as e:
+                    # keep the batch, ahead of anything logged meanwhile, for the next flush
+                    print(f"Failed to log {len(batch)} sessions, will retry: {e}")
+                    self._buffer[:0] = batch
+                    self._arm_timer()
+                    return 0
+            self.written += rows
+            return rows
+
+    def close(self):
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
 # Test run
+@timed("sim.multiple_sessions")
 def simulate_multiple_sessions(num_sessions=5):
      stations = load_real_stations()
      if not stations:
           print("No stations available to simulate sessions.")
           return
-     
-     for _ in range(num_sessions):
-          random_station = random.choice(stations)
-          session = ChargingSession(station_id=str(random_station["id"]))
-          print("Session:", session.to_dict())
-          log_session(session)
+
+     with SessionLogger() as logger:
+          for _ in range(num_sessions):
+               random_station = random.choice(stations)
+               session = ChargingSession(station_id=str(random_station["id"]))
+               print("Session:", session.to_dict())
+               logger.log(session)
 
 if __name__ == "__main__":
     print("Simulating random charging session for SF stations...")
     simulate_multiple_sessions(num_sessions=5)
-    print("All sessions logged to date/chargin_log.csv")
+    print("All sessions logged to data/charging_log.csv")
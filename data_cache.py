@@ -0,0 +1,299 @@
+# data_cache.py
+# Process-wide cache for the dashboard's data loads. Streamlit reruns app.py
+# from the top on every widget change, but imported modules stay loaded, so
+# anything cached here survives reruns. Entries are keyed on file signatures
+# (mtime + size), so when get_ev_data.py or a simulator writes new data the
+# next rerun reloads it automatically.
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from distance import StationCoords
+from geocoder import GEOCODE_DB, Gazetteer, GeocodeCache, Geocoder, network_from_env
+from map_clusters import ClusterIndex
+from rollups import RollupFollower
+from session_filter import SessionFilter
+from session_store import SESSION_STORE_DIR, read_sessions, store_exists
+from spans import span
+from spatial_index import StationIndex
+from station_search import StationSearchIndex
+from station_status import StatusPoller, source_from_env
+from station_store import StationTable
+
+STATIONS_JSON = "data/ev_api_results.json"
+STATION_STATUS_JSON = "data/station_status.json"
+SESSIONS_CSV = "data/charging_log.csv"
+
+_lock = threading.RLock()
+_entries = OrderedDict()   # key -> (signature, value, approximate bytes)
+_total_bytes = 0
+MAX_ENTRIES = 64
+MAX_CACHE_BYTES = 1 << 30
+STORE_SETTLE_SECONDS = 60
+
+
+# ----------------------------
+# File signatures
+# ----------------------------
+def file_signature(path):
+    # (mtime_ns, size), or None when the file is missing
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def store_signature(root=SESSION_STORE_DIR):
+    # Changes whenever a Parquet file is added, removed or rewritten. Writers
+    # only ever add uniquely named files, which updates the partition
+    # directory's mtime, so one stat per date= directory covers it. Files in
+    # directories changed in the last STORE_SETTLE_SECONDS are stat'ed too,
+    # since one may still be being written.
+    try:
+        names = sorted(os.listdir(root))
+    except FileNotFoundError:
+        return None
+    recent = time.time_ns() - STORE_SETTLE_SECONDS * 1_000_000_000
+    signature = []
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            signature.append((name, mtime))
+            if mtime >= recent and os.path.isdir(path):
+                for entry in os.scandir(path):
+                    st = entry.stat()
+                    signature.append((entry.name, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append((name, None))  # removed while we looked
+    return tuple(signature)
+
+
+def _nbytes(value):
+    # Rough memory held by a cached value: arrays and frames it holds
+    # directly or one attribute down (object column contents not counted)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, (dict, list, tuple)):
+        return sys.getsizeof(value)
+    attrs = getattr(value, "__dict__", None)
+    if attrs:
+        return sum(_nbytes(v) for v in attrs.values()
+                   if isinstance(v, (np.ndarray, pd.DataFrame, pd.Series)))
+    return 0
+
+
+def _cached(key, signature, loader):
+    # Return the value stored under key if its signature still matches,
+    # otherwise load, store and return it. Least recently used entries go
+    # once there are more than MAX_ENTRIES or they hold over MAX_CACHE_BYTES.
+    global _total_bytes
+    with _lock:
+        hit = _entries.get(key)
+        if hit is not None and hit[0] == signature:
+            _entries.move_to_end(key)
+            return hit[1]
+    with span("cache.load", key=key[0]):
+        value = loader()
+    nbytes = _nbytes(value)
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _total_bytes -= old[2]
+        _entries[key] = (signature, value, nbytes)
+        _total_bytes += nbytes
+        while len(_entries) > 1 and (len(_entries) > MAX_ENTRIES or _total_bytes > MAX_CACHE_BYTES):
+            _total_bytes -= _entries.popitem(last=False)[1][2]
+    return value
+
+
+def invalidate(path=None):
+    # Drop cached entries for one file (or everything). Signatures already catch
+    # writes from other processes; this is for writers in the same process.
+    global _total_bytes
+    with _lock:
+        if path is None:
+            _entries.clear()
+            _total_bytes = 0
+            return
+        for key in [k for k in _entries if path in k]:
+            _total_bytes -= _entries.pop(key)[2]
+
+
+def write_json_atomic(path, obj, **kwargs):
+    # Write to a temp file and rename, so readers never see a half-written file
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f, **kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    invalidate(path)
+
+
+# ----------------------------
+# Stations
+# ----------------------------
+def load_station_status(status_path=STATION_STATUS_JSON):
+    # {station_id (str): availability label} from the occupancy simulator's snapshot
+    def load():
+        if not os.path.exists(status_path):
+            return {}
+        with open(status_path) as f:
+            snapshot = json.load(f)
+        return {sid: state.get("availability") for sid, state in snapshot.get("stations", {}).items()}
+    return _cached(("station_status", status_path), file_signature(status_path), load)
+
+
+def load_station_table(json_path=STATIONS_JSON, status_path=STATION_STATUS_JSON):
+    # Availability is overlaid from the status snapshot when one exists
+    def load():
+        with open(json_path) as f:
+            table = StationTable.from_records(json.load(f))
+        status = load_station_status(status_path)
+        return table.with_status(status) if status else table
+    signature = (file_signature(json_path), file_signature(status_path))
+    return _cached(("stations", json_path, status_path), signature, load)
+
+
+_status_poller = None
+
+
+def live_status_poller(station_ids=None):
+    # Process-wide StatusPoller, started on first use when STATION_STATUS_SOURCE
+    # is set (None otherwise). station_ids: the catalogue to poll, updated
+    # whenever a reload hands in a new id column.
+    global _status_poller
+    with _lock:
+        if _status_poller is None:
+            source = source_from_env(initial=load_station_status())
+            _status_poller = False if source is None else StatusPoller(source)
+        if _status_poller and station_ids is not None:
+            _status_poller.watch(station_ids)
+        if _status_poller and not _status_poller.running:
+            _status_poller.start()
+    return _status_poller or None
+
+
+def load_live_station_table(json_path=STATIONS_JSON, status_path=STATION_STATUS_JSON):
+    # load_station_table with the live poller's fresh statuses on top; entries
+    # past their TTL fall back to the snapshot. Rebuilt only when they change.
+    table = load_station_table(json_path, status_path)
+    poller = live_status_poller(table.station_id)
+    if poller is None:
+        return table
+    version, labels = poller.table.snapshot()
+    signature = (file_signature(json_path), file_signature(status_path), version)
+    return _cached(("live_stations", json_path, status_path), signature,
+                   lambda: table.with_status(labels) if labels else table)
+
+
+def load_station_index(json_path=STATIONS_JSON):
+    def load():
+        table = load_station_table(json_path)
+        return StationIndex(table.latitude, table.longitude)
+    return _cached(("station_index", json_path), file_signature(json_path), load)
+
+
+def load_cluster_index(json_path=STATIONS_JSON):
+    # Per-zoom map grid cells for the viewport renderer
+    def load():
+        return ClusterIndex.from_table(load_station_table(json_path))
+    return _cached(("cluster_index", json_path), file_signature(json_path), load)
+
+
+def load_search_index(json_path=STATIONS_JSON):
+    # Word/trigram index over titles, addresses and operators; positions and
+    # ids match load_station_table
+    def load():
+        with open(json_path) as f:
+            records = json.load(f)
+        return StationSearchIndex(records, load_station_table(json_path).station_id)
+    return _cached(("search_index", json_path), file_signature(json_path), load)
+
+
+def load_geocoder(json_path=STATIONS_JSON, db_path=GEOCODE_DB):
+    # Gazetteer of SF places plus this station file's names and addresses, in
+    # front of the shared SQLite cache (and the network, if enabled)
+    def load():
+        with open(json_path) as f:
+            gazetteer = Gazetteer.from_stations(json.load(f))
+        return Geocoder(gazetteer, GeocodeCache(db_path), network_from_env())
+    return _cached(("geocoder", json_path, db_path), file_signature(json_path), load)
+
+
+def station_distances(origin, json_path=STATIONS_JSON):
+    # Miles from origin to every station (rounded to 2 decimals), cached per location
+    lat, lon = round(float(origin[0]), 6), round(float(origin[1]), 6)
+
+    def load():
+        table = load_station_table(json_path)
+        miles = np.round(StationCoords(table.latitude, table.longitude).distances_from((lat, lon)), 2)
+        miles.setflags(write=False)
+        return miles
+    return _cached(("distances", json_path, lat, lon), file_signature(json_path), load)
+
+
+# ----------------------------
+# Sessions
+# ----------------------------
+def load_sessions_csv(csv_path=SESSIONS_CSV):
+    # Callers get a shared frame: filter into new frames, never modify it in place
+    def load():
+        if not os.path.exists(csv_path):
+            return pd.DataFrame()
+        return pd.read_csv(csv_path, parse_dates=["start_time"])
+    return _cached(("sessions_csv", csv_path), file_signature(csv_path), load)
+
+
+def load_sessions_store(station_ids=None, start=None, end=None, root=SESSION_STORE_DIR):
+    # Filtered Parquet read, cached per filter combination
+    ids = None if station_ids is None else tuple(sorted(str(s) for s in station_ids))
+    key = ("sessions_store", root, ids, str(start), str(end))
+    return _cached(key, store_signature(root),
+                   lambda: read_sessions(root, station_ids=ids, start=start, end=end))
+
+
+def load_session_filter(station_ids=None, start=None, end=None, csv_path=SESSIONS_CSV,
+                        root=SESSION_STORE_DIR, json_path=STATIONS_JSON):
+    # SessionFilter over the Parquet store (filters pushed down to the files)
+    # or the CSV log, prepared once per loaded frame
+    table_ids = load_station_table(json_path).station_id
+    if store_exists(root):
+        ids = None if station_ids is None else tuple(sorted(str(s) for s in station_ids))
+        key = ("session_filter", root, ids, str(start), str(end), json_path)
+        signature = (store_signature(root), file_signature(json_path))
+        return _cached(key, signature, lambda: SessionFilter(
+            load_sessions_store(station_ids, start, end, root), table_ids))
+    key = ("session_filter", csv_path, json_path)
+    signature = (file_signature(csv_path), file_signature(json_path))
+    return _cached(key, signature, lambda: SessionFilter(load_sessions_csv(csv_path), table_ids))
+
+
+_rollup_follower = None
+
+
+def session_rollups():
+    # Process-wide rollups, caught up with whatever was logged since the last call
+    global _rollup_follower
+    with _lock:
+        if _rollup_follower is None:
+            _rollup_follower = RollupFollower(SESSIONS_CSV, SESSION_STORE_DIR)
+    return _rollup_follower.refresh()
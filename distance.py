@@ -0,0 +1,128 @@
+# distance.py
+# Batched distance computations from one point (the user) to every station
+
+import numpy as np
+
+# WGS-84 ellipsoid (same model geopy.distance.geodesic uses)
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+METERS_PER_MILE = 1609.344
+# Mean earth radius used by geopy's great_circle, in miles
+EARTH_RADIUS_MILES = 6371.009 / 1.609344
+
+DISTANCE_MODES = ("geodesic", "haversine")
+
+
+def haversine_miles(lat, lon, lats, lons):
+    # Great-circle distance on a sphere, ~0.5% off the ellipsoid but very cheap
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def geodesic_miles(lat, lon, lats, lons, max_iter=200, tol=1e-12):
+    # Vincenty's inverse formula on WGS-84, iterated for all stations at once.
+    # Agrees with geopy's geodesic() to well under a millimetre.
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    f = WGS84_F
+
+    L = np.radians(lons - lon)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lats)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    # stations without coordinates stay NaN and never converge
+    missing = np.isnan(lats) | np.isnan(lons)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos2_alpha == 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - lam_prev) < tol
+            if (converged | missing).all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (
+            cos_2sigma_m + B / 4 * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+            )
+        )
+        meters = WGS84_B * A * (sigma - delta_sigma)
+
+    miles = np.where(sin_sigma == 0, 0.0, meters / METERS_PER_MILE)
+
+    # Vincenty can fail to converge for nearly antipodal points; hand those to geopy
+    stuck = ~converged & ~missing
+    if stuck.any():
+        from geopy.distance import geodesic
+        for i in np.flatnonzero(stuck):
+            miles[i] = geodesic((lat, lon), (lats[i], lons[i])).miles
+    return miles
+
+
+class StationCoords:
+    # Station coordinates held as float arrays so distances are one batched call.
+    # Stations without usable coordinates are stored as NaN and come back as inf.
+
+    def __init__(self, lats, lons):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+
+    @classmethod
+    def from_stations(cls, stations):
+        lats = np.full(len(stations), np.nan)
+        lons = np.full(len(stations), np.nan)
+        for i, s in enumerate(stations):
+            lat, lon = s.get("latitude"), s.get("longitude")
+            if lat is None or lon is None:
+                continue
+            try:
+                lats[i], lons[i] = float(lat), float(lon)
+            except (TypeError, ValueError):
+                lats[i] = lons[i] = np.nan
+        return cls(lats, lons)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def distances_from(self, origin, mode="geodesic"):
+        if mode not in DISTANCE_MODES:
+            raise ValueError(f"Unknown distance mode {mode!r}. Use one of {DISTANCE_MODES}.")
+        lat, lon = origin
+        fn = geodesic_miles if mode == "geodesic" else haversine_miles
+        miles = fn(lat, lon, self.lats, self.lons)
+        miles[np.isnan(self.lats) | np.isnan(self.lons)] = np.inf
+        return miles
+
+
+def attach_distances(stations, origin, mode="geodesic", coords=None):
+    # Fill station["distance_miles"] (rounded to 2 decimals, inf when unknown)
+    if coords is None:
+        coords = StationCoords.from_stations(stations)
+    miles = np.round(coords.distances_from(origin, mode=mode), 2)
+    for s, d in zip(stations, miles.tolist()):
+        s["distance_miles"] = d
+    return miles
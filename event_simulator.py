@@ -0,0 +1,215 @@
+# event_simulator.py
+# Discrete-event simulation of station occupancy. Each station has a number of
+# ports per charger level; vehicles arrive, wait in a FIFO queue when every
+# port of their level is busy (or drive off if the queue is full), charge and
+# leave. Sessions, wait times, utilization and the live status of every
+# station all come from the same event timeline, so they agree with each other.
+#
+# simulate_sessions.py is the command-line entry point.
+
+import heapq
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from batch_simulator import (
+    DEFAULT_LEVEL_P,
+    HOURLY_ARRIVAL_P,
+    LEVEL_MEDIAN_MIN,
+    LEVEL_POWER_KW,
+    LEVEL_PRICE_USD,
+    session_ids,
+)
+from spans import timed
+
+STATION_STATUS_JSON = "data/station_status.json"
+
+# Columns of the simulated session log: the charging_log.csv columns plus the
+# queueing detail only this simulator knows
+EVENT_SESSION_COLUMNS = [
+    "session_id", "station_id", "start_time", "duration_min", "energy_kwh", "cost_usd",
+    "charger_level", "availability", "arrival_time", "wait_min", "end_time",
+]
+
+
+class OccupancyResult:
+    # sessions: one row per served vehicle
+    # utilization: one row per (station_id, charger_level)
+    # status: station_id -> live state at the end of the horizon
+
+    def __init__(self, sessions, utilization, status, as_of):
+        self.sessions = sessions
+        self.utilization = utilization
+        self.status = status
+        self.as_of = as_of
+
+    def status_records(self):
+        # JSON-friendly snapshot, the format read back by data_cache
+        return {
+            "as_of": self.as_of.isoformat(),
+            "stations": {str(sid): state for sid, state in self.status.items()},
+        }
+
+
+def _station_levels(stations):
+    ids, levels = [], []
+    for s in stations:
+        sid = s.get("station_id") or s.get("id")
+        if sid is None or sid == "":
+            continue
+        ids.append(sid)
+        lvls = sorted({lvl for lvl in (s.get("charger_levels") or []) if lvl in (1, 2, 3)})
+        levels.append(lvls)
+    return ids, levels
+
+
+@timed("sim.occupancy")
+def simulate_occupancy(stations, days=30, start=None, seed=0, ports_per_level=2,
+                       arrivals_per_port_per_day=4.0, max_queue=3, offline_fraction=0.05):
+    # stations: ev_api_results.json style records (id + charger_levels)
+    rng = np.random.default_rng(seed)
+    if start is None:
+        start = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = pd.Timestamp(start)
+    horizon = days * 1440.0  # minutes
+
+    ids, level_lists = _station_levels(stations)
+    n_stations = len(ids)
+    # Stations without level info get one level drawn from the usual mix
+    for i, lvls in enumerate(level_lists):
+        if not lvls:
+            level_lists[i] = [int(rng.choice([1, 2, 3], p=DEFAULT_LEVEL_P))]
+    n_levels = np.array([len(lvls) for lvls in level_lists], dtype=np.int64)
+    level_table = np.zeros((n_stations, 3), dtype=np.int64)
+    for i, lvls in enumerate(level_lists):
+        level_table[i, :len(lvls)] = lvls
+    offline = rng.random(n_stations) < offline_fraction
+
+    # ----------------------------
+    # All arrivals drawn up front (vectorized), then replayed in time order
+    # ----------------------------
+    rates = arrivals_per_port_per_day * ports_per_level * n_levels * days
+    counts = rng.poisson(rates)
+    station = np.repeat(np.arange(n_stations), counts)
+    n = len(station)
+    arrival = (rng.integers(0, days, n) * 1440.0
+               + rng.choice(24, size=n, p=HOURLY_ARRIVAL_P) * 60.0
+               + rng.random(n) * 60.0)
+    level = level_table[station, (rng.random(n) * n_levels[station]).astype(np.int64)]
+    duration = np.clip(np.rint(LEVEL_MEDIAN_MIN[level] * rng.lognormal(0.0, 0.45, n)), 5, 720)
+    pull = rng.uniform(0.55, 0.95, n)
+    price = rng.uniform(0.9, 1.1, n)
+
+    order = np.argsort(arrival, kind="stable")
+    station, arrival, level, duration = station[order], arrival[order], level[order], duration[order]
+    pull, price = pull[order], price[order]
+
+    # ----------------------------
+    # Event loop: the heap only holds departures, so it never outgrows the port count
+    # ----------------------------
+    arrival_list, station_list, level_list = arrival.tolist(), station.tolist(), level.tolist()
+    duration_list = duration.tolist()
+    busy = {}     # (station, level) -> ports in use
+    queues = {}   # (station, level) -> deque of arrival indices
+    service_start = np.full(n, np.nan)
+    queued_on_arrival = np.zeros(n, dtype=bool)
+    turned_away = np.zeros(n_stations, dtype=np.int64)
+    departures = []  # (end_minute, arrival index, station, level)
+
+    def begin(i, t):
+        service_start[i] = t
+        heapq.heappush(departures, (t + duration_list[i], i, station_list[i], level_list[i]))
+
+    def depart_until(t):
+        while departures and departures[0][0] <= t:
+            end, _, s, lvl = heapq.heappop(departures)
+            q = queues.get((s, lvl))
+            if q:
+                begin(q.popleft(), end)  # port handed straight to the next in line
+            else:
+                busy[(s, lvl)] -= 1
+
+    for i in range(n):
+        t, s, lvl = arrival_list[i], station_list[i], level_list[i]
+        depart_until(t)
+        if offline[s]:
+            turned_away[s] += 1
+            continue
+        key = (s, lvl)
+        in_use = busy.get(key, 0)
+        if in_use < ports_per_level:
+            busy[key] = in_use + 1
+            begin(i, t)
+        elif len(queues.setdefault(key, deque())) < max_queue:
+            queued_on_arrival[i] = True
+            queues[key].append(i)
+        else:
+            turned_away[s] += 1
+
+    # Snapshot at the end of the horizon, then let the remaining sessions finish
+    depart_until(horizon)
+    status = {}
+    for s in range(n_stations):
+        total = ports_per_level * int(n_levels[s])
+        in_use = sum(busy.get((s, lvl), 0) for lvl in level_lists[s])
+        waiting = sum(len(queues.get((s, lvl), ())) for lvl in level_lists[s])
+        if offline[s]:
+            label = "Offline"
+        elif in_use < total:
+            label = "Available"
+        else:
+            label = "In use"
+        status[ids[s]] = {"availability": label, "ports_total": total,
+                          "ports_in_use": 0 if offline[s] else in_use, "queue": waiting}
+    depart_until(float("inf"))
+
+    # ----------------------------
+    # Results
+    # ----------------------------
+    # Served vehicles in the order they started charging
+    idx = np.flatnonzero(~np.isnan(service_start))
+    idx = idx[np.argsort(service_start[idx], kind="stable")]
+    begin_min = service_start[idx]
+    t0 = np.datetime64(start.to_datetime64(), "us")
+
+    def to_time(minutes):
+        return t0 + np.rint(minutes * 60e6).astype("timedelta64[us]")
+
+    energy = np.round(LEVEL_POWER_KW[level[idx]] * duration[idx] / 60 * pull[idx], 2)
+    sessions = pd.DataFrame({
+        "session_id": session_ids(1, len(idx)),
+        "station_id": np.asarray(ids, dtype=object)[station[idx]],
+        "start_time": to_time(begin_min),
+        "duration_min": duration[idx].astype(np.int64),
+        "energy_kwh": energy,
+        "cost_usd": np.round(energy * LEVEL_PRICE_USD[level[idx]] * price[idx], 2),
+        "charger_level": level[idx],
+        # what the driver found on arrival: a free port, or a queue
+        "availability": np.where(queued_on_arrival[idx], "In use", "Available").astype(object),
+        "arrival_time": to_time(arrival[idx]),
+        "wait_min": np.round(begin_min - arrival[idx], 1),
+        "end_time": to_time(begin_min + duration[idx]),
+    }, columns=EVENT_SESSION_COLUMNS)
+
+    # Busy port-minutes inside the horizon per (station, level)
+    busy_min = np.clip(begin_min + duration[idx], 0, horizon) - np.clip(begin_min, 0, horizon)
+    util = pd.DataFrame({"station": station[idx], "charger_level": level[idx],
+                         "busy_min": busy_min, "wait_min": begin_min - arrival[idx]})
+    utilization = util.groupby(["station", "charger_level"]).agg(
+        sessions=("busy_min", "size"), busy_min=("busy_min", "sum"), mean_wait_min=("wait_min", "mean"),
+    ).reset_index()
+    utilization["utilization"] = utilization["busy_min"] / (ports_per_level * horizon)
+    utilization["turned_away"] = turned_away[utilization["station"]]
+    utilization.insert(0, "station_id", np.asarray(ids, dtype=object)[utilization.pop("station")])
+
+    return OccupancyResult(sessions, utilization, status, as_of=(start + pd.Timedelta(minutes=horizon)).to_pydatetime())
+
+
+@timed("sim.write_status")
+def write_status(result, path=STATION_STATUS_JSON):
+    # Atomic write so the dashboard never reads a partial snapshot
+    from data_cache import write_json_atomic
+    write_json_atomic(path, result.status_records(), indent=2)
+
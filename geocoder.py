@@ -0,0 +1,426 @@
+# geocoder.py
+# Offline geocoding for the dashboard's location inputs. A query is answered,
+# in order, from:
+#   1. an in-process memo of exact query strings (repeat lookups on reruns
+#      are a dict hit)
+#   2. a "lat, lon" literal
+#   3. the local gazetteer: SF landmarks and neighbourhoods, California
+#      cities, station names and station addresses, matched exactly, by
+#      prefix, by word prefixes, then with a small typo allowance
+#   4. the on-disk SQLite cache of network answers, shared by every process
+#   5. optionally a network geocoder (Nominatim); off unless GEOCODE_NETWORK
+#      is set, since production has no outbound network
+#
+#   python geocoder.py "dolores park"
+
+import bisect
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+GEOCODE_DB = "data/geocode_cache.sqlite3"
+NEGATIVE_TTL = 24 * 60 * 60   # "not found" answers are retried after a day
+MAX_MEMO = 4096
+FUZZY_CUTOFF = 0.8
+
+# Lower ranks win when several places match equally well
+KIND_RANK = {"city": 0, "landmark": 1, "neighbourhood": 2, "station": 3, "address": 4}
+
+# (names, latitude, longitude, kind); the first name is the display name
+SF_PLACES = [
+    (("San Francisco", "SF"), 37.7749, -122.4194, "city"),
+    # Landmarks
+    (("Mission Dolores Park", "Dolores Park"), 37.7596, -122.4269, "landmark"),
+    (("Golden Gate Bridge",), 37.8199, -122.4783, "landmark"),
+    (("Golden Gate Park",), 37.7694, -122.4862, "landmark"),
+    (("Alcatraz Island", "Alcatraz"), 37.8267, -122.4230, "landmark"),
+    (("Fisherman's Wharf",), 37.8080, -122.4177, "landmark"),
+    (("Pier 39",), 37.8087, -122.4098, "landmark"),
+    (("Ferry Building",), 37.7955, -122.3937, "landmark"),
+    (("Union Square",), 37.7880, -122.4075, "landmark"),
+    (("Coit Tower",), 37.8024, -122.4058, "landmark"),
+    (("Lombard Street",), 37.8021, -122.4187, "landmark"),
+    (("Palace of Fine Arts",), 37.8029, -122.4484, "landmark"),
+    (("Oracle Park",), 37.7786, -122.3893, "landmark"),
+    (("Chase Center",), 37.7680, -122.3877, "landmark"),
+    (("Salesforce Tower",), 37.7897, -122.3972, "landmark"),
+    (("Salesforce Transit Center", "Transbay Transit Center"), 37.7895, -122.3969, "landmark"),
+    (("Transamerica Pyramid",), 37.7952, -122.4028, "landmark"),
+    (("San Francisco City Hall", "City Hall"), 37.7793, -122.4193, "landmark"),
+    (("Twin Peaks",), 37.7544, -122.4477, "landmark"),
+    (("Alamo Square",), 37.7764, -122.4346, "landmark"),
+    (("Painted Ladies",), 37.7762, -122.4328, "landmark"),
+    (("Moscone Center",), 37.7842, -122.4016, "landmark"),
+    (("Ocean Beach",), 37.7594, -122.5107, "landmark"),
+    (("Lands End",), 37.7876, -122.5050, "landmark"),
+    (("The Presidio", "Presidio"), 37.7989, -122.4662, "landmark"),
+    (("Crissy Field",), 37.8039, -122.4645, "landmark"),
+    (("Baker Beach",), 37.7936, -122.4836, "landmark"),
+    (("California Academy of Sciences", "Cal Academy"), 37.7699, -122.4661, "landmark"),
+    (("de Young Museum",), 37.7715, -122.4687, "landmark"),
+    (("SFMOMA", "San Francisco Museum of Modern Art"), 37.7857, -122.4011, "landmark"),
+    (("Exploratorium",), 37.8015, -122.3975, "landmark"),
+    (("Ghirardelli Square",), 37.8059, -122.4229, "landmark"),
+    (("Dragon Gate", "Chinatown Gate"), 37.7908, -122.4058, "landmark"),
+    (("Grace Cathedral",), 37.7919, -122.4134, "landmark"),
+    (("Japanese Tea Garden",), 37.7702, -122.4701, "landmark"),
+    (("San Francisco Zoo", "SF Zoo"), 37.7330, -122.5030, "landmark"),
+    (("Stonestown Galleria",), 37.7285, -122.4767, "landmark"),
+    (("San Francisco State University", "SF State"), 37.7241, -122.4783, "landmark"),
+    (("UCSF Parnassus",), 37.7631, -122.4586, "landmark"),
+    (("UCSF Mission Bay",), 37.7680, -122.3920, "landmark"),
+    (("Caltrain 4th and King", "4th and King"), 37.7764, -122.3943, "landmark"),
+    (("Powell Street Station",), 37.7844, -122.4079, "landmark"),
+    (("Civic Center Station",), 37.7797, -122.4139, "landmark"),
+    (("16th Street Mission Station",), 37.7650, -122.4197, "landmark"),
+    (("24th Street Mission Station",), 37.7522, -122.4184, "landmark"),
+    (("Glen Park Station",), 37.7331, -122.4339, "landmark"),
+    (("Balboa Park Station",), 37.7215, -122.4474, "landmark"),
+    (("San Francisco International Airport", "SFO"), 37.6213, -122.3790, "landmark"),
+    (("Bernal Heights Park",), 37.7432, -122.4146, "landmark"),
+    (("Buena Vista Park",), 37.7681, -122.4417, "landmark"),
+    (("Lafayette Park",), 37.7915, -122.4276, "landmark"),
+    (("Washington Square",), 37.8008, -122.4101, "landmark"),
+    (("Yerba Buena Gardens",), 37.7850, -122.4025, "landmark"),
+    (("Kezar Stadium",), 37.7668, -122.4571, "landmark"),
+    (("Cow Palace",), 37.7071, -122.4196, "landmark"),
+    (("Candlestick Point",), 37.7136, -122.3861, "landmark"),
+    (("Treasure Island",), 37.8235, -122.3706, "landmark"),
+    (("Lake Merced",), 37.7200, -122.4880, "landmark"),
+    # Neighbourhoods
+    (("Mission District", "The Mission"), 37.7599, -122.4148, "neighbourhood"),
+    (("Castro", "The Castro"), 37.7609, -122.4350, "neighbourhood"),
+    (("Noe Valley",), 37.7502, -122.4337, "neighbourhood"),
+    (("Haight-Ashbury", "Upper Haight"), 37.7692, -122.4481, "neighbourhood"),
+    (("Lower Haight",), 37.7720, -122.4310, "neighbourhood"),
+    (("Hayes Valley",), 37.7759, -122.4245, "neighbourhood"),
+    (("SoMa", "South of Market"), 37.7785, -122.4056, "neighbourhood"),
+    (("Financial District", "FiDi"), 37.7946, -122.3999, "neighbourhood"),
+    (("North Beach",), 37.8061, -122.4103, "neighbourhood"),
+    (("Chinatown",), 37.7941, -122.4078, "neighbourhood"),
+    (("Nob Hill",), 37.7930, -122.4161, "neighbourhood"),
+    (("Russian Hill",), 37.8011, -122.4194, "neighbourhood"),
+    (("Telegraph Hill",), 37.8010, -122.4058, "neighbourhood"),
+    (("Pacific Heights",), 37.7925, -122.4382, "neighbourhood"),
+    (("Presidio Heights",), 37.7886, -122.4530, "neighbourhood"),
+    (("Laurel Heights",), 37.7850, -122.4500, "neighbourhood"),
+    (("Marina District", "The Marina"), 37.8037, -122.4368, "neighbourhood"),
+    (("Cow Hollow",), 37.7979, -122.4370, "neighbourhood"),
+    (("Sea Cliff",), 37.7870, -122.4900, "neighbourhood"),
+    (("Richmond District", "The Richmond"), 37.7800, -122.4830, "neighbourhood"),
+    (("Inner Richmond",), 37.7800, -122.4640, "neighbourhood"),
+    (("Outer Richmond",), 37.7770, -122.4950, "neighbourhood"),
+    (("Sunset District", "The Sunset"), 37.7534, -122.4944, "neighbourhood"),
+    (("Inner Sunset",), 37.7610, -122.4690, "neighbourhood"),
+    (("Outer Sunset",), 37.7550, -122.4940, "neighbourhood"),
+    (("Parkside",), 37.7420, -122.4890, "neighbourhood"),
+    (("Cole Valley",), 37.7654, -122.4500, "neighbourhood"),
+    (("Duboce Triangle",), 37.7670, -122.4320, "neighbourhood"),
+    (("Tenderloin",), 37.7847, -122.4141, "neighbourhood"),
+    (("Civic Center",), 37.7795, -122.4178, "neighbourhood"),
+    (("Western Addition", "Fillmore"), 37.7811, -122.4318, "neighbourhood"),
+    (("Japantown",), 37.7854, -122.4294, "neighbourhood"),
+    (("Potrero Hill",), 37.7605, -122.4009, "neighbourhood"),
+    (("Dogpatch",), 37.7605, -122.3892, "neighbourhood"),
+    (("Mission Bay",), 37.7706, -122.3915, "neighbourhood"),
+    (("Rincon Hill",), 37.7858, -122.3930, "neighbourhood"),
+    (("South Beach",), 37.7820, -122.3900, "neighbourhood"),
+    (("Bernal Heights",), 37.7390, -122.4156, "neighbourhood"),
+    (("Glen Park",), 37.7340, -122.4330, "neighbourhood"),
+    (("Diamond Heights",), 37.7440, -122.4400, "neighbourhood"),
+    (("Excelsior",), 37.7245, -122.4256, "neighbourhood"),
+    (("Portola",), 37.7270, -122.4080, "neighbourhood"),
+    (("Bayview", "Hunters Point", "Bayview-Hunters Point"), 37.7296, -122.3848, "neighbourhood"),
+    (("Visitacion Valley",), 37.7135, -122.4051, "neighbourhood"),
+    (("Crocker-Amazon",), 37.7110, -122.4380, "neighbourhood"),
+    (("Outer Mission",), 37.7230, -122.4450, "neighbourhood"),
+    (("Ingleside",), 37.7230, -122.4550, "neighbourhood"),
+    (("Oceanview",), 37.7160, -122.4570, "neighbourhood"),
+    (("West Portal",), 37.7408, -122.4655, "neighbourhood"),
+    (("Forest Hill",), 37.7480, -122.4630, "neighbourhood"),
+    (("Miraloma Park",), 37.7370, -122.4500, "neighbourhood"),
+    (("St. Francis Wood",), 37.7350, -122.4680, "neighbourhood"),
+]
+
+# Cities for route planning beyond SF (same layout as SF_PLACES)
+CA_CITIES = [
+    (("Oakland",), 37.8044, -122.2712, "city"),
+    (("Berkeley",), 37.8716, -122.2727, "city"),
+    (("San Jose",), 37.3382, -121.8863, "city"),
+    (("Palo Alto",), 37.4419, -122.1430, "city"),
+    (("Santa Cruz",), 36.9741, -122.0308, "city"),
+    (("Monterey",), 36.6002, -121.8947, "city"),
+    (("Napa",), 38.2975, -122.2869, "city"),
+    (("Santa Rosa",), 38.4404, -122.7141, "city"),
+    (("Sacramento",), 38.5816, -121.4944, "city"),
+    (("South Lake Tahoe", "Lake Tahoe", "Tahoe"), 38.9399, -119.9772, "city"),
+    (("Reno",), 39.5296, -119.8138, "city"),
+    (("Fresno",), 36.7378, -119.7871, "city"),
+    (("Bakersfield",), 35.3733, -119.0187, "city"),
+    (("Los Angeles", "LA"), 34.0522, -118.2437, "city"),
+    (("San Diego",), 32.7157, -117.1611, "city"),
+    (("Redding",), 40.5865, -122.3917, "city"),
+    (("Eureka",), 40.8021, -124.1637, "city"),
+]
+
+# Trailing address parts that carry no information inside the gazetteer
+_PLACE_SUFFIXES = {"san francisco", "sf", "ca", "california", "usa", "us", "united states"}
+_ABBREVIATIONS = {
+    "st": "street", "ave": "avenue", "av": "avenue", "blvd": "boulevard", "rd": "road",
+    "dr": "drive", "ln": "lane", "pl": "place", "ct": "court", "hwy": "highway",
+    "sq": "square", "pk": "park", "mt": "mount", "n": "north", "s": "south",
+    "e": "east", "w": "west", "&": "and",
+}
+_COORDS = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*[, ]\s*(-?\d+(?:\.\d+)?)\s*$")
+_ZIP = re.compile(r"^(ca )?\d{5}(-\d{4})?$")
+
+
+def normalize(text):
+    # Comparable form of a place name or query: lowercase words, abbreviations
+    # expanded, trailing ", San Francisco, CA 94103"-style parts and a leading
+    # "the" dropped. "Fisherman's Wharf, SF" -> "fishermans wharf".
+    parts = [re.sub(r"[^a-z0-9& ]+", " ", p.replace("'", "")).strip()
+             for p in str(text or "").lower().split(",")]
+    parts = [p for p in parts if p]
+    while len(parts) > 1 and (parts[-1] in _PLACE_SUFFIXES or _ZIP.match(parts[-1])):
+        parts.pop()
+    words = " ".join(parts).replace("&", " & ").split()
+    words = [_ABBREVIATIONS.get(w, w) for w in words]
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def parse_coords(text):
+    # (lat, lon) for a "37.77, -122.42" query, else None
+    m = _COORDS.match(str(text or ""))
+    if not m:
+        return None
+    lat, lon = float(m.group(1)), float(m.group(2))
+    return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+
+
+class Gazetteer:
+    # In-memory place list searched through sorted keys, so exact and prefix
+    # matches are binary searches rather than scans
+
+    def __init__(self, places):
+        # places: [(names, lat, lon, kind), ...]
+        self.names, self.coords, self.ranks = [], [], []
+        keys, tokens = {}, {}
+        for names, lat, lon, kind in places:
+            i = len(self.names)
+            self.names.append(names[0])
+            self.coords.append((float(lat), float(lon)))
+            self.ranks.append(KIND_RANK.get(kind, len(KIND_RANK)))
+            for name in names:
+                key = normalize(name)
+                if not key:
+                    continue
+                keys.setdefault(key, []).append(i)
+                for word in key.split():
+                    tokens.setdefault(word, set()).add(i)
+        self._exact = {k: min(ids, key=self._order) for k, ids in keys.items()}
+        self._keys = sorted(keys)
+        self._key_ids = [keys[k] for k in self._keys]
+        self._tokens = sorted(tokens)
+        self._token_ids = [tokens[t] for t in self._tokens]
+
+    @classmethod
+    def from_stations(cls, stations, places=SF_PLACES + CA_CITIES):
+        # Built-in places plus each station's title and address (records shaped
+        # like data/ev_api_results.json)
+        extra = []
+        for s in stations:
+            lat, lon = s.get("latitude", s.get("lat")), s.get("longitude", s.get("lon"))
+            if lat is None or lon is None:
+                continue
+            title = s.get("title") or s.get("name")
+            if title:
+                extra.append(((title,), lat, lon, "station"))
+            if s.get("address"):
+                extra.append(((s["address"],), lat, lon, "address"))
+        return cls(list(places) + extra)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _order(self, i):
+        return (self.ranks[i], len(self.names[i]), i)
+
+    def _prefixed(self, sorted_keys, prefix):
+        # Range of sorted_keys starting with prefix
+        lo = bisect.bisect_left(sorted_keys, prefix)
+        hi = bisect.bisect_left(sorted_keys, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _word_matches(self, word):
+        # Places with a word starting with `word`; close spellings when none do
+        lo, hi = self._prefixed(self._tokens, word)
+        positions = range(lo, hi)
+        if lo == hi and len(word) >= 4:
+            pool = self._tokens[slice(*self._prefixed(self._tokens, word[0]))]
+            close = difflib.get_close_matches(word, pool, n=3, cutoff=FUZZY_CUTOFF)
+            positions = [bisect.bisect_left(self._tokens, t) for t in close]
+        ids = set()
+        for i in positions:
+            ids |= self._token_ids[i]
+        return ids
+
+    def search(self, query, limit=5):
+        # Up to `limit` place indices, best first: exact name, then names that
+        # start with the query, then names containing a word starting with each
+        # query word (with a small typo allowance per word)
+        key = normalize(query)
+        if not key:
+            return []
+        found = []
+        exact = self._exact.get(key)
+        if exact is not None:
+            found.append(exact)
+        lo, hi = self._prefixed(self._keys, key)
+        found.extend(sorted({i for ids in self._key_ids[lo:hi] for i in ids} - set(found), key=self._order))
+        if len(found) < limit:
+            words = key.split()
+            ids = self._word_matches(words[0])
+            for word in words[1:]:
+                if not ids:
+                    break
+                ids &= self._word_matches(word)
+            found.extend(sorted(ids - set(found), key=self._order))
+        return found[:limit]
+
+    def lookup(self, query):
+        # (lat, lon) of the best match, or None
+        hits = self.search(query, limit=1)
+        return self.coords[hits[0]] if hits else None
+
+
+class GeocodeCache:
+    # Network answers in SQLite, keyed by normalized query. WAL mode lets any
+    # number of dashboard processes read while one writes.
+
+    def __init__(self, path=GEOCODE_DB, negative_ttl=NEGATIVE_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " query TEXT PRIMARY KEY, latitude REAL, longitude REAL, source TEXT, updated REAL)"
+        )
+
+    def get(self, key):
+        # (lat, lon) for a cached hit, None for a cached "not found" that is
+        # still fresh; raises KeyError when there is no usable entry
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, updated FROM geocode WHERE query = ?", (key,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        lat, lon, updated = row
+        if lat is None:
+            if time.time() - updated > self.negative_ttl:
+                raise KeyError(key)
+            return None
+        return (lat, lon)
+
+    def put(self, key, coords, source):
+        lat, lon = coords if coords is not None else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode (query, latitude, longitude, source, updated) VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lon, source, time.time()),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+
+def nominatim_geocoder(user_agent="ev-charging-monitor", timeout=3):
+    # Network lookup: query -> (lat, lon) or None when the place is unknown.
+    # Raises on network errors, so failures are not cached as "not found".
+    from geopy.geocoders import Nominatim
+
+    geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+
+    def lookup(query):
+        loc = geolocator.geocode(query)
+        return (float(loc.latitude), float(loc.longitude)) if loc else None
+    return lookup
+
+
+def network_from_env():
+    # The optional network fallback, enabled with GEOCODE_NETWORK=nominatim
+    if os.getenv("GEOCODE_NETWORK", "").lower() == "nominatim":
+        return nominatim_geocoder()
+    return None
+
+
+class Geocoder:
+    # Memo -> coordinates literal -> gazetteer -> SQLite cache -> network
+
+    def __init__(self, gazetteer, cache=None, network=None):
+        self.gazetteer = gazetteer
+        self.cache = cache
+        self.network = network
+        self._memo = {}
+
+    def geocode(self, query):
+        # (lat, lon) or None
+        try:
+            return self._memo[query]
+        except KeyError:
+            pass
+        key = normalize(query)
+        if not key:
+            return None
+        coords = parse_coords(query) or self.gazetteer.lookup(key)
+        if coords is None:
+            try:
+                coords = self._from_cache_or_network(query, key)
+            except LookupError:
+                return None  # network failed: not remembered, the next call retries
+        if len(self._memo) >= MAX_MEMO:
+            self._memo.clear()
+        self._memo[query] = coords
+        return coords
+
+    def _from_cache_or_network(self, query, key):
+        if self.cache is not None:
+            try:
+                return self.cache.get(key)
+            except KeyError:
+                pass
+        if self.network is None:
+            return None
+        try:
+            coords = self.network(query)
+        except Exception as e:
+            raise LookupError(query) from e
+        if self.cache is not None:
+            self.cache.put(key, coords, "network")
+        return coords
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Look up a place offline")
+    parser.add_argument("query")
+    parser.add_argument("--stations", default="data/ev_api_results.json")
+    args = parser.parse_args()
+
+    with open(args.stations) as f:
+        gazetteer = Gazetteer.from_stations(json.load(f))
+    for i in gazetteer.search(args.query):
+        print(f"{gazetteer.names[i]}: {gazetteer.coords[i][0]:.5f}, {gazetteer.coords[i][1]:.5f}")
+    print(Geocoder(gazetteer, GeocodeCache(), network_from_env()).geocode(args.query))
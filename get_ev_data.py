@@ -1,88 +1,84 @@
-import os
-import requests
+import argparse
 import json
-import random
+import os
 from dotenv import load_dotenv
-from geopy.distance import geodesic
+from distance import attach_distances
+from data_cache import write_json_atomic
+from station_fetcher import (
+    FETCH_JOURNAL,
+    OCM_BASE_URL,
+    REGIONS,
+    TILE_DEG,
+    fetch_stations,
+    merge_stations,
+)
+from station_sync import sync_stations
 
 load_dotenv()
 api_key = os.getenv("OPENCHARGEMAP_API_KEY")
 
+STATIONS_JSON = "data/ev_api_results.json"
+
 # Simulated user location (example: near Mission Dolores Park)
 user_location = (37.7680, -122.4313)
 
-def is_in_san_francisco(lat, lon):
-    # Round bounding box around SF
-    return 37.58 <= lat <= 37.98 and -122.62 <= lon <= -122.25
+def load_existing(path=STATIONS_JSON):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
 
-# Connection level logic
-def parse_charger_levels(connections):
-    levels = set()
-    for conn in connections:
-        level_id = conn.get("LevelID")
-        if level_id:
-            levels.add(level_id)
-    return list(levels)
+# Fetch every station in a bounding box and merge it into the station file
+def fetch_ev_stations(bbox=REGIONS["SF"], tile_deg=TILE_DEG, base_url=OCM_BASE_URL, workers=8,
+                      out=STATIONS_JSON, replace=False, fresh=False):
+    def report(done, total, stations):
+        print(f"  tiles {done}/{total}, {stations} stations so far", end="\r", flush=True)
 
-# Simulated availability statuses
-AVAILABILITY_STATUSES = ["Available", "In use", "Offline"]
+    fetched = fetch_stations(bbox, tile_deg=tile_deg, base_url=base_url, api_key=api_key,
+                             workers=workers, journal_path=FETCH_JOURNAL, fresh=fresh, progress=report)
+    print(f"\nFetched {len(fetched)} stations.")
 
-# Fetch information from OpenCharge API within SF
-def fetch_ev_stations_sf():
-    url = "https://api.openchargemap.io/v3/poi/"
-    params = {
-        "output": "json",
-        "countrycode": "US",
-        "maxresults": 100,
-        "latitude": 37.7749,
-        "longitude": -122.4194,
-        "distance": 25,
-        "distanceunit": "Miles",
-        "compact": True,
-        "verbose": False, 
-        "key": api_key
-    }
-    
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        raw_data = response.json()
-        print(f"Fetched {len(raw_data)} stations total.")
+    stations = fetched if replace else merge_stations(load_existing(out), fetched)
+    # Distances for every station in one batched call
+    attach_distances(stations, user_location)
 
-        filtered_stations = []
+    # Atomic replace: the dashboard's cache sees the new mtime on its next rerun
+    write_json_atomic(out, stations, indent=2)
+    print(f"Saved {len(stations)} stations to {out}")
+    return stations
 
-# Connection station logic
-        for station in raw_data:
-            try:
-                lat = station["AddressInfo"]["Latitude"]
-                lon = station["AddressInfo"]["Longitude"]
-                if is_in_san_francisco(lat, lon):
-                    connections = station.get("Connections", [])
-                    charger_levels = parse_charger_levels(connections)
-                    if not charger_levels:
-                        continue
+# Incremental: only records modified since the last sync, logged as adds/updates/removals
+def sync_ev_stations(bbox=REGIONS["SF"], tile_deg=TILE_DEG, base_url=OCM_BASE_URL, workers=8,
+                     out=STATIONS_JSON, full=False):
+    changes = sync_stations(out, bbox, tile_deg=tile_deg, base_url=base_url, api_key=api_key,
+                            workers=workers, full=full, origin=user_location)
+    counts = {op: sum(c["op"] == op for c in changes) for op in ("add", "update", "remove")}
+    print(f"Synced {out}: {counts['add']} added, {counts['update']} updated, {counts['remove']} removed")
+    return changes
 
-                    distance = geodesic(user_location, (lat,lon)).miles
+# Original entry point: San Francisco only
+def fetch_ev_stations_sf():
+    return fetch_ev_stations(REGIONS["SF"], tile_deg=0.1)
 
-                    station_info = {
-                        "id": station["ID"],
-                        "title": station["AddressInfo"]["Title"],
-                        "latitude": lat,
-                        "longitude": lon,
-                        "charger_levels": charger_levels,
-                        "availability": random.choice(AVAILABILITY_STATUSES),
-                        "distance_miles": round(distance, 2),
-                    }
-                    filtered_stations.append(station_info)
-            except (KeyError, TypeError):
-                continue
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch charging stations from OpenChargeMap")
+    parser.add_argument("--region", choices=sorted(REGIONS), default="SF")
+    parser.add_argument("--bbox", help="south,west,north,east (overrides --region)")
+    parser.add_argument("--tile-deg", type=float, default=None, help="tile size in degrees")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--base-url", default=OCM_BASE_URL, help="API root, e.g. a local mock server")
+    parser.add_argument("--out", default=STATIONS_JSON)
+    parser.add_argument("--replace", action="store_true", help="overwrite instead of merging by station id")
+    parser.add_argument("--fresh", action="store_true", help="ignore an interrupted run's journal")
+    parser.add_argument("--sync", action="store_true", help="fetch only what changed since the last sync")
+    parser.add_argument("--full", action="store_true", help="with --sync: refetch everything, detect removals")
+    args = parser.parse_args()
 
-        print(f"Filtered to {len(filtered_stations)} SF stations.")
-        os.makedirs("data", exist_ok=True)
-        with open("data/ev_api_results.json", "w") as f:
-            json.dump(filtered_stations, f, indent=2)
-        print("Saved filtered data to data/ev_api_results.json")
+    bbox = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else REGIONS[args.region]
+    tile_deg = args.tile_deg or (0.1 if args.region == "SF" and not args.bbox else TILE_DEG)
+    if args.sync:
+        sync_ev_stations(bbox, tile_deg=tile_deg, base_url=args.base_url, workers=args.workers,
+                         out=args.out, full=args.full)
     else:
-        print("Failed to fetch data:", response.status_code)
-        
-if __name__ == "__main__":
-    fetch_ev_stations_sf()
\ No newline at end of file
+        fetch_ev_stations(bbox, tile_deg=tile_deg, base_url=args.base_url, workers=args.workers,
+                          out=args.out, replace=args.replace, fresh=args.fresh)
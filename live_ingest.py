@@ -0,0 +1,199 @@
+# live_ingest.py
+# Tail-follow ingestion of the live session log. Each poll parses only what was
+# appended since the last one (byte offset into the CSV, or new Parquet files in
+# the session store), so a refresh costs the same no matter how big the log is.
+# New rows are read in bounded batches, and a tail keeps only totals and the
+# most recent rows, so catching up on a large log needs no more memory than one
+# batch.
+
+import abc
+import io
+import os
+
+import pandas as pd
+
+from session_store import PARTITIONING, SESSION_STORE_DIR, SESSION_SCHEMA, restore_station_ids
+
+SUM_COLUMNS = ("energy_kwh", "cost_usd", "duration_min")
+READ_BLOCK_BYTES = 16 * 1024 * 1024   # CSV bytes parsed per batch
+READ_BATCH_ROWS = 250_000             # Parquet rows per batch
+RECENT_ROWS = 1_000                   # rows a tail keeps for tail()
+CHECK_BYTES = 256                     # bytes before the offset re-read to spot a rewrite
+
+
+class RunningAggregates:
+    # Totals kept up to date one batch at a time
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.sessions = 0
+        self.sums = {col: 0.0 for col in SUM_COLUMNS}
+        self.sessions_per_station = pd.Series(dtype="int64")
+
+    def update(self, batch):
+        if batch.empty:
+            return
+        self.sessions += len(batch)
+        for col in SUM_COLUMNS:
+            if col in batch.columns:
+                self.sums[col] += float(pd.to_numeric(batch[col], errors="coerce").sum())
+        if "station_id" in batch.columns:
+            counts = batch["station_id"].value_counts()
+            self.sessions_per_station = self.sessions_per_station.add(counts, fill_value=0).astype("int64")
+
+
+class _Tail(abc.ABC):
+    # Keeps running totals and the last `keep_rows` rows, never the whole log.
+    # batches() hands out the new rows one bounded batch at a time; consumers
+    # that need every row (e.g. rollups) fold each batch in as it comes.
+
+    def __init__(self, keep_rows=RECENT_ROWS):
+        self.totals = RunningAggregates()
+        self.keep_rows = keep_rows
+        self._recent = []
+        self._recent_rows = 0
+
+    def _ingest(self, batch):
+        if batch.empty:
+            return batch
+        self.totals.update(batch)
+        self._recent.append(batch.tail(self.keep_rows))
+        self._recent_rows += len(self._recent[-1])
+        while self._recent_rows - len(self._recent[0]) >= self.keep_rows:
+            self._recent_rows -= len(self._recent.pop(0))
+        return batch
+
+    def _reset(self):
+        self.totals.reset()
+        self._recent = []
+        self._recent_rows = 0
+
+    @abc.abstractmethod
+    def batches(self):
+        # Yields the rows logged since the last call, one bounded DataFrame at a time
+        ...
+
+    def poll(self):
+        # All rows appended since the last poll as one frame; fine for a live
+        # log's trickle, but use batches() to catch up on a large backlog
+        new = list(self.batches())
+        return pd.concat(new, ignore_index=True) if new else pd.DataFrame()
+
+    def tail(self, n=20):
+        # Most recent n rows (at most keep_rows)
+        rows, picked = 0, []
+        for chunk in reversed(self._recent):
+            picked.append(chunk.tail(n - rows))
+            rows += len(picked[-1])
+            if rows >= n:
+                break
+        return pd.concat(reversed(picked), ignore_index=True) if picked else pd.DataFrame()
+
+
+class CsvLogTail(_Tail):
+    # Follows data/charging_log.csv by byte offset, reading at most
+    # block_bytes at a time. A partially written last line is left for the
+    # next poll. A truncated, replaced or rewritten file starts over: besides
+    # the inode and size, the header and the bytes just before the offset must
+    # still be what was read. The offset only moves past a block once it
+    # parses, so a failed parse is retried rather than skipped.
+
+    def __init__(self, csv_path="data/charging_log.csv", parse_dates=("start_time",), block_bytes=READ_BLOCK_BYTES,
+                 keep_rows=RECENT_ROWS):
+        super().__init__(keep_rows)
+        self.csv_path = csv_path
+        self.parse_dates = list(parse_dates)
+        self.block_bytes = block_bytes
+        self.offset = 0
+        self.columns = None
+        self._inode = None
+        self._header = b""    # the header line as read, newline included
+        self._last = b""      # up to CHECK_BYTES bytes ending at offset
+
+    def _reset(self):
+        super()._reset()
+        self.offset = 0
+        self.columns = None
+        self._header = b""
+        self._last = b""
+
+    def _unchanged(self, f):
+        # Whether the file still starts with the header read and still has the
+        # bytes last read right before offset
+        f.seek(0)
+        if f.read(len(self._header)) != self._header:
+            return False
+        f.seek(self.offset - len(self._last))
+        return f.read(len(self._last)) == self._last
+
+    def batches(self):
+        # Parses rows appended since the last poll, one block per batch
+        try:
+            st = os.stat(self.csv_path)
+        except OSError:
+            return
+
+        with open(self.csv_path, "rb") as f:
+            if st.st_ino != self._inode or st.st_size < self.offset or not self._unchanged(f):
+                self._reset()
+                self._inode = st.st_ino
+            while self.offset < st.st_size:
+                f.seek(self.offset)
+                chunk = f.read(min(self.block_bytes, st.st_size - self.offset))
+                end = chunk.rfind(b"\n") + 1
+                if end == 0:
+                    # a line longer than the block: finish it, if it is complete
+                    chunk += f.readline()
+                    end = chunk.rfind(b"\n") + 1
+                    if end == 0:
+                        return
+                chunk = chunk[:end]
+
+                header, columns, body = self._header, self.columns, chunk
+                if columns is None:
+                    line, _, body = chunk.partition(b"\n")
+                    header = line + b"\n"
+                    columns = line.decode("utf-8").strip().split(",")
+                batch = pd.DataFrame()
+                if body:
+                    dates = [c for c in self.parse_dates if c in columns]
+                    batch = pd.read_csv(io.BytesIO(body), header=None, names=columns, parse_dates=dates)
+
+                # parsed: only now move past the block
+                self._header, self.columns = header, columns
+                self.offset += end
+                self._last = chunk[-CHECK_BYTES:]
+                if body:
+                    yield self._ingest(batch)
+
+
+class StoreTail(_Tail):
+    # Follows the Parquet session store by picking up files not seen before,
+    # batch_rows rows at a time (each batch in start_time order)
+
+    def __init__(self, root=SESSION_STORE_DIR, batch_rows=READ_BATCH_ROWS, keep_rows=RECENT_ROWS):
+        super().__init__(keep_rows)
+        self.root = root
+        self.batch_rows = batch_rows
+        self.seen = set()
+
+    def batches(self):
+        import pyarrow.dataset as ds
+
+        new_files = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                if name.endswith(".parquet") and path not in self.seen:
+                    new_files.append(path)
+        if not new_files:
+            return
+        self.seen.update(new_files)
+        dataset = ds.dataset(sorted(new_files), format="parquet", partitioning=PARTITIONING,
+                             partition_base_dir=self.root)
+        for batch in dataset.to_batches(columns=SESSION_SCHEMA.names, batch_size=self.batch_rows):
+            if batch.num_rows:
+                batch = restore_station_ids(batch.to_pandas())
+                yield self._ingest(batch.sort_values("start_time", kind="stable", ignore_index=True))
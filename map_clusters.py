@@ -0,0 +1,164 @@
+# map_clusters.py
+# Server-side clustering for large station sets. Every station is bucketed into
+# a Web Mercator grid cell per zoom level (computed once per station file); a
+# render only aggregates the cells inside the current viewport, so the browser
+# receives a few hundred clusters and markers instead of every station. Popup
+# HTML is built only for the station that was clicked.
+
+import numpy as np
+
+MIN_ZOOM, MAX_ZOOM = 3, 18
+CELL_PX = 80       # on-screen size of one cluster cell
+TILE_PX = 256
+VIEW_PADDING = 0.25  # fraction of the viewport added on each side
+
+
+def mercator_xy(lats, lons):
+    # Normalized Web Mercator coordinates in [0, 1] (x east, y south)
+    x = (np.asarray(lons, dtype=np.float64) + 180.0) / 360.0
+    s = np.clip(np.sin(np.radians(np.asarray(lats, dtype=np.float64))), -0.9999, 0.9999)
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)
+    return x, y
+
+
+def viewport_bounds(center, zoom, width_px=900, height_px=700):
+    # (south, west, north, east) a map of that size shows around center at zoom
+    x, y = mercator_xy([center[0]], [center[1]])
+    half_w = width_px / 2 / (TILE_PX * 2 ** zoom)
+    half_h = height_px / 2 / (TILE_PX * 2 ** zoom)
+    ys = np.array([y[0] + half_h, y[0] - half_h])
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * ys))))
+    return (float(lats[0]), float((x[0] - half_w) * 360 - 180),
+            float(lats[1]), float((x[0] + half_w) * 360 - 180))
+
+
+def parse_bounds(bounds):
+    # st_folium's {"_southWest": {...}, "_northEast": {...}} -> (south, west, north, east)
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        box = (float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return box if all(np.isfinite(box)) else None
+
+
+class ViewportClusters:
+    # One row per cluster or single station in view. position is the station's
+    # table position for singletons and -1 for clusters of two or more.
+
+    def __init__(self, lat, lon, count, position):
+        self.lat = lat
+        self.lon = lon
+        self.count = count
+        self.position = position
+
+    def __len__(self):
+        return len(self.lat)
+
+    def hit(self, lat, lon, tol=1e-6):
+        # Row index of the cluster/marker drawn at (lat, lon), or None
+        if not len(self):
+            return None
+        i = int(np.argmin(np.abs(self.lat - lat) + np.abs(self.lon - lon)))
+        return i if abs(self.lat[i] - lat) + abs(self.lon[i] - lon) <= tol else None
+
+
+class ClusterIndex:
+    # Grid cells per zoom for every station with coordinates; positions match
+    # the StationTable the index was built from
+
+    def __init__(self, lats, lons):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.valid = np.isfinite(self.lats) & np.isfinite(self.lons)
+        x, y = mercator_xy(np.where(self.valid, self.lats, 0.0), np.where(self.valid, self.lons, 0.0))
+        self.cells = {}
+        for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+            per_axis = TILE_PX * 2 ** zoom // CELL_PX + 1
+            cx = np.minimum((x * per_axis).astype(np.int64), per_axis - 1)
+            cy = np.minimum((y * per_axis).astype(np.int64), per_axis - 1)
+            self.cells[zoom] = cy * per_axis + cx
+
+    @classmethod
+    def from_table(cls, table):
+        return cls(table.latitude, table.longitude)
+
+    def query(self, zoom, bounds=None, mask=None):
+        # Clusters of the stations selected by mask inside bounds (padded), at zoom
+        zoom = int(np.clip(round(zoom), MIN_ZOOM, MAX_ZOOM))
+        sel = self.valid.copy()
+        if mask is not None:
+            sel &= mask
+        box = parse_bounds(bounds) if isinstance(bounds, dict) else bounds
+        if box is not None:
+            south, west, north, east = box
+            pad_lat, pad_lon = (north - south) * VIEW_PADDING, (east - west) * VIEW_PADDING
+            sel &= (self.lats >= south - pad_lat) & (self.lats <= north + pad_lat)
+            sel &= (self.lons >= west - pad_lon) & (self.lons <= east + pad_lon)
+        idx = np.flatnonzero(sel)
+        if zoom == MAX_ZOOM:
+            ones = np.ones(len(idx), dtype=np.int64)
+            return ViewportClusters(self.lats[idx], self.lons[idx], ones, idx)
+
+        _, first, inverse, count = np.unique(self.cells[zoom][idx], return_index=True,
+                                             return_inverse=True, return_counts=True)
+        lat = np.bincount(inverse, weights=self.lats[idx]) / count
+        lon = np.bincount(inverse, weights=self.lons[idx]) / count
+        position = np.where(count == 1, idx[first], -1)
+        # singletons sit exactly on their station
+        single = count == 1
+        lat[single], lon[single] = self.lats[position[single]], self.lons[position[single]]
+        return ViewportClusters(lat, lon, count, position)
+
+
+def station_ranks(stations, sort_by="Distance", mask=None):
+    # "#i" rank of every station in sort order among the masked ones (0 = unranked)
+    positions = np.arange(len(stations)) if mask is None else np.flatnonzero(mask)
+    order = positions[stations.take(positions).sort_order(sort_by)]
+    ranks = np.zeros(len(stations), dtype=np.int64)
+    ranks[order] = np.arange(1, len(order) + 1)
+    return ranks
+
+
+_CLUSTER_CSS = """
+<style>
+.station-cluster {background: rgba(110, 204, 57, 0.75); border-radius: 50%; color: #fff;
+  font: bold 12px sans-serif; text-align: center; border: 3px solid rgba(181, 226, 140, 0.8);}
+.station-cluster.mid {background: rgba(240, 194, 12, 0.8); border-color: rgba(241, 211, 87, 0.8);}
+.station-cluster.big {background: rgba(241, 128, 23, 0.8); border-color: rgba(253, 156, 115, 0.8);}
+</style>
+"""
+
+
+def _cluster_icon(count):
+    import folium
+    size = 30 if count < 10 else 36 if count < 100 else 44
+    tier = "" if count < 10 else " mid" if count < 100 else " big"
+    return folium.DivIcon(
+        html=f'<div class="station-cluster{tier}" style="width:{size}px;height:{size}px;'
+             f'line-height:{size - 6}px">{count}</div>',
+        icon_size=(size, size), icon_anchor=(size // 2, size // 2),
+    )
+
+
+def render_viewport_map(stations, clusters, ranks, center, zoom, popup_position=None):
+    # Folium map with only the viewport's clusters and station markers. Markers
+    # carry no popup except popup_position, whose HTML is built on demand.
+    import folium
+    from charging_map import availability_color, station_popup_html
+
+    m = folium.Map(location=list(center), zoom_start=int(zoom))
+    m.get_root().header.add_child(folium.Element(_CLUSTER_CSS))
+    for i in range(len(clusters)):
+        location = [float(clusters.lat[i]), float(clusters.lon[i])]
+        pos = int(clusters.position[i])
+        if pos < 0:
+            count = int(clusters.count[i])
+            folium.Marker(location, icon=_cluster_icon(count), tooltip=f"{count} stations").add_to(m)
+            continue
+        popup = None
+        if pos == popup_position:
+            popup = folium.Popup(station_popup_html(stations, pos, int(ranks[pos])), show=True)
+        icon = folium.Icon(color=availability_color(stations.availability_label(pos)), icon="bolt", prefix="fa")
+        folium.Marker(location, popup=popup, icon=icon).add_to(m)
+    return m
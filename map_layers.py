@@ -0,0 +1,147 @@
+# map_layers.py
+# Cached map pieces for the dashboard's marker map. The base map (tiles and
+# plugin assets) is built once and never changes, so st_folium keeps the same
+# component, and the user's pan/zoom survives filter changes. Stations go in a separate layer
+# passed through feature_group_to_add:
+#   - each station's marker JavaScript is rendered once per (station, styling)
+#     and reused; a filter change renders only the stations that became
+#     visible, and the ones that left are simply not included
+#   - assembled marker scripts are cached by visible set, so switching back
+#     to an earlier filter, or changing only the sort order, rebuilds nothing
+# The "#i" sort rank is not part of the cached popups: the layer carries the
+# visible stations' ranks as one array, and the browser puts each into its
+# popup, so a sort change only sends new ranks.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import folium
+import numpy as np
+from folium.plugins import MarkerCluster
+from folium.template import Template
+
+from charging_map import availability_color, script_json, station_popup_html
+
+SF_CENTER = (37.7749, -122.4194)
+MAX_SNIPPETS = 200_000
+MAX_LAYERS = 16
+
+_lock = threading.Lock()
+# st_folium mutates what it renders: it attaches the layer to the shared base
+# map and renames the layer. Sessions run on their own threads, so renders of
+# the cached objects go one at a time.
+_render_lock = threading.Lock()
+_snippets = OrderedDict()   # (station_id, styling...) -> JS call adding one marker
+_layers = OrderedDict()     # (visible set digest, styling digest) -> markers JS
+_base_maps = {}
+
+
+class StationLayer(folium.FeatureGroup):
+    # A feature group whose markers are emitted from pre-rendered snippets
+    # instead of one folium Marker/Icon/Popup object tree per station.
+    # ranks: "#i" per marker, in snippet order (None: popups without ranks)
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.featureGroup({});
+            (function() {
+                var cluster = L.markerClusterGroup({}).addTo({{ this.get_name() }});
+                var icons = {};
+                var ranks = {{ this.ranks_js }};
+                var next = 0;
+                function add(location, color, html) {
+                    var rank = ranks && ranks[next++];
+                    if (rank) html = html.replace("<b>", "<b>#" + rank + " ");
+                    icons[color] = icons[color] || L.AwesomeMarkers.icon({
+                        markerColor: color, iconColor: "white", icon: "bolt", prefix: "fa",
+                        extraClasses: "fa-rotate-0"});
+                    cluster.addLayer(L.marker(location, {icon: icons[color]})
+                        .bindPopup(html, {maxWidth: "100%"}));
+                }
+                {{ this.markers_js }}
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, markers_js, count, ranks=None):
+        super().__init__(name="Stations")
+        self.markers_js = markers_js
+        self.count = count
+        self.ranks_js = script_json(ranks)
+
+
+def base_map(center=SF_CENTER, zoom=12):
+    # Tiles plus the marker-cluster/awesome-marker assets the layer relies on.
+    # The same object is returned every time, so its script never changes.
+    key = (tuple(center), zoom)
+    with _lock:
+        m = _base_maps.get(key)
+        if m is None:
+            m = folium.Map(location=list(center), zoom_start=zoom)
+            MarkerCluster().add_to(m)  # pulls in the Leaflet.markercluster JS/CSS
+            _base_maps[key] = m
+    return m
+
+
+def _marker_snippet(stations, pos):
+    distance = float(stations.distance_miles[pos])
+    key = (stations.id_at(pos), float(stations.latitude[pos]), float(stations.longitude[pos]),
+           str(stations.title[pos]), int(stations.level_mask[pos]), int(stations.availability[pos]),
+           None if np.isnan(distance) else distance)
+    with _lock:
+        js = _snippets.get(key)
+        if js is not None:
+            _snippets.move_to_end(key)
+            return js
+    html = station_popup_html(stations, pos, rank=None)
+    color = availability_color(stations.availability_label(pos))
+    js = f"add([{key[1]!r}, {key[2]!r}], {script_json(color)}, {script_json(html)});"
+    with _lock:
+        _snippets[key] = js
+        while len(_snippets) > MAX_SNIPPETS:
+            _snippets.popitem(last=False)
+    return js
+
+
+def _styling_digest(stations, positions):
+    # Everything a marker's look depends on, for the visible rows
+    h = hashlib.blake2b(digest_size=16)
+    for column in (stations.latitude, stations.longitude, stations.level_mask,
+                   stations.availability, stations.distance_miles):
+        h.update(np.ascontiguousarray(column[positions]).tobytes())
+    h.update("\x00".join(str(stations.id_at(p)) + str(stations.title[p]) for p in positions.tolist()).encode())
+    return h.hexdigest()
+
+
+def station_marker_layer(stations, visible, ranks=None):
+    # StationLayer for the rows selected by the boolean mask `visible`;
+    # ranks: optional "#i" per table row for the popups (map_clusters.station_ranks)
+    positions = np.flatnonzero(visible & stations.has_coords())
+    key = (hashlib.blake2b(positions.tobytes(), digest_size=16).hexdigest(),
+           _styling_digest(stations, positions))
+    with _lock:
+        markers_js = _layers.get(key)
+        if markers_js is not None:
+            _layers.move_to_end(key)
+    if markers_js is None:
+        markers_js = "\n".join(_marker_snippet(stations, p) for p in positions.tolist())
+        with _lock:
+            _layers[key] = markers_js
+            while len(_layers) > MAX_LAYERS:
+                _layers.popitem(last=False)
+    return StationLayer(markers_js, len(positions), None if ranks is None else ranks[positions].tolist())
+
+
+def show_station_map(layer, center=SF_CENTER, zoom=12, **kwargs):
+    # st_folium with the fixed base map and the station layer on top
+    from streamlit_folium import st_folium
+
+    m = base_map(center, zoom)
+    with _render_lock:
+        try:
+            return st_folium(m, feature_group_to_add=layer, **kwargs)
+        finally:
+            # st_folium attaches the layer to the map; detach it so the cached
+            # base map (and with it the component identity) stays unchanged
+            m._children.pop(layer.get_name(), None)
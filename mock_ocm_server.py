@@ -0,0 +1,201 @@
+# mock_ocm_server.py
+# Local stand-in for the OpenChargeMap API, for exercising the fetcher without
+# network access or an API key. Serves seeded synthetic POIs from /v3/poi/
+# (boundingbox, greaterthanid, maxresults, modifiedsince, sortby=id_asc) and
+# operator names from /v3/referencedata/, and can inject 429/503 failures.
+# edit()/remove()/add() change the catalogue while it is being served, for
+# exercising delta sync. /v3/status/?ids=7,14 reports live availability for the
+# station status poller (not an OpenChargeMap endpoint); every request moves
+# the stations it asks about one step along station_status.step_availability.
+#
+#   python mock_ocm_server.py --stations 20000 --region CA --fail-rate 0.05
+#   python get_ev_data.py --region CA --base-url http://127.0.0.1:8765/v3
+
+import argparse
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from station_fetcher import REGIONS
+from station_status import LIVE_LABEL_P, LIVE_LABELS, step_availability
+
+OPERATORS = {1: "ChargePoint", 2: "EVgo", 3: "Tesla", 4: "Blink", 5: "City of San Francisco"}
+_BBOX = re.compile(r"\(([-\d.]+),([-\d.]+)\),\(([-\d.]+),([-\d.]+)\)")
+OPERATIONAL_STATUS = 50
+REMOVED_STATUS = 200
+
+
+def _now():
+    return np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), "s")
+
+
+class MockCatalogue:
+    # Synthetic POIs held as columns so bbox/id/modified queries are vectorized
+
+    def __init__(self, n, bbox=REGIONS["SF"], seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.bbox = bbox
+        self.lock = threading.Lock()
+        self.ids = np.arange(1, n + 1) * 7  # sparse ids, like the real API
+        self.lats, self.lons = self._coords(n)
+        self.levels = self.rng.integers(1, 8, n)  # bitmask of levels 1..3
+        self.operators = self.rng.integers(1, len(OPERATORS) + 1, n)
+        self.status = np.full(n, OPERATIONAL_STATUS)
+        self.modified = np.full(n, np.datetime64("2024-01-01T00:00:00", "s"))
+        self.revision = np.zeros(n, dtype=np.int64)
+        self.availability = self.rng.choice(len(LIVE_LABELS), size=n, p=LIVE_LABEL_P).astype(np.int8)
+
+    def _coords(self, n):
+        south, west, north, east = self.bbox
+        return (np.round(self.rng.uniform(south, north, n), 6),
+                np.round(self.rng.uniform(west, east, n), 6))
+
+    # Mutations stamp DateLastStatusUpdate with the current time
+    def edit(self, positions):
+        with self.lock:
+            self.revision[positions] += 1
+            self.modified[positions] = _now()
+
+    def remove(self, positions):
+        with self.lock:
+            self.status[positions] = REMOVED_STATUS
+            self.modified[positions] = _now()
+
+    def add(self, n):
+        with self.lock:
+            lats, lons = self._coords(n)
+            first = int(self.ids[-1]) + 7 if len(self.ids) else 7
+            self.ids = np.append(self.ids, first + np.arange(n) * 7)
+            self.lats, self.lons = np.append(self.lats, lats), np.append(self.lons, lons)
+            self.levels = np.append(self.levels, self.rng.integers(1, 8, n))
+            self.operators = np.append(self.operators, self.rng.integers(1, len(OPERATORS) + 1, n))
+            self.status = np.append(self.status, np.full(n, OPERATIONAL_STATUS))
+            self.modified = np.append(self.modified, np.full(n, _now()))
+            self.revision = np.append(self.revision, np.zeros(n, dtype=np.int64))
+            self.availability = np.append(self.availability,
+                                          self.rng.choice(len(LIVE_LABELS), size=n, p=LIVE_LABEL_P).astype(np.int8))
+
+    def poi(self, i):
+        sid = int(self.ids[i])
+        return {
+            "ID": sid,
+            "OperatorID": int(self.operators[i]),
+            "AddressInfo": {
+                "Title": f"Mock Station {sid}" + (f" (rev {self.revision[i]})" if self.revision[i] else ""),
+                "AddressLine1": f"{100 + sid % 900} Market St",
+                "Town": "San Francisco",
+                "StateOrProvince": "CA",
+                "Postcode": "94103",
+                "Latitude": float(self.lats[i]),
+                "Longitude": float(self.lons[i]),
+            },
+            "Connections": [{"LevelID": lvl} for lvl in (1, 2, 3) if self.levels[i] & (1 << (lvl - 1))],
+            "StatusTypeID": int(self.status[i]),
+            "DateLastStatusUpdate": f"{self.modified[i]}Z",
+        }
+
+    def live_status(self, ids, change_p=0.2):
+        # {"as_of", "stations": {id: {"availability": label}}} for the known,
+        # operational ids among `ids`, in the event simulator's snapshot format
+        with self.lock:
+            positions = np.searchsorted(self.ids, ids)
+            positions = positions[positions < len(self.ids)]
+            positions = positions[np.isin(self.ids[positions], ids)]
+            positions = positions[self.status[positions] == OPERATIONAL_STATUS]
+            self.availability[positions] = step_availability(self.rng, self.availability[positions], change_p)
+            return {
+                "as_of": f"{_now()}Z",
+                "stations": {str(self.ids[i]): {"availability": LIVE_LABELS[self.availability[i]]}
+                             for i in positions.tolist()},
+            }
+
+    def query(self, bbox=None, greater_than_id=0, max_results=100, modified_since=None):
+        with self.lock:
+            return self._query(bbox, greater_than_id, max_results, modified_since)
+
+    def _query(self, bbox, greater_than_id, max_results, modified_since):
+        mask = self.ids > greater_than_id
+        if modified_since is not None:
+            mask &= self.modified >= modified_since
+        if bbox is not None:
+            lat1, lon1, lat2, lon2 = bbox
+            mask &= (self.lats >= min(lat1, lat2)) & (self.lats <= max(lat1, lat2))
+            mask &= (self.lons >= min(lon1, lon2)) & (self.lons <= max(lon1, lon2))
+        positions = np.flatnonzero(mask)[:max_results]  # ids are already ascending
+        return [self.poi(i) for i in positions]
+
+
+def make_handler(catalogue, fail_rate=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None):
+            payload = json.dumps(body).encode("utf-8") if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            with rng_lock:
+                fail = rng.random() < fail_rate
+                status = int(rng.choice([429, 503]))
+            if fail:
+                return self._send(status, {"error": "injected failure"})
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path.rstrip("/").endswith("/referencedata"):
+                return self._send(200, {"Operators": [{"ID": k, "Title": v} for k, v in OPERATORS.items()]})
+            if url.path.rstrip("/").endswith("/status"):
+                try:
+                    ids = np.array([int(v) for v in query.get("ids", "").split(",") if v], dtype=np.int64)
+                except ValueError:
+                    return self._send(400, {"error": "ids must be integers"})
+                return self._send(200, catalogue.live_status(ids))
+            if not url.path.rstrip("/").endswith("/poi"):
+                return self._send(404, {"error": "not found"})
+            bbox = None
+            match = _BBOX.fullmatch(query.get("boundingbox", "").replace(" ", ""))
+            if match:
+                bbox = tuple(float(v) for v in match.groups())
+            since = query.get("modifiedsince")
+            since = np.datetime64(since.rstrip("Z"), "s") if since else None
+            pois = catalogue.query(bbox, int(query.get("greaterthanid", 0)), int(query.get("maxresults", 100)), since)
+            self._send(200, pois)
+
+    return Handler
+
+
+def start_mock_server(catalogue, port=0, fail_rate=0.0, seed=0):
+    # Runs in a daemon thread; returns (server, base_url). server.shutdown() stops it.
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(catalogue, fail_rate, seed))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v3"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenChargeMap API")
+    parser.add_argument("--stations", type=int, default=5000)
+    parser.add_argument("--region", choices=sorted(REGIONS), default="SF")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(MockCatalogue(args.stations, REGIONS[args.region], args.seed),
+                                         args.port, args.fail_rate, args.seed)
+    print(f"Serving {args.stations} mock stations at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
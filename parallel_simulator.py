@@ -0,0 +1,116 @@
+# parallel_simulator.py
+# Multi-process session simulation. Stations are sharded across a process pool;
+# every station draws from its own RNG stream derived from (seed, station
+# position), so the merged log is identical for a given seed no matter how many
+# workers produced it.
+#
+#   python parallel_simulator.py --days 30 --sessions-per-day 12 --workers 8 --out data/load_test_sessions.csv
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from batch_simulator import (
+    DEFAULT_LEVEL_P,
+    SESSION_COLUMNS,
+    draw_sessions,
+    session_ids,
+    station_catalogue,
+    write_csv,
+    write_parquet,
+)
+from spans import span, timed
+
+
+def station_rng(seed, station_position):
+    # Independent, reproducible stream per station
+    return np.random.default_rng(np.random.SeedSequence([seed, station_position]))
+
+
+def simulate_station(position, level, start, days, sessions_per_day, seed):
+    # Column arrays for all of one station's sessions over the horizon (in draw order)
+    rng = station_rng(seed, position)
+    n = int(rng.poisson(sessions_per_day * days))
+    if level == 0:
+        level = int(rng.choice([1, 2, 3], p=DEFAULT_LEVEL_P))
+    return draw_sessions(n, level, start, days, rng)
+
+
+def _simulate_shard(shard, start, days, sessions_per_day, seed):
+    # One DataFrame for a shard, tagged with station position and per-station
+    # sequence so the parent can merge deterministically
+    parts, positions, seqs, ids = [], [], [], []
+    for pos, sid, lvl in shard:
+        cols = simulate_station(pos, lvl, start, days, sessions_per_day, seed)
+        n = len(cols["start_time"])
+        parts.append(cols)
+        positions.append(np.full(n, pos, dtype=np.int64))
+        seqs.append(np.arange(n))
+        ids.append(np.full(n, sid, dtype=object))
+    if not parts:
+        return pd.DataFrame(columns=[*SESSION_COLUMNS, "_station_pos", "_seq"])
+    df = pd.DataFrame({name: np.concatenate([p[name] for p in parts]) for name in parts[0]})
+    df["station_id"] = np.concatenate(ids)
+    df["_station_pos"] = np.concatenate(positions)
+    df["_seq"] = np.concatenate(seqs)
+    return df
+
+
+@timed("sim.parallel")
+def simulate_parallel(station_ids=None, station_levels=None, days=30, sessions_per_day=8.0,
+                      seed=0, workers=None, start=None):
+    # One time-ordered DataFrame (SESSION_COLUMNS) for every station over the horizon
+    if station_ids is None:
+        station_ids, station_levels = station_catalogue()
+    if station_levels is None:
+        station_levels = np.zeros(len(station_ids), dtype=np.int8)
+    if start is None:
+        # Fixed once here so every worker shares the same horizon
+        start = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    workers = workers or os.cpu_count() or 1
+
+    stations = list(zip(range(len(station_ids)), station_ids, (int(lvl) for lvl in station_levels)))
+    # Round-robin shards keep per-worker load even
+    shards = [stations[w::workers] for w in range(workers) if stations[w::workers]]
+    args = (start, days, sessions_per_day, seed)
+
+    if len(shards) <= 1:
+        parts = [_simulate_shard(shard, *args) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [pool.submit(_simulate_shard, shard, *args) for shard in shards]
+            parts = [f.result() for f in futures]
+
+    if not parts:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    # Merge into one log; ties on start_time break by station position, then the
+    # station's own order, so the result never depends on shard layout
+    with span("sim.merge_shards", shards=len(parts)):
+        merged = pd.concat(parts, ignore_index=True)
+        order = np.lexsort((merged["_seq"].to_numpy(), merged["_station_pos"].to_numpy(),
+                            merged["start_time"].to_numpy()))
+        merged = merged.take(order).reset_index(drop=True)
+        merged["session_id"] = session_ids(1, len(merged))
+    return merged[SESSION_COLUMNS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel per-station session simulator")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--start", type=datetime.fromisoformat, metavar="YYYY-MM-DD",
+                        help="first simulated day (default: --days before today)")
+    parser.add_argument("--sessions-per-day", type=float, default=8.0, help="mean sessions per station per day")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--out", default="data/load_test_sessions.csv")
+    args = parser.parse_args()
+
+    df = simulate_parallel(days=args.days, sessions_per_day=args.sessions_per_day,
+                           seed=args.seed, workers=args.workers, start=args.start)
+    rows = write_csv([df], args.out) if args.format == "csv" else write_parquet([df], args.out)
+    print(f"Simulated {rows} sessions across {df['station_id'].nunique()} stations -> {args.out}")
@@ -0,0 +1,253 @@
+# rollups.py
+# Materialized session rollups for the "Charging Stats" metrics and charts.
+# Sessions are folded into counts and sums per (station_id, day, hour) and
+# fixed-bin histograms per (station_id, day); per-station, per-day and per-hour
+# views and quantiles are answered from those instead of the raw session log.
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from live_ingest import CsvLogTail, StoreTail
+from session_store import SESSION_STORE_DIR, store_exists
+
+METRICS = ("energy_kwh", "cost_usd", "duration_min")
+KEYS = ["station_id", "day", "hour"]
+
+# Histogram bin edges per metric; values past the last edge land in the last bin
+N_BINS = 60
+HISTOGRAM_EDGES = {
+    "energy_kwh": np.linspace(0, 150, N_BINS + 1),
+    "cost_usd": np.linspace(0, 60, N_BINS + 1),
+    "duration_min": np.linspace(0, 600, N_BINS + 1),
+}
+# Sessions folded in per step, so a large first batch (the whole log) never
+# materializes more than this many rows of intermediates
+ROLLUP_CHUNK_ROWS = 250_000
+
+
+def _quantile_from_hist(counts, edges, q):
+    # Linear interpolation inside the bin that holds the q-th session
+    total = counts.sum()
+    if total == 0:
+        return float("nan")
+    cum = np.cumsum(counts)
+    target = q * total
+    i = int(np.searchsorted(cum, target, side="left"))
+    i = min(i, len(counts) - 1)
+    before = cum[i - 1] if i else 0
+    frac = (target - before) / counts[i] if counts[i] else 0.0
+    return float(edges[i] + frac * (edges[i + 1] - edges[i]))
+
+
+class _RowIndex:
+    # Key tuple -> row number in a set of arrays that grow by doubling
+
+    def __init__(self, n_keys):
+        self.rows = {}
+        self.keys = [[] for _ in range(n_keys)]
+        self._columns = {}  # key columns as arrays, until the next new key
+
+    def __len__(self):
+        return len(self.rows)
+
+    def positions(self, groups):
+        # Row of each key in `groups` (an iterable of tuples), new keys appended
+        pos = np.empty(len(groups), dtype=np.int64)
+        rows = self.rows
+        for i, key in enumerate(groups):
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = len(rows)
+                for column, value in zip(self.keys, key):
+                    column.append(value)
+                self._columns.clear()
+            pos[i] = row
+        return pos
+
+    def column(self, i, dtype=None):
+        array = self._columns.get(i)
+        if array is None:
+            array = self._columns[i] = np.asarray(self.keys[i], dtype=dtype)
+        return array
+
+
+def _groups(*columns):
+    # (group code per row, first row of each group) for the distinct
+    # combinations of the key columns
+    combined = np.zeros(len(columns[0]), dtype=np.int64)
+    for column in columns:
+        codes, uniques = pd.factorize(column)
+        combined = combined * len(uniques) + codes
+    _, first, codes = np.unique(combined, return_index=True, return_inverse=True)
+    return codes.reshape(-1), first
+
+
+def _grow(array, n):
+    # array with at least n rows (doubling), existing rows kept
+    if n <= len(array):
+        return array
+    out = np.zeros((max(n, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    out[:len(array)] = array
+    return out
+
+
+class SessionRollups:
+    # Counts and metric sums per (station_id, day, hour), histograms per
+    # (station_id, day) -- quantiles are only ever asked for station sets and
+    # day ranges. Both live in fixed arrays that grow by doubling; batches are
+    # counted per group with np.bincount and added in place.
+
+    def __init__(self):
+        self._hours = _RowIndex(3)   # (station_id, day ns, hour)
+        self._days = _RowIndex(2)    # (station_id, day ns)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.sums = {m: np.zeros(0, dtype=np.float64) for m in METRICS}
+        self.hist = {m: np.zeros((0, N_BINS), dtype=np.int32) for m in METRICS}
+
+    def __len__(self):
+        return len(self._hours)
+
+    def update(self, batch):
+        # Fold a batch of new sessions in; cost depends on the batch, never on
+        # the full session log
+        if batch is None or batch.empty:
+            return
+        for lo in range(0, len(batch), ROLLUP_CHUNK_ROWS):
+            self._update_chunk(batch.iloc[lo:lo + ROLLUP_CHUNK_ROWS])
+
+    def _update_chunk(self, batch):
+        start = pd.to_datetime(batch["start_time"])
+        station = batch["station_id"].to_numpy()
+        day = start.dt.floor("D").to_numpy().astype("datetime64[ns]").view(np.int64)
+        hour = start.dt.hour.to_numpy(dtype=np.int8)
+
+        codes, first = _groups(station, day, hour)
+        pos = self._hours.positions(list(zip(station[first].tolist(), day[first].tolist(), hour[first].tolist())))
+        day_codes, day_first = _groups(station, day)
+        day_pos = self._days.positions(list(zip(station[day_first].tolist(), day[day_first].tolist())))
+        k, kd = len(first), len(day_first)
+
+        self.count = _grow(self.count, len(self._hours))
+        self.count[pos] += np.bincount(codes, minlength=k)
+        for metric in METRICS:
+            values = pd.to_numeric(batch[metric], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+            self.sums[metric] = _grow(self.sums[metric], len(self._hours))
+            self.sums[metric][pos] += np.bincount(codes, weights=values, minlength=k)
+            edges = HISTOGRAM_EDGES[metric]
+            bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, N_BINS - 1)
+            counts = np.bincount(day_codes * N_BINS + bins, minlength=kd * N_BINS).reshape(kd, N_BINS)
+            self.hist[metric] = _grow(self.hist[metric], len(self._days))
+            self.hist[metric][day_pos] += counts.astype(np.int32)
+
+    def _key_mask(self, index, station_ids, start, end):
+        mask = np.ones(len(index), dtype=bool)
+        if station_ids is not None:
+            mask &= pd.Index(index.column(0, dtype=object)).isin(list(station_ids))
+        days = index.column(1, dtype=np.int64)
+        if start is not None:
+            mask &= days >= pd.Timestamp(start).value
+        if end is not None:
+            mask &= days <= pd.Timestamp(end).value
+        return mask
+
+    def _keyed(self, rows):
+        # (station_id, day, hour, count, metric sums) of the given hour rows
+        frame = pd.DataFrame({
+            "station_id": self._hours.column(0, dtype=object)[rows],
+            "day": self._hours.column(1, dtype=np.int64)[rows].view("datetime64[ns]"),
+            "hour": self._hours.column(2, dtype=np.int8)[rows],
+            "count": self.count[rows],
+        })
+        for metric in METRICS:
+            frame[metric] = self.sums[metric][rows]
+        return frame
+
+    def select(self, station_ids=None, start=None, end=None):
+        # Rollup rows (indexed by KEYS: count + metric sums) for a station set
+        # and inclusive day range
+        if not len(self):
+            return pd.DataFrame()
+        rows = np.flatnonzero(self._key_mask(self._hours, station_ids, start, end))
+        return self._keyed(rows).set_index(KEYS)
+
+    def totals(self, station_ids=None, start=None, end=None, quantiles=(0.5, 0.9)):
+        # {"count": n, "energy_kwh": sum, ..., "energy_kwh_p50": ..., ...}
+        rows = np.flatnonzero(self._key_mask(self._hours, station_ids, start, end))
+        day_rows = np.flatnonzero(self._key_mask(self._days, station_ids, start, end))
+        out = {"count": int(self.count[rows].sum())}
+        for metric in METRICS:
+            out[metric] = float(self.sums[metric][rows].sum())
+            hist = self.hist[metric][day_rows].sum(axis=0, dtype=np.int64) if len(day_rows) else np.zeros(1)
+            for q in quantiles:
+                out[f"{metric}_p{int(q * 100)}"] = _quantile_from_hist(hist, HISTOGRAM_EDGES[metric], q)
+        return out
+
+    def series(self, by="day", station_ids=None, start=None, end=None):
+        # count + metric sums grouped by "station", "day", "hour" (hour of day) or "timestamp" (hourly)
+        cols = ["count", *METRICS]
+        rows = np.flatnonzero(self._key_mask(self._hours, station_ids, start, end))
+        if not len(rows):
+            return pd.DataFrame(columns=cols)
+        flat = self._keyed(rows)
+        if by == "station":
+            return flat.groupby("station_id")[cols].sum()
+        if by == "day":
+            return flat.groupby("day")[cols].sum().sort_index()
+        if by == "hour":
+            return flat.groupby("hour")[cols].sum().sort_index()
+        if by == "timestamp":
+            flat["timestamp"] = flat["day"] + pd.to_timedelta(flat["hour"].astype(int), unit="h")
+            return flat.groupby("timestamp")[cols].sum().sort_index()
+        raise ValueError(f"Unknown rollup grouping {by!r}")
+
+    def time_series(self, max_points=500, station_ids=None, start=None, end=None):
+        # Hourly series, coarsened into wider buckets until it fits max_points
+        hourly = self.series("timestamp", station_ids, start, end)
+        return downsample(hourly, max_points)
+
+
+def downsample(frame, max_points=500):
+    # Sum a time-indexed frame into equal buckets (1h, 2h, 4h, ... 1D, 2D, ...)
+    if len(frame) <= max_points:
+        return frame
+    span = frame.index.max() - frame.index.min()
+    for hours in (1, 2, 3, 6, 12, 24, 48, 168, 336, 720):
+        if span / pd.Timedelta(hours=hours) <= max_points:
+            return frame.resample(f"{hours}h").sum()
+    return frame.resample(span / max_points).sum()
+
+
+class RollupFollower:
+    # Rollups fed by a log tail; each refresh() folds in only newly logged sessions
+
+    def __init__(self, csv_path="data/charging_log.csv", store_root=SESSION_STORE_DIR):
+        self.csv_path = csv_path
+        self.store_root = store_root
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.use_store = store_exists(self.store_root)
+        self.tail = StoreTail(self.store_root) if self.use_store else CsvLogTail(self.csv_path)
+        self.rollups = SessionRollups()
+        self._sessions_seen = 0
+
+    def refresh(self):
+        with self._lock:
+            # Migrating to the Parquet store (or the CSV being replaced) starts over
+            if store_exists(self.store_root) != self.use_store:
+                self._reset()
+            for batch in self.tail.batches():
+                self._restart_if_reset(len(batch))
+                self.rollups.update(batch)
+                self._sessions_seen += len(batch)
+            self._restart_if_reset(0)
+            return self.rollups
+
+    def _restart_if_reset(self, new_rows):
+        if self.tail.totals.sessions < self._sessions_seen + new_rows:
+            # the tail restarted from scratch (log truncated or replaced)
+            self.rollups = SessionRollups()
+            self._sessions_seen = 0
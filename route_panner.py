@@ -1,2 +1,319 @@
-# route_planner.py
-# Placeholder for future route planning logic (ETA, multi-stop charging, etc.)
\ No newline at end of file
+# route_panner.py
+# Offline EV route planning over the station table. Stations within a corridor
+# around the great-circle route are picked with the spatial index, then an A*
+# search over (corridor station, charge on arrival) finds the charge stops
+# that minimize total trip time, driving plus charging.
+#
+# Model (no road network, so everything is an estimate):
+#   - a leg's road distance is its great-circle distance times ROAD_FACTOR,
+#     driven at AVG_SPEED_MPH
+#   - each stop charges at its best level's power (LEVEL_POWER_KW), linearly,
+#     never above max_soc; stops that charge add STOP_OVERHEAD_MIN
+#   - the battery never goes below min_soc on arrival
+#
+# With linear charging some fastest plan only ever charges either just enough
+# for the next leg or up to max_soc (a fast charger is worth filling up at
+# when slow ones follow), so those are the two choices per stop. Charge on
+# arrival is exact, but per station only the fastest arrival in each of
+# SOC_BANDS bands of the usable window is kept, so the result is optimal up
+# to that banding.
+#
+#   python route_panner.py --origin 34.05,-118.24 --destination 37.77,-122.42
+
+import argparse
+import heapq
+
+import numpy as np
+
+from distance import haversine_miles
+from station_store import AVAILABILITY_LABELS
+
+# Same per-level charging power as batch_simulator (index = charger level)
+LEVEL_POWER_KW = np.array([0.0, 1.9, 7.2, 50.0])
+ROAD_FACTOR = 1.25        # road miles per great-circle mile
+AVG_SPEED_MPH = 60.0
+STOP_OVERHEAD_MIN = 5.0   # parking, plugging in, paying
+CORRIDOR_MILES = 10.0
+MIN_SOC = 0.1
+MAX_SOC = 0.8
+SOC_BANDS = 20
+OFFLINE = AVAILABILITY_LABELS.index("Offline")
+
+
+def _unit_vectors(lats, lons):
+    lat, lon = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def route_points(origin, destination, spacing_miles):
+    # Points along the great circle from origin to destination, at most
+    # spacing_miles apart, both ends included: (lats, lons)
+    a, b = _unit_vectors([origin[0], destination[0]], [origin[1], destination[1]])
+    miles = float(haversine_miles(origin[0], origin[1], destination[0], destination[1]))
+    steps = max(1, int(np.ceil(miles / spacing_miles)))
+    omega = np.arccos(np.clip(a @ b, -1.0, 1.0))
+    t = np.linspace(0.0, 1.0, steps + 1)
+    if omega < 1e-12:
+        xyz = np.outer(1 - t, a) + np.outer(t, b)
+    else:
+        xyz = (np.outer(np.sin((1 - t) * omega), a) + np.outer(np.sin(t * omega), b)) / np.sin(omega)
+    lats = np.degrees(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0)))
+    lons = np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0]))
+    return lats, lons
+
+
+def corridor_stations(index, origin, destination, corridor_miles=CORRIDOR_MILES, mask=None):
+    # Sorted positions of stations within about corridor_miles of the route.
+    # Circles of radius 1.12 * corridor_miles every corridor_miles along the
+    # route cover the whole band (sqrt(1 + 0.5**2) ~ 1.118).
+    lats, lons = route_points(origin, destination, corridor_miles)
+    found = [np.array([pos for pos, _ in index.within(lat, lon, corridor_miles * 1.12, mask=mask)], dtype=np.intp)
+             for lat, lon in zip(lats.tolist(), lons.tolist())]
+    return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+
+
+class RoutePlan:
+    # stops: one dict per charge stop, in order (position, station_id, title,
+    #   level, latitude, longitude, leg_miles to it, arrive_soc, depart_soc,
+    #   charge_min); the destination is not a stop
+    # path: [(lat, lon), ...] origin, stops, destination
+    # miles, drive_min, charge_min, total_min: whole trip (total_min also counts
+    #   stop_overhead_min per stop); arrive_soc at the destination
+    # candidates: how many corridor stations the search considered
+
+    def __init__(self, stops, path, miles, drive_min, charge_min, total_min, arrive_soc, candidates):
+        self.stops = stops
+        self.path = path
+        self.miles = miles
+        self.drive_min = drive_min
+        self.charge_min = charge_min
+        self.total_min = total_min
+        self.arrive_soc = arrive_soc
+        self.candidates = candidates
+
+
+def plan_route(stations, index, origin, destination, battery_kwh=75.0, soc=0.8, kwh_per_mile=0.3,
+               min_soc=MIN_SOC, max_soc=MAX_SOC, corridor_miles=CORRIDOR_MILES, mask=None,
+               road_factor=ROAD_FACTOR, speed_mph=AVG_SPEED_MPH, stop_overhead_min=STOP_OVERHEAD_MIN,
+               soc_bands=SOC_BANDS):
+    # Fastest trip as a RoutePlan, or None when the destination can't be
+    # reached through the corridor's stations. `stations` is a StationTable and
+    # `index` its StationIndex; `mask` optionally restricts usable stations
+    # (offline stations and stations without a known level are never used).
+    if soc < min_soc:
+        raise ValueError(f"soc {soc:.0%} is below min_soc {min_soc:.0%}")
+    usable = (stations.level_mask != 0) & (stations.availability != OFFLINE)
+    if mask is not None:
+        usable &= mask
+    candidates = corridor_stations(index, origin, destination, corridor_miles, mask=usable)
+
+    # Nodes 0..k-1 are stations, k is the destination
+    k = len(candidates)
+    n = k + 1
+    dest = k
+    lats = np.append(stations.latitude[candidates], destination[0])
+    lons = np.append(stations.longitude[candidates], destination[1])
+    top_level = stations.max_level()
+    power = np.append(LEVEL_POWER_KW[top_level[candidates]], 0.0)
+    max_power = power.max() if k else 0.0
+
+    full_kwh = (max_soc - min_soc) * battery_kwh   # usable energy after a full stop
+    start_kwh = (soc - min_soc) * battery_kwh      # usable energy at departure
+    kwh_per_gc_mile = road_factor * kwh_per_mile
+    min_per_gc_mile = road_factor / speed_mph * 60.0
+    band_kwh = max(full_kwh, 1e-9) / soc_bands
+    bands = soc_bands + 1
+
+    def legs_from(lat, lon):
+        return haversine_miles(lat, lon, lats, lons)
+
+    # Admissible, consistent heuristic: drive time to the destination plus the
+    # energy still missing charged at the fastest power in the corridor, over
+    # at least as many stops as it takes full charges (a stop adds at most
+    # full_kwh). Counting every stop's overhead, not just one, keeps the
+    # search from fanning out over plans that differ only in where they stop.
+    to_dest = legs_from(destination[0], destination[1])
+
+    def heuristic(nodes, energy):
+        h = to_dest[nodes] * min_per_gc_mile
+        if max_power > 0:
+            missing = np.maximum(to_dest[nodes] * kwh_per_gc_mile - energy, 0.0)
+            h = h + missing / max_power * 60.0 + np.ceil(missing / max(full_kwh, 1e-9)) * stop_overhead_min
+        return h
+
+    # State = node * bands + band of the usable energy on arrival there. Each
+    # state keeps its fastest arrival: time g, its f = g + h in the heap,
+    # exact energy, parent state and the kWh charged at the parent's node
+    # before the leg.
+    g = np.full(n * bands, np.inf)
+    f_best = np.full(n * bands, np.inf)
+    energy = np.zeros(n * bands)
+    parent = np.full(n * bands, -1, dtype=np.int64)
+    charged = np.zeros(n * bands)
+    closed = np.zeros(n * bands, dtype=bool)
+    # per node, (g, energy) of expanded states, for dominance checks
+    done_g = np.full((n, bands), np.inf)
+    done_energy = np.full((n, bands), -np.inf)
+    heap = []
+
+    def relax(targets, cost, arrive, source, add):
+        state = targets * bands + np.minimum((arrive / band_kwh).astype(np.int64), soc_bands)
+        better = (cost < g[state]) & ~closed[state]
+        if not better.any():
+            return
+        state, cost, arrive = state[better], cost[better], arrive[better]
+        g[state] = cost
+        energy[state] = arrive
+        parent[state] = source
+        charged[state] = add[better] if np.ndim(add) else add
+        f = cost + heuristic(targets[better], arrive)
+        f_best[state] = f
+        for fs, ts in zip(f.tolist(), state.tolist()):
+            heapq.heappush(heap, (fs, ts))
+
+    # Per expanded node, computed once rather than once per state: the nodes
+    # within one tank (positions, leg kWh, leg minutes), which of all nodes a
+    # full charge there covers, and which neighbours a fill-up could go on to
+    # (slower stations within a full charge)
+    reach_kwh = max(full_kwh, start_kwh)
+    neighbours = {}
+
+    def reachable(node):
+        hit = neighbours.get(node)
+        if hit is None:
+            leg_kwh = legs_from(lats[node], lons[node]) * kwh_per_gc_mile
+            near = np.flatnonzero(leg_kwh <= reach_kwh)
+            near = near[near != node]
+            covers = leg_kwh <= full_kwh
+            slower = np.flatnonzero(covers[near] & (power[near] < power[node]) & (near != dest))
+            hit = neighbours[node] = (near, leg_kwh[near], leg_kwh[near] / kwh_per_gc_mile * min_per_gc_mile,
+                                      covers, slower)
+        return hit
+
+    from_origin = legs_from(*origin)
+    arrive = start_kwh - from_origin * kwh_per_gc_mile
+    first = np.flatnonzero(arrive >= 0)
+    relax(first, from_origin[first] * min_per_gc_mile, arrive[first], -1, 0.0)
+
+    goal = None
+    while heap:
+        f, s = heapq.heappop(heap)
+        if closed[s] or f > f_best[s]:
+            continue  # already expanded, or a stale entry
+        node = s // bands
+        if node == dest:
+            goal = s
+            break
+        closed[s] = True
+        # an expanded state here that could charge up to this one's energy and
+        # still be no later does everything this one can
+        short = energy[s] - done_energy[node]
+        topped_up = done_g[node] + np.where(short > 0, short / power[node] * 60.0 + stop_overhead_min, 0.0)
+        if np.any(topped_up <= g[s]):
+            continue
+        done_g[node, s % bands], done_energy[node, s % bands] = g[s], energy[s]
+
+        have = energy[s]
+        near, leg_kwh, leg_min, _, slower = reachable(node)
+        drive = g[s] + leg_min
+
+        # or fill up to max_soc here and carry the rest on to a slower station
+        if have < full_kwh and len(slower):
+            fill = full_kwh - have
+            relax(near[slower], drive[slower] + fill / power[node] * 60.0 + stop_overhead_min,
+                  full_kwh - leg_kwh[slower], s, fill)
+
+        # charge just enough for the leg. After charging at a parent at least
+        # as fast as this node, anything within a full charge of the parent is
+        # better reached from it.
+        before = parent[s] // bands
+        if parent[s] >= 0 and charged[s] > 0 and power[before] >= power[node]:
+            keep = np.flatnonzero(~reachable(before)[3][near])
+            near, leg_kwh, drive = near[keep], leg_kwh[keep], drive[keep]
+        # Legs the charge on hand already covers are skipped too: the parent
+        # reaches those nodes directly, no later.
+        ok = ((leg_kwh > have) & (leg_kwh <= full_kwh)) | ((near == dest) & (leg_kwh <= have))
+        need = np.maximum(leg_kwh[ok] - have, 0.0)
+        relax(near[ok], drive[ok] + need / power[node] * 60.0 + np.where(need > 0, stop_overhead_min, 0.0),
+              np.maximum(have - leg_kwh[ok], 0.0), s, need)
+
+    if goal is None:
+        return None
+
+    # Walk back from the destination: each state's charge happened at its parent
+    chain = []
+    s = goal
+    while s >= 0:
+        chain.append(s)
+        s = int(parent[s])
+    chain.reverse()
+
+    stops = []
+    path = [tuple(origin)]
+    kwh = soc * battery_kwh
+    miles = since_stop = 0.0
+    charge_min = 0.0
+    for here, nxt in zip(chain, chain[1:] + [None]):
+        node = here // bands
+        prev = path[-1]
+        leg = float(haversine_miles(prev[0], prev[1], lats[node], lons[node])) * road_factor
+        miles += leg
+        since_stop += leg
+        kwh -= leg * kwh_per_mile
+        path.append((float(lats[node]), float(lons[node])))
+        if nxt is None:
+            break
+        add = float(charged[nxt])
+        if add <= 0:
+            continue  # passed by without charging
+        pos = int(candidates[node])
+        minutes = add / float(power[node]) * 60.0
+        charge_min += minutes
+        stops.append({
+            "position": pos,
+            "station_id": stations.id_at(pos),
+            "title": str(stations.title[pos]),
+            "level": int(top_level[pos]),
+            "latitude": path[-1][0],
+            "longitude": path[-1][1],
+            "leg_miles": round(since_stop, 1),
+            "arrive_soc": kwh / battery_kwh,
+            "depart_soc": (kwh + add) / battery_kwh,
+            "charge_min": minutes,
+        })
+        kwh += add
+        since_stop = 0.0
+
+    return RoutePlan(stops, path, miles, miles / speed_mph * 60.0, charge_min, float(g[goal]),
+                     kwh / battery_kwh, k)
+
+
+def parse_point(text):
+    lat, lon = (float(v) for v in text.split(","))
+    return lat, lon
+
+
+if __name__ == "__main__":
+    from data_cache import load_station_index, load_station_table
+
+    parser = argparse.ArgumentParser(description="Plan charge stops between two points")
+    parser.add_argument("--origin", type=parse_point, required=True, help="lat,lon")
+    parser.add_argument("--destination", type=parse_point, required=True, help="lat,lon")
+    parser.add_argument("--battery-kwh", type=float, default=75.0)
+    parser.add_argument("--soc", type=float, default=0.8, help="state of charge at departure, 0-1")
+    parser.add_argument("--kwh-per-mile", type=float, default=0.3)
+    parser.add_argument("--corridor-miles", type=float, default=CORRIDOR_MILES)
+    args = parser.parse_args()
+
+    plan = plan_route(load_station_table(), load_station_index(), args.origin, args.destination,
+                      battery_kwh=args.battery_kwh, soc=args.soc, kwh_per_mile=args.kwh_per_mile,
+                      corridor_miles=args.corridor_miles)
+    if plan is None:
+        print("No route: destination out of range of the stations along the way")
+    else:
+        for i, stop in enumerate(plan.stops, 1):
+            print(f"{i}. {stop['title']} (Level {stop['level']}) - {stop['leg_miles']} mi, "
+                  f"{stop['arrive_soc']:.0%} -> {stop['depart_soc']:.0%}, {stop['charge_min']:.0f} min")
+        print(f"{plan.miles:.0f} mi, {plan.total_min / 60:.1f} h total "
+              f"({plan.drive_min / 60:.1f} h driving, {plan.charge_min:.0f} min charging, "
+              f"{len(plan.stops)} stops), arriving at {plan.arrive_soc:.0%}")
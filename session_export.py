@@ -0,0 +1,212 @@
+# session_export.py
+# Chunked session exports (CSV, gzip-compressed CSV, Parquet). Rows are
+# encoded and written to a file one chunk at a time, so an export never holds
+# more than one chunk's text or Arrow buffers, however many rows it covers.
+# The dashboard only builds a file when a download is requested; this CLI
+# streams the whole log (CSV or Parquet store) the same way:
+#
+#   python session_export.py --format parquet --out data/exports/all_sessions.parquet
+#   python session_export.py --format csv.gz --start 2025-09-01 --end 2025-09-30
+
+import argparse
+import gzip
+import os
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from session_store import PARTITIONING, SESSION_STORE_DIR, _day, restore_station_ids, store_exists
+
+EXPORT_DIR = "data/exports"
+CHUNK_ROWS = 100_000
+MAX_EXPORT_FILES = 8
+# Exports larger than this stay on disk instead of going through the browser
+# download (which holds the whole file in memory); the CLI covers those
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+
+# format -> (file suffix, mime type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_frame_chunks(frame, chunk_rows=CHUNK_ROWS):
+    # Consecutive row slices of an in-memory frame
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def iter_log_chunks(csv_path="data/charging_log.csv", root=SESSION_STORE_DIR, start=None, end=None,
+                    chunk_rows=CHUNK_ROWS):
+    # The session log in chunks without loading it whole: record batches from
+    # the Parquet store (date filter pushed down), else pd.read_csv chunks.
+    # start/end are inclusive days.
+    if store_exists(root):
+        dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+        expr = None
+        for clause in (ds.field("date") >= _day(start) if start is not None else None,
+                       ds.field("date") <= _day(end) if end is not None else None):
+            if clause is not None:
+                expr = clause if expr is None else expr & clause
+        columns = [name for name in dataset.schema.names if name != "date"]
+        for batch in dataset.to_batches(columns=columns, filter=expr, batch_size=chunk_rows):
+            if batch.num_rows:
+                yield restore_station_ids(batch.to_pandas())
+        return
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, parse_dates=["start_time"]):
+        if start is not None:
+            chunk = chunk[chunk["start_time"] >= pd.Timestamp(start)]
+        if end is not None:
+            chunk = chunk[chunk["start_time"] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+        if len(chunk):
+            yield chunk
+
+
+def _arrow_table(chunk):
+    try:
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # object columns mixing types (e.g. int and str ids) go through as text
+        text = {name: "string" for name, dtype in chunk.dtypes.items() if dtype == object}
+        return pa.Table.from_pandas(chunk.astype(text), preserve_index=False)
+
+
+def _wider_type(a, b):
+    # A type both a and b cast to: all-null columns take the other side's
+    # type, mixed numbers become float64, anything else mixed becomes text
+    if a.equals(b) or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (a, b)):
+        return pa.float64()
+    return pa.string()
+
+
+def _reopen_wider(writer, path, schema):
+    # CSV chunks get their dtypes inferred one by one (an int column can turn
+    # float or text further down, an empty one can fill in), so a later chunk
+    # may not fit the types the file was started with. Rewrites the row
+    # groups written so far with the wider schema and returns the new writer.
+    writer.close()
+    old = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.replace(path, old)
+    wider = None
+    try:
+        wider = pq.ParquetWriter(path, schema)
+        for batch in pq.ParquetFile(old).iter_batches():
+            wider.write_table(pa.Table.from_batches([batch]).cast(schema))
+    except BaseException:
+        if wider is not None:
+            wider.close()
+        raise
+    finally:
+        os.unlink(old)
+    return wider
+
+
+def csv_bytes(chunk, header):
+    # One chunk as CSV bytes, always encoded by Arrow, so every chunk of a file
+    # is formatted alike (pandas picks float and time precision per chunk).
+    # Strings are quoted; times are written to the microsecond, which is as
+    # precise as session times get.
+    table = _arrow_table(chunk)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type) and field.type.unit == "ns":
+            table = table.set_column(i, field.name,
+                                     table.column(i).cast(pa.timestamp("us", field.type.tz), safe=False))
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(table, sink, pacsv.WriteOptions(include_header=False, quoting_style="needed"))
+    body = sink.getvalue().to_pybytes()
+    if header:
+        body = (",".join(map(str, chunk.columns)) + "\n").encode("utf-8") + body
+    return body
+
+
+def write_export(chunks, path, fmt="csv"):
+    # Writes DataFrame chunks to path in the given format; returns rows written
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}; expected one of {sorted(EXPORT_FORMATS)}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    rows = 0
+    try:
+        if fmt == "parquet":
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = _arrow_table(chunk)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp, table.schema)
+                    else:
+                        schema = pa.schema([pa.field(f.name, _wider_type(f.type, table.schema.field(f.name).type))
+                                            for f in writer.schema])
+                        if not schema.equals(writer.schema, check_metadata=False):
+                            writer = _reopen_wider(writer, tmp, schema)
+                    writer.write_table(table.cast(writer.schema))
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                pq.write_table(pa.table({}), tmp)
+        else:
+            with (gzip.open(tmp, "wb", compresslevel=6) if fmt == "csv.gz" else open(tmp, "wb")) as f:
+                for chunk in chunks:
+                    f.write(csv_bytes(chunk, header=rows == 0))
+                    rows += len(chunk)
+        # readers (e.g. a download in progress) never see a partial file
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return rows
+
+
+def prune_exports(directory=EXPORT_DIR, keep=MAX_EXPORT_FILES):
+    # Deletes all but the `keep` newest export files
+    if not os.path.isdir(directory):
+        return
+    files = [os.path.join(directory, name) for name in os.listdir(directory) if not name.endswith(".tmp")]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def export_frame(frame, fmt="csv", name="charging_sessions_filtered", directory=EXPORT_DIR,
+                 chunk_rows=CHUNK_ROWS):
+    # Exports a (filtered) session frame chunk by chunk into directory; returns
+    # (path, download file name, mime type)
+    suffix, mime = EXPORT_FORMATS[fmt]
+    path = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}{suffix}")
+    write_export(iter_frame_chunks(frame, chunk_rows), path, fmt)
+    prune_exports(directory)
+    return path, name + suffix, mime
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the session log in bounded memory")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--csv", default="data/charging_log.csv", help="log to read when there is no Parquet store")
+    parser.add_argument("--root", default=SESSION_STORE_DIR)
+    parser.add_argument("--start", help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", help="last day, YYYY-MM-DD")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--out", help="output file (default: data/exports/sessions<suffix>)")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(EXPORT_DIR, "sessions" + EXPORT_FORMATS[args.format][0])
+    chunks = iter_log_chunks(args.csv, args.root, args.start, args.end, args.chunk_rows)
+    rows = write_export(chunks, out, args.format)
+    print(f"Exported {rows} sessions -> {out}")
@@ -0,0 +1,109 @@
+# session_filter.py
+# Filter/sort engine for the dashboard's session table. A session frame is
+# prepared once (per loaded log): station ids become int32 codes into the
+# station table, start times int64 nanoseconds and the sortable text columns
+# category codes. Each rerun then builds one boolean mask from plain array
+# comparisons and takes the matching rows in display order, without copying
+# the frame or creating per-row Python objects.
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+NAT = np.iinfo(np.int64).min
+
+
+def _day_ns(day):
+    # int64 nanoseconds of a date's midnight
+    return int(np.datetime64(pd.Timestamp(day).normalize(), "ns").astype(np.int64))
+
+
+def _sort_codes(values):
+    # Codes that sort like the values themselves, missing values last
+    codes, uniques = pd.factorize(values, sort=True)
+    codes = codes.astype(np.int32)
+    codes[codes < 0] = len(uniques)
+    return codes
+
+
+class SessionFilter:
+    # frame: the session DataFrame (never modified); table_ids: the station
+    # table's id column, whose positions the station codes refer to
+
+    def __init__(self, frame, table_ids):
+        self.frame = frame
+        n = len(frame)
+        self._positions = pd.Index(np.asarray(table_ids).astype(str))
+
+        if n and "station_id" in frame.columns:
+            # Factorize first: only the distinct ids are stringified and looked up
+            codes, uniques = pd.factorize(frame["station_id"])
+            lookup = self._positions.get_indexer(np.asarray(uniques).astype(str))
+            # -1 (unknown station or missing id) points at a sentinel slot
+            lookup = np.where(lookup < 0, len(table_ids), lookup).astype(np.int32)
+            self.station_code = np.append(lookup, np.int32(len(table_ids)))[codes]
+        else:
+            self.station_code = np.full(n, len(table_ids), dtype=np.int32)
+
+        if n and "start_time" in frame.columns:
+            self.start_ns = pd.to_datetime(frame["start_time"]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+        else:
+            self.start_ns = np.full(n, NAT, dtype=np.int64)
+
+        self._sort_keys = {}
+        for column in ("availability", "charger_level"):
+            if n and column in frame.columns:
+                self._sort_keys[column] = _sort_codes(frame[column].to_numpy())
+
+    def __len__(self):
+        return len(self.frame)
+
+    def position_of(self, station_id):
+        # Station table position of an id, or -1
+        return int(self._positions.get_indexer([str(station_id)])[0])
+
+    def mask(self, station_mask=None, station=None, start=None, end=None):
+        # One boolean mask over the sessions:
+        #   station_mask: boolean array over station table positions
+        #   station: a single station id
+        #   start, end: inclusive dates on start_time
+        n_stations = len(self._positions)
+        mask = np.ones(len(self), dtype=bool)
+        if station_mask is not None:
+            # sentinel slot is False: sessions of unknown stations never match
+            mask &= np.append(np.asarray(station_mask, dtype=bool), False)[self.station_code]
+        if station is not None:
+            pos = self.position_of(station)
+            mask &= self.station_code == (pos if pos >= 0 else n_stations + 1)
+        if start is not None:
+            mask &= self.start_ns >= _day_ns(start)
+        if end is not None:
+            mask &= (self.start_ns < _day_ns(end + timedelta(days=1))) & (self.start_ns != NAT)
+        return mask
+
+    def station_values(self, values, rows=None):
+        # Per-session values of a station-table column (e.g. distance_miles),
+        # NaN for sessions of unknown stations
+        values = np.append(np.asarray(values, dtype=np.float64), np.nan)
+        codes = self.station_code if rows is None else self.station_code[rows]
+        return values[codes]
+
+    def sort_order(self, rows, sort_by="Distance", distances=None):
+        # Order of `rows` (session positions) for the table's sort option
+        if sort_by == "Distance" and distances is not None:
+            key = self.station_values(distances, rows)
+            key = np.where(np.isnan(key), np.inf, key)
+        elif sort_by == "Availability" and "availability" in self._sort_keys:
+            key = self._sort_keys["availability"][rows]
+        elif sort_by == "Charger Level" and "charger_level" in self._sort_keys:
+            key = self._sort_keys["charger_level"][rows]
+        else:
+            return np.arange(len(rows))
+        return np.argsort(key, kind="stable")
+
+    def select(self, station_mask=None, station=None, start=None, end=None, sort_by="Distance", distances=None):
+        # The matching sessions as a new frame, in display order
+        rows = np.flatnonzero(self.mask(station_mask, station, start, end))
+        rows = rows[self.sort_order(rows, sort_by, distances)]
+        return self.frame.iloc[rows]
@@ -0,0 +1,148 @@
+# session_store.py
+# Parquet session log partitioned by day (data/sessions/date=YYYY-MM-DD/*.parquet).
+# Reads push station-id and date-range filters down to the files, so only the
+# matching day partitions and row groups are decoded.
+#
+# One-shot migration of an existing CSV log:
+#   python session_store.py migrate --csv data/charging_log.csv
+
+import argparse
+import os
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+SESSION_STORE_DIR = "data/sessions"
+
+# Superset of the columns written by charging_simulator.py and the session simulators
+SESSION_SCHEMA = pa.schema([
+    ("session_id", pa.string()),
+    ("station_id", pa.string()),
+    ("start_time", pa.timestamp("us")),
+    ("end_time", pa.timestamp("us")),
+    ("duration_min", pa.int64()),
+    ("energy_kwh", pa.float64()),
+    ("cost_usd", pa.float64()),
+    ("charger_level", pa.int64()),
+    ("availability", pa.string()),
+    ("wait_min", pa.float64()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def store_exists(root=SESSION_STORE_DIR):
+    return os.path.isdir(root) and any(name.startswith("date=") for name in os.listdir(root))
+
+
+def _to_table(df):
+    # Coerce any session frame to SESSION_SCHEMA (missing columns become null)
+    df = df.copy()
+    for field in SESSION_SCHEMA:
+        if field.name not in df.columns:
+            df[field.name] = None
+    for col in ("start_time", "end_time"):
+        df[col] = pd.to_datetime(df[col], format="ISO8601")
+    df["station_id"] = df["station_id"].astype("string")
+    df["session_id"] = df["session_id"].astype("string")
+    df["duration_min"] = df["duration_min"].astype("Int64")
+    df["charger_level"] = df["charger_level"].astype("Int64")
+    # Sorting by station keeps Parquet min/max stats tight for station filters
+    df = df.sort_values(["station_id", "start_time"], kind="stable")
+    table = pa.Table.from_pandas(df[SESSION_SCHEMA.names], schema=SESSION_SCHEMA, preserve_index=False)
+    # date32 -> string gives YYYY-MM-DD and is much cheaper than strftime
+    day = pc.cast(pc.cast(table["start_time"], pa.date32()), pa.string())
+    return table.append_column("date", day)
+
+
+def write_sessions(df, root=SESSION_STORE_DIR):
+    # Append a batch of sessions; each call adds new files, never rewrites old ones
+    if df is None or len(df) == 0:
+        return 0
+    table = _to_table(df)
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return table.num_rows
+
+
+def _day(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime, pd.Timestamp)):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def session_date_bounds(root=SESSION_STORE_DIR):
+    # (first_day, last_day) from partition directory names alone, no file reads
+    days = sorted(
+        name.split("=", 1)[1] for name in os.listdir(root) if name.startswith("date=")
+    ) if os.path.isdir(root) else []
+    if not days:
+        return None, None
+    return date.fromisoformat(days[0]), date.fromisoformat(days[-1])
+
+
+def read_sessions(root=SESSION_STORE_DIR, station_ids=None, start=None, end=None, columns=None):
+    # start/end are inclusive days (date, datetime or "YYYY-MM-DD")
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    expr = None
+    for clause in (
+        ds.field("date") >= _day(start) if start is not None else None,
+        ds.field("date") <= _day(end) if end is not None else None,
+        ds.field("station_id").isin([str(s) for s in station_ids]) if station_ids is not None else None,
+    ):
+        if clause is not None:
+            expr = clause if expr is None else expr & clause
+
+    columns = list(columns) if columns else SESSION_SCHEMA.names
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    df = df.sort_values("start_time", kind="stable", ignore_index=True) if "start_time" in df.columns else df
+
+    return restore_station_ids(df)
+
+
+def restore_station_ids(df):
+    # Match what pd.read_csv infers from the CSV log: numeric station ids come back as ints
+    if "station_id" in df.columns:
+        numeric = pd.to_numeric(df["station_id"], errors="coerce")
+        if len(df) and numeric.notna().all():
+            df["station_id"] = numeric.astype("int64")
+        else:
+            df["station_id"] = df["station_id"].astype(object)
+    return df
+
+
+def migrate_csv(csv_path="data/charging_log.csv", root=SESSION_STORE_DIR, chunksize=500_000):
+    # Stream an existing CSV log into the store in bounded-memory chunks
+    total = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        total += write_sessions(chunk, root=root)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parquet session store tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="copy a CSV session log into the Parquet store")
+    migrate.add_argument("--csv", default="data/charging_log.csv")
+    migrate.add_argument("--root", default=SESSION_STORE_DIR)
+    migrate.add_argument("--chunksize", type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        if store_exists(args.root):
+            parser.error(f"{args.root} already holds sessions; migrate into an empty directory")
+        rows = migrate_csv(args.csv, root=args.root, chunksize=args.chunksize)
+        print(f"Migrated {rows} sessions from {args.csv} -> {args.root}")
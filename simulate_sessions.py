@@ -1,53 +1,36 @@
 # simulate_sessions.py
-# Generate mock EV charging session logs based on stations in ev_api_results.json
-
-import pandas as pd
-import random
-from datetime import datetime, timedelta
-import json 
-import os
-
-# Load station metadeta 
-with open("data/ev_api_results.json", "r") as f:
-    stations = json.load(f)
-
-station_ids = []
-for s in stations:
-    sid = (
-         s.get("station_id") 
-         or s.get("id")
-         or ("station_id") or s.get("id")
+# Generate mock EV charging session logs based on stations in ev_api_results.json.
+# Sessions come from the discrete-event occupancy simulator, which also writes
+# the live station status the dashboard shows.
+
+import argparse
+
+from batch_simulator import write_csv
+from charging_map import load_real_stations
+from event_simulator import STATION_STATUS_JSON, simulate_occupancy, write_status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30, help="how many days of traffic to simulate")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ports-per-level", type=int, default=2)
+    parser.add_argument("--arrivals-per-port", type=float, default=4.0, help="mean arrivals per port per day")
+    parser.add_argument("--max-queue", type=int, default=3, help="drivers leave when this many are already waiting")
+    parser.add_argument("--out", default="data/charging_log.csv")
+    parser.add_argument("--status-out", default=STATION_STATUS_JSON)
+    args = parser.parse_args()
+
+    # Load station metadata
+    stations = load_real_stations()
+
+    result = simulate_occupancy(
+        stations, days=args.days, seed=args.seed, ports_per_level=args.ports_per_level,
+        arrivals_per_port_per_day=args.arrivals_per_port, max_queue=args.max_queue,
     )
-    if sid:
-        station_ids.append(str(sid))
-
-# How many sessions to simulate
-def generate_sessions(n=50):
-    sessions = []
-    now = datetime.now()
-
-    for i in range(n):
-        station_id = random.choice(station_ids)
-        start_time = now - timedelta(days=random.randint(0, 30), hours=random.randint(0, 23))
-        duration_min = random.randint(20, 120)
-        energy_kwh = round(duration_min * random.uniform(0.2, 0.4), 2)
-        cost_usd = round(energy_kwh * random.uniform(0.15, 0.30), 2)
-
-        sessions.append({
-            "session_id": f"S{i+1:03}",
-            "station_id": station_id,
-            "start_time": start_time,
-            "duration_min": duration_min,
-            "energy_kwh": energy_kwh,
-            "cost_usd": cost_usd,
-            "charger_level": random.choice([1,2,3]),
-            "availability": random.choice(["Available", "In Use", "Offline"])
-        })
-    return sessions
-
-sessions = generate_sessions(50)    
 
-# Save to CSV
-df = pd.DataFrame(sessions)
-df.to_csv("data/charging_log.csv", index=False)
-print(f"Generated 50 sessions -> data/charging_log.csv")
\ No newline at end of file
+    # Save to CSV + station status snapshot
+    rows = write_csv([result.sessions], args.out)
+    write_status(result, args.status_out)
+    print(f"Generated {rows} sessions -> {args.out}")
+    print(f"Mean port utilization {result.utilization['utilization'].mean():.1%}, "
+          f"mean wait {result.sessions['wait_min'].mean():.1f} min; station status -> {args.status_out}")
@@ -0,0 +1,247 @@
+# spans.py
+# Timing/memory spans around the hot paths (station loads, distances, map
+# builds, st_folium, session filters, simulators). Instrumented code says
+#
+#   with span("map.render", stations=len(table)):
+#       ...
+#
+# and pays one global check while nothing is recording: span() then returns a
+# shared no-op context manager. Spans are recorded while
+#   - a Trace is active on the thread (the dashboard's debug panel starts one
+#     per rerun), and/or
+#   - SPANS_FILE is set (or export_to() called): every span from any thread is
+#     appended to that file as one JSON line, e.g. for the simulators:
+#       SPANS_FILE=data/spans.jsonl python batch_simulator.py --sessions 5000000
+# While tracemalloc is tracing, spans also record the change in traced memory.
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+_local = threading.local()
+_export_lock = threading.Lock()
+_export_file = None
+_active_traces = 0
+_recording = False
+# Traces with memory=True share one tracemalloc session: the first starts it
+# (unless something else already had), the last to stop ends it
+_tracemalloc_users = 0
+_tracemalloc_ours = False
+
+
+def _update_recording():
+    global _recording
+    _recording = _active_traces > 0 or _export_file is not None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "ts", "seconds", "depth", "mem_kb", "_mem0", "_trace")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.seconds = None
+        self.mem_kb = None
+
+    def set(self, **attrs):
+        # Attributes only known inside the span (row counts, cache hits, ...)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+        stack.append(self)
+        self._trace = getattr(_local, "trace", None)
+        self._mem0 = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self.ts = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        if self._mem0 is not None and tracemalloc.is_tracing():
+            self.mem_kb = (tracemalloc.get_traced_memory()[0] - self._mem0) / 1024
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if self._trace is not None and self._trace.active:
+            self._trace.spans.append(self)
+        if _export_file is not None:
+            _export(self)
+        return False
+
+    def record(self):
+        row = {"name": self.name, "ms": round(self.seconds * 1e3, 3), "depth": self.depth,
+               "ts": round(self.ts, 6), "thread": threading.current_thread().name}
+        if self.mem_kb is not None:
+            row["mem_kb"] = round(self.mem_kb, 1)
+        if self.attrs:
+            row["attrs"] = self.attrs
+        return row
+
+
+def span(name, **attrs):
+    # Context manager timing a stage; a shared no-op while nothing records
+    if not _recording:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def timed(name=None):
+    # Decorator form of span() for whole functions
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if not _recording:
+                return fn(*args, **kwargs)
+            with Span(label, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def _export(s):
+    line = json.dumps(s.record(), default=str) + "\n"
+    with _export_lock:
+        if _export_file is not None:
+            _export_file.write(line)
+            _export_file.flush()
+
+
+def export_to(path):
+    # Appends every finished span to path as JSON lines; None stops exporting
+    global _export_file
+    with _export_lock:
+        if _export_file is not None:
+            _export_file.close()
+        _export_file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _export_file = open(path, "a", encoding="utf-8")
+    _update_recording()
+
+
+class Trace:
+    # The spans of one unit of work on this thread (a dashboard rerun),
+    # optionally with a cProfile profile and a tracemalloc snapshot of it
+
+    def __init__(self, name, profile=False, memory=False):
+        self.name = name
+        self.spans = []
+        self.active = False
+        self.started = None
+        self.seconds = None
+        self.profile = cProfile.Profile() if profile else None
+        self.memory = memory
+        self.snapshot = None
+
+    def start(self):
+        global _active_traces, _tracemalloc_users, _tracemalloc_ours
+        if self.active:
+            return self
+        if self.memory:
+            with _export_lock:
+                if _tracemalloc_users == 0:
+                    _tracemalloc_ours = not tracemalloc.is_tracing()
+                    if _tracemalloc_ours:
+                        tracemalloc.start()
+                _tracemalloc_users += 1
+        self.active = True
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        _local.trace = self
+        with _export_lock:
+            _active_traces += 1
+        _update_recording()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def stop(self):
+        global _active_traces, _tracemalloc_users, _tracemalloc_ours
+        if not self.active:
+            return self
+        if self.profile is not None:
+            self.profile.disable()
+        self.seconds = time.perf_counter() - self._t0
+        self.active = False
+        if getattr(_local, "trace", None) is self:
+            _local.trace = None
+        with _export_lock:
+            _active_traces -= 1
+        _update_recording()
+        if self.memory:
+            if tracemalloc.is_tracing():
+                self.snapshot = tracemalloc.take_snapshot()
+            with _export_lock:
+                _tracemalloc_users -= 1
+                if _tracemalloc_users == 0 and _tracemalloc_ours:
+                    tracemalloc.stop()
+                    _tracemalloc_ours = False
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def records(self):
+        # Finished spans in start order
+        return [s.record() for s in sorted(self.spans, key=lambda s: s.start)]
+
+    def profile_text(self, limit=25, sort="cumulative"):
+        if self.profile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def memory_top(self, limit=10):
+        # (file:line, KiB) of the largest allocations still alive at stop()
+        if self.snapshot is None:
+            return []
+        stats = self.snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]).statistics("lineno")
+        return [(f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size / 1024) for s in stats[:limit]]
+
+    def export(self, path):
+        # Appends this trace's spans to path as JSON lines
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for row in self.records():
+                f.write(json.dumps({"trace": self.name, "trace_started": self.started, **row}, default=str) + "\n")
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+if os.environ.get("SPANS_FILE"):
+    export_to(os.environ["SPANS_FILE"])
@@ -0,0 +1,174 @@
+# spatial_index.py
+# KD-tree over station coordinates for nearest / k-nearest / radius lookups.
+# Points live on the unit sphere (x, y, z) so straight-line (chord) distance
+# orders stations exactly like great-circle distance, with no date-line or
+# pole special cases.
+
+import heapq
+import numpy as np
+
+from distance import EARTH_RADIUS_MILES, StationCoords, geodesic_miles
+
+
+def _to_xyz(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def _miles_to_chord(miles):
+    angle = min(miles / EARTH_RADIUS_MILES, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+class StationIndex:
+    # Positions returned by queries index into the station list the tree was
+    # built from. Stations with missing coordinates are never returned.
+
+    def __init__(self, lats, lons, leaf_size=16):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.leaf_size = leaf_size
+
+        valid = np.flatnonzero(~(np.isnan(self.lats) | np.isnan(self.lons)))
+        self._xyz = _to_xyz(self.lats[valid], self.lons[valid])
+        self._perm = valid.copy()
+
+        # Flat node arrays; a node covers _perm[start:end]
+        self._start, self._end = [], []
+        self._left, self._right = [], []
+        self._lo, self._hi = [], []
+        if len(valid):
+            self._build(0, len(valid))
+        # Plain tuples: three-element numpy math is slower than Python floats
+        self._lo = [tuple(lo.tolist()) for lo in self._lo]
+        self._hi = [tuple(hi.tolist()) for hi in self._hi]
+
+    @classmethod
+    def from_stations(cls, stations, leaf_size=16):
+        coords = StationCoords.from_stations(stations)
+        return cls(coords.lats, coords.lons, leaf_size=leaf_size)
+
+    def __len__(self):
+        return len(self._perm)
+
+    def _build(self, start, end):
+        node = len(self._start)
+        pts = self._xyz[start:end]
+        self._start.append(start)
+        self._end.append(end)
+        self._lo.append(pts.min(axis=0))
+        self._hi.append(pts.max(axis=0))
+        self._left.append(-1)
+        self._right.append(-1)
+        if end - start <= self.leaf_size:
+            return node
+
+        # Split on the widest dimension at the median
+        dim = int(np.argmax(self._hi[node] - self._lo[node]))
+        mid = (end - start) // 2
+        order = np.argpartition(pts[:, dim], mid)
+        self._xyz[start:end] = pts[order]
+        self._perm[start:end] = self._perm[start:end][order]
+
+        self._left[node] = self._build(start, start + mid)
+        self._right[node] = self._build(start + mid, end)
+        return node
+
+    def _box_dist2(self, node, q):
+        # Squared distance from q to the node's bounding box
+        total = 0.0
+        for qi, lo, hi in zip(q, self._lo[node], self._hi[node]):
+            if qi < lo:
+                total += (lo - qi) ** 2
+            elif qi > hi:
+                total += (qi - hi) ** 2
+        return total
+
+    def _leaf_dist2(self, node, q):
+        start, end = self._start[node], self._end[node]
+        diff = self._xyz[start:end] - np.asarray(q)
+        return np.einsum("ij,ij->i", diff, diff), self._perm[start:end]
+
+    def _miles(self, lat, lon, positions):
+        # Exact ellipsoidal distance for the (few) stations a query returns
+        if not len(positions):
+            return np.empty(0)
+        return geodesic_miles(lat, lon, self.lats[positions], self.lons[positions])
+
+    def k_nearest(self, lat, lon, k=1, mask=None):
+        # [(position, miles), ...] nearest first. `mask` is an optional boolean
+        # array over station positions; stations where it is False are skipped.
+        # Candidates are picked on the sphere, which can disagree with the
+        # ellipsoid by up to ~0.035 mi (~185 ft) here, so stations whose exact
+        # distances are that close may rank either way; returned miles are exact.
+        if k <= 0 or not len(self._perm):
+            return []
+        q = tuple(_to_xyz([lat], [lon])[0].tolist())
+        best = []  # max-heap of (-dist2, position)
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if len(best) == k and self._box_dist2(node, q) > -best[0][0]:
+                continue
+            left = self._left[node]
+            if left == -1:
+                d2, positions = self._leaf_dist2(node, q)
+                for dist2, pos in zip(d2.tolist(), positions.tolist()):
+                    if mask is not None and not mask[pos]:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist2, pos))
+                    elif dist2 < -best[0][0]:
+                        heapq.heapreplace(best, (-dist2, pos))
+                continue
+            right = self._right[node]
+            # Visit the closer child first so the heap tightens quickly
+            if self._box_dist2(left, q) <= self._box_dist2(right, q):
+                stack.extend((right, left))
+            else:
+                stack.extend((left, right))
+
+        positions = np.array([pos for _, pos in best], dtype=np.intp)
+        miles = self._miles(lat, lon, positions)
+        order = np.argsort(miles, kind="stable")
+        return list(zip(positions[order].tolist(), miles[order].tolist()))
+
+    def nearest(self, lat, lon, mask=None):
+        # (position, miles) of the closest station, or None if there is none
+        hits = self.k_nearest(lat, lon, k=1, mask=mask)
+        return hits[0] if hits else None
+
+    def within(self, lat, lon, radius_miles, mask=None):
+        # [(position, miles), ...] for stations within radius_miles, nearest first
+        if not len(self._perm):
+            return []
+        q = tuple(_to_xyz([lat], [lon])[0].tolist())
+        # Small pad so the sphere/ellipsoid difference can't drop edge stations;
+        # the exact distance check below trims them again.
+        limit2 = _miles_to_chord(radius_miles * 1.005) ** 2
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_dist2(node, q) > limit2:
+                continue
+            left = self._left[node]
+            if left == -1:
+                d2, positions = self._leaf_dist2(node, q)
+                keep = positions[d2 <= limit2]
+                if mask is not None:
+                    keep = keep[mask[keep]]
+                found.append(keep)
+                continue
+            stack.extend((self._right[node], left))
+
+        if not found:
+            return []
+        positions = np.concatenate(found)
+        miles = self._miles(lat, lon, positions)
+        inside = miles <= radius_miles
+        positions, miles = positions[inside], miles[inside]
+        order = np.argsort(miles, kind="stable")
+        return list(zip(positions[order].tolist(), miles[order].tolist()))
@@ -0,0 +1,331 @@
+# station_fetcher.py
+# Bulk OpenChargeMap fetcher. A region is cut into bounding-box tiles that are
+# fetched concurrently over one pooled HTTP session; each tile is paged by
+# station id. Every page is appended to a journal, so an interrupted run picks
+# up where it stopped, and results merge into the station file by station id.
+#
+# get_ev_data.py is the command-line entry point.
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+OCM_BASE_URL = "https://api.openchargemap.io/v3"
+FETCH_JOURNAL = "data/ev_fetch_journal.jsonl"
+PAGE_SIZE = 1000
+TILE_DEG = 1.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# OpenChargeMap StatusTypeIDs for delisted sites
+REMOVED_STATUS_TYPES = (200, 210)
+
+# Live availability comes from the occupancy simulator (data/station_status.json)
+DEFAULT_AVAILABILITY = "Unknown"
+
+# (south, west, north, east)
+REGIONS = {
+    "SF": (37.58, -122.62, 37.98, -122.25),
+    "CA": (32.53, -124.48, 42.01, -114.13),
+    "OR": (41.99, -124.57, 46.29, -116.46),
+    "WA": (45.54, -124.85, 49.00, -116.92),
+    "NV": (35.00, -120.01, 42.00, -114.04),
+    "AZ": (31.33, -114.82, 37.00, -109.04),
+    "TX": (25.84, -106.65, 36.50, -93.51),
+    "FL": (24.40, -87.63, 31.00, -80.03),
+    "NY": (40.49, -79.77, 45.02, -71.85),
+}
+
+
+class RetryableStatus(Exception):
+    # Rate limiting or a server-side failure worth another try
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+# ----------------------------
+# Normalize OpenChargeMap POIs
+# ----------------------------
+def parse_charger_levels(connections):
+    levels = set()
+    for conn in connections or ():
+        level_id = conn.get("LevelID")
+        if level_id:
+            levels.add(level_id)
+    return sorted(levels)
+
+
+def format_address(info):
+    # "1455 Market St, San Francisco, CA 94103" from whatever parts are present
+    region = " ".join(p for p in (info.get("StateOrProvince"), info.get("Postcode")) if p)
+    parts = (info.get("AddressLine1"), info.get("Town"), region)
+    return ", ".join(str(p).strip() for p in parts if p and str(p).strip()) or None
+
+
+def normalize_poi(poi, operators=None):
+    # One station record shaped like data/ev_api_results.json, or None when the
+    # POI has no coordinates, no known charger level or has been removed
+    if poi.get("StatusTypeID") in REMOVED_STATUS_TYPES:
+        return None
+    try:
+        info = poi["AddressInfo"]
+        lat, lon = float(info["Latitude"]), float(info["Longitude"])
+        station_id = poi["ID"]
+    except (KeyError, TypeError, ValueError):
+        return None
+    charger_levels = parse_charger_levels(poi.get("Connections"))
+    if not charger_levels:
+        return None
+    operator = (poi.get("OperatorInfo") or {}).get("Title")
+    if operator is None and operators:
+        operator = operators.get(poi.get("OperatorID"))
+    return {
+        "id": station_id,
+        "title": info.get("Title"),
+        "latitude": lat,
+        "longitude": lon,
+        "charger_levels": charger_levels,
+        "availability": DEFAULT_AVAILABILITY,
+        "address": format_address(info),
+        "operator": operator,
+    }
+
+
+def merge_stations(existing, fetched):
+    # Idempotent merge by station id: fetched records replace existing ones in
+    # place, new ids are appended in id order
+    merged = {}
+    for s in existing:
+        merged[s.get("id", s.get("station_id"))] = s
+    known = list(merged)
+    new = sorted({s["id"] for s in fetched if s["id"] not in merged}, key=lambda k: (isinstance(k, str), k))
+    for s in fetched:
+        merged[s["id"]] = s
+    return [merged[key] for key in known + new]
+
+
+# ----------------------------
+# Tiles
+# ----------------------------
+def tile_bbox(bbox, tile_deg=TILE_DEG):
+    # Bounding box -> list of (south, west, north, east) tiles covering it
+    south, west, north, east = bbox
+    lat_edges = np.append(np.arange(south, north, tile_deg), north)
+    lon_edges = np.append(np.arange(west, east, tile_deg), east)
+    tiles = []
+    for s, n in zip(lat_edges[:-1], lat_edges[1:]):
+        for w, e in zip(lon_edges[:-1], lon_edges[1:]):
+            tiles.append(tuple(round(float(v), 6) for v in (s, w, n, e)))
+    return tiles
+
+
+def tile_key(tile):
+    return ",".join(f"{v:.6f}" for v in tile)
+
+
+# ----------------------------
+# HTTP
+# ----------------------------
+def make_session(api_key=None, pool_size=8):
+    # One keep-alive connection pool shared by every worker thread
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "ev-charging-monitor"
+    if api_key:
+        session.headers["X-API-Key"] = api_key
+    return session
+
+
+@retry(
+    retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout, RetryableStatus)),
+    wait=wait_exponential_jitter(initial=0.5, max=30),
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+def get_json(session, url, params=None, timeout=30):
+    response = session.get(url, params=params, timeout=timeout)
+    if response.status_code in RETRY_STATUSES:
+        raise RetryableStatus(response.status_code)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_operators(session, base_url=OCM_BASE_URL):
+    # {OperatorID: name}; compact POIs only carry the id. Best effort.
+    try:
+        reference = get_json(session, f"{base_url}/referencedata/")
+    except (requests.RequestException, RetryableStatus, ValueError):
+        return {}
+    return {op["ID"]: op.get("Title") for op in reference.get("Operators") or () if "ID" in op}
+
+
+def iter_tile_pages(session, tile, base_url=OCM_BASE_URL, after_id=0, page_size=PAGE_SIZE,
+                    modified_since=None):
+    # Yields (last_id, raw POIs, done) per page, paging by ascending station id.
+    # modified_since (ISO UTC) limits the pages to records changed since then.
+    south, west, north, east = tile
+    while True:
+        params = {
+            "output": "json",
+            "boundingbox": f"({south},{west}),({north},{east})",
+            "maxresults": page_size,
+            "greaterthanid": after_id,
+            "sortby": "id_asc",
+            "compact": True,
+            "verbose": False,
+        }
+        if modified_since:
+            params["modifiedsince"] = modified_since
+        page = get_json(session, f"{base_url}/poi/", params)
+        if page:
+            after_id = max(after_id, max(poi["ID"] for poi in page))
+        done = len(page) < page_size
+        yield after_id, page, done
+        if done:
+            return
+
+
+# ----------------------------
+# Journal (checkpoint / resume)
+# ----------------------------
+class FetchJournal:
+    # Append-only JSON lines: a header describing the run, then one line per
+    # fetched page. Replaying it restores per-tile progress, the stations
+    # fetched so far, the ids that came back unusable or removed, and the newest
+    # modification time seen; a torn last line from a crash is dropped.
+
+    def __init__(self, path, run):
+        self.path = path
+        self.run = run
+        self.progress = {}   # tile key -> (after_id, done)
+        self.stations = {}   # station id -> record
+        self.dropped = set()
+        self.modified = None
+        self._lock = threading.Lock()
+        self._replay()
+        self._file = open(path, "a")
+        if os.path.getsize(path) == 0:
+            self._append({"run": run})
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            return
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                if good == 0 and entry.get("run") != self.run:
+                    break  # journal of a different run: start over
+                if "tile" in entry:
+                    self._apply(entry)
+                good += len(line)
+        if good == 0:
+            self.progress, self.stations, self.dropped, self.modified = {}, {}, set(), None
+        with open(self.path, "ab") as f:
+            f.truncate(good)
+
+    def _append(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def _apply(self, entry):
+        self.progress[entry["tile"]] = (entry["after_id"], entry["done"])
+        for s in entry["stations"]:
+            self.stations[s["id"]] = s
+        self.dropped.update(entry.get("dropped", ()))
+        if entry.get("modified") and (self.modified is None or entry["modified"] > self.modified):
+            self.modified = entry["modified"]
+
+    def record(self, key, after_id, done, stations, dropped=(), modified=None):
+        entry = {"tile": key, "after_id": after_id, "done": done, "stations": stations,
+                 "dropped": list(dropped), "modified": modified}
+        with self._lock:
+            self._append(entry)
+            self._apply(entry)
+
+    def close(self, remove=False):
+        self._file.close()
+        if remove:
+            os.remove(self.path)
+
+
+# ----------------------------
+# Fetch
+# ----------------------------
+class FetchResult:
+    # stations: usable records sorted by id
+    # dropped: ids returned by the API but removed or unusable (no coords/levels)
+    # modified: newest DateLastStatusUpdate seen, the next delta sync's watermark
+
+    def __init__(self, stations, dropped, modified):
+        self.stations = stations
+        self.dropped = dropped
+        self.modified = modified
+
+
+def fetch_region(bbox, tile_deg=TILE_DEG, base_url=OCM_BASE_URL, api_key=None, workers=8,
+                 page_size=PAGE_SIZE, journal_path=FETCH_JOURNAL, fresh=False, progress=None,
+                 modified_since=None):
+    # Everything inside bbox (or only what changed since modified_since) as a
+    # FetchResult. Progress is journaled page by page; rerunning after a crash
+    # resumes from the journal.
+    if fresh and os.path.exists(journal_path):
+        os.remove(journal_path)
+    tiles = tile_bbox(bbox, tile_deg)
+    run = {"bbox": list(bbox), "tile_deg": tile_deg, "base_url": base_url, "modified_since": modified_since}
+    journal = FetchJournal(journal_path, run)
+    session = make_session(api_key, pool_size=workers)
+    operators = fetch_operators(session, base_url)
+
+    def fetch_tile(tile):
+        key = tile_key(tile)
+        after_id, done = journal.progress.get(key, (0, False))
+        if done:
+            return key
+        pages = iter_tile_pages(session, tile, base_url, after_id, page_size, modified_since)
+        for after_id, page, done in pages:
+            stations, dropped = [], []
+            for poi in page:
+                s = normalize_poi(poi, operators)
+                if s is None:
+                    if poi.get("ID") is not None:
+                        dropped.append(poi["ID"])
+                else:
+                    stations.append(s)
+            modified = max((poi.get("DateLastStatusUpdate") or "" for poi in page), default="") or None
+            journal.record(key, after_id, done, stations, dropped, modified)
+        return key
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch_tile, tile) for tile in tiles]
+            for finished, future in enumerate(as_completed(futures), 1):
+                future.result()
+                if progress:
+                    progress(finished, len(tiles), len(journal.stations))
+    except BaseException:
+        journal.close()
+        session.close()
+        raise
+    journal.close(remove=True)
+    session.close()
+    stations = sorted(journal.stations.values(), key=lambda s: s["id"])
+    return FetchResult(stations, journal.dropped - journal.stations.keys(), journal.modified)
+
+
+def fetch_stations(bbox, **kwargs):
+    # All usable stations inside bbox as normalized records (sorted by id)
+    return fetch_region(bbox, **kwargs).stations
@@ -0,0 +1,202 @@
+# station_search.py
+# Prebuilt search index over station titles, addresses and operators. Every
+# distinct word gets a posting list of the stations using it; query words are
+# resolved against the (much smaller) vocabulary, so a search touches only the
+# words it matches instead of scanning every station's text:
+#   - exact and prefix matches by binary search over the sorted vocabulary
+#   - substring ("infix") matches through a trigram index over the vocabulary
+#   - typo-tolerant matches: words sharing enough trigrams with the query word
+#     and within one edit (two for longer words)
+# Results are ranked by match quality and field (title > operator > address);
+# every query word has to match somewhere.
+
+import bisect
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from station_store import normalize_station
+
+FIELD_WEIGHTS = {"title": 1.0, "operator": 0.6, "address": 0.5}
+MATCH_QUALITY = {"exact": 1.0, "prefix": 0.8, "infix": 0.6, "fuzzy": 0.5}
+MAX_CACHED_QUERIES = 128
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def words_of(text):
+    return _WORD.findall(str(text or "").lower())
+
+
+def _trigrams(word):
+    # Trigrams of "$word$"; the inner ones (no "$") are shared by every word
+    # containing `word`
+    padded = f"${word}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _max_edits(word):
+    return 1 if len(word) < 8 else 2
+
+
+def _within_edits(a, b, k):
+    # Levenshtein distance(a, b) <= k, computed in a band around the diagonal
+    if abs(len(a) - len(b)) > k:
+        return False
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [k + 1] * len(b)
+        lo, hi = max(1, i - k), min(len(b), i + k)
+        for j in range(lo, hi + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+        if min(cur[lo - 1:hi + 1]) > k:
+            return False
+        prev = cur
+    return prev[len(b)] <= k
+
+
+class SearchResult:
+    # positions: matching table positions, best first; scores: their scores
+    # mask: boolean array over the table; station_ids: frozenset of ids, e.g.
+    # for filtering session frames with isin() (built on first use)
+
+    def __init__(self, positions, scores, mask, ids):
+        self.positions = positions
+        self.scores = scores
+        self.mask = mask
+        self._ids = ids
+        self._station_ids = None
+
+    @property
+    def station_ids(self):
+        if self._station_ids is None:
+            self._station_ids = frozenset(self._ids[self.positions].tolist())
+        return self._station_ids
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class StationSearchIndex:
+    # Positions index station records in the order given, which is the order
+    # StationTable.from_records keeps. station_ids: the table's id column, so
+    # result ids compare equal to it; defaults to the records' own ids.
+
+    def __init__(self, records, station_ids=None):
+        postings = {}   # word -> {position: best field weight}
+        ids = []
+        for pos, raw in enumerate(records):
+            s = normalize_station(dict(raw))
+            ids.append(s["station_id"])
+            for field, weight in FIELD_WEIGHTS.items():
+                for word in words_of(s.get(field)):
+                    per_word = postings.setdefault(word, {})
+                    if per_word.get(pos, 0.0) < weight:
+                        per_word[pos] = weight
+        self.size = len(records)
+        self.station_ids = np.asarray(station_ids if station_ids is not None else ids)
+
+        # Sorted vocabulary, so a word's id range doubles as a prefix lookup
+        self.vocab = sorted(postings)
+        offsets = [0]
+        positions, weights = [], []
+        for word in self.vocab:
+            items = sorted(postings[word].items())
+            positions.extend(p for p, _ in items)
+            weights.extend(w for _, w in items)
+            offsets.append(len(positions))
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._positions = np.array(positions, dtype=np.int64)
+        self._weights = np.array(weights, dtype=np.float32)
+
+        trigrams = {}
+        for vid, word in enumerate(self.vocab):
+            for t in set(_trigrams(word)):
+                trigrams.setdefault(t, []).append(vid)
+        self._trigrams = {t: np.array(v, dtype=np.int64) for t, v in trigrams.items()}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sharing(self, grams, at_least):
+        # Vocabulary ids having at least `at_least` of the trigrams; the work
+        # is proportional to those trigrams' posting lists, not the vocabulary
+        lists = [self._trigrams[t] for t in grams if t in self._trigrams]
+        if not lists or at_least > len(lists):
+            return []
+        vids, counts = np.unique(np.concatenate(lists), return_counts=True)
+        return vids[counts >= max(at_least, 1)].tolist()
+
+    def _word_matches(self, word):
+        # {vocab id: quality} for one query word
+        found = {}
+        lo = bisect.bisect_left(self.vocab, word)
+        hi = bisect.bisect_left(self.vocab, word + "\uffff", lo)
+        for vid in range(lo, hi):
+            found[vid] = "exact" if self.vocab[vid] == word else "prefix"
+        if len(word) < 3:
+            return found
+
+        grams = _trigrams(word)
+        inner = [t for t in grams if "$" not in t]
+        if inner:
+            for vid in self._sharing(inner, len(inner)):
+                if vid not in found and word in self.vocab[vid]:
+                    found[vid] = "infix"
+
+        if len(word) >= 4:
+            k = _max_edits(word)
+            # each edit changes at most three trigrams
+            for vid in self._sharing(grams, len(grams) - 3 * k):
+                if vid not in found and _within_edits(word, self.vocab[vid], k):
+                    found[vid] = "fuzzy"
+        return found
+
+    def _word_scores(self, word):
+        # (positions, best score) of the stations matching one query word;
+        # positions sorted, work proportional to the matches
+        matches = self._word_matches(word)
+        if not matches:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        vids = list(matches)
+        pos = np.concatenate([self._positions[self._offsets[v]:self._offsets[v + 1]] for v in vids])
+        score = np.concatenate([self._weights[self._offsets[v]:self._offsets[v + 1]] * MATCH_QUALITY[matches[v]]
+                                for v in vids])
+        order = np.lexsort((-score, pos))   # by position, best score first
+        pos, score = pos[order], score[order]
+        first = np.ones(len(pos), dtype=bool)
+        first[1:] = pos[1:] != pos[:-1]
+        return pos[first], score[first]
+
+    def search(self, query):
+        # SearchResult for a free-text query; an empty query matches everything
+        query = (query or "").strip().lower()
+        with self._lock:
+            hit = self._cache.get(query)
+            if hit is not None:
+                self._cache.move_to_end(query)
+                return hit
+
+        words = list(dict.fromkeys(words_of(query)))
+        if words:
+            positions, total = self._word_scores(words[0])
+            for word in words[1:]:
+                if not len(positions):
+                    break
+                pos, score = self._word_scores(word)
+                positions, i, j = np.intersect1d(positions, pos, assume_unique=True, return_indices=True)
+                total = total[i] + score[j]
+        else:
+            positions, total = np.arange(self.size), np.zeros(self.size, dtype=np.float32)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        order = np.argsort(-total, kind="stable")
+        positions, total = positions[order], total[order]
+        result = SearchResult(positions, total, mask, self.station_ids)
+
+        with self._lock:
+            self._cache[query] = result
+            while len(self._cache) > MAX_CACHED_QUERIES:
+                self._cache.popitem(last=False)
+        return result
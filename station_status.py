@@ -0,0 +1,321 @@
+# station_status.py
+# Live station availability. A StatusPoller runs an asyncio loop on a daemon
+# thread, so the Streamlit script thread never waits on it. Every interval it
+# asks a status source for the catalogue's stations in batches, with at most
+# `concurrency` requests in flight, and writes the answers into a StatusTable.
+# The table is shared in memory. Entries expire after a TTL, so a station
+# whose polls keep failing falls back to the last snapshot value instead of
+# showing a stale live one.
+#
+# Sources:
+#   HttpStatusSource:      GET {base_url}/status/?ids=... (mock_ocm_server.py serves it)
+#   SimulatedStatusSource: in-process random walk, seeded from the occupancy
+#                          simulator's snapshot when there is one
+#
+# The dashboard starts one poller per process when STATION_STATUS_SOURCE is set
+# (see data_cache.live_status_poller):
+#   STATION_STATUS_SOURCE=sim streamlit run app.py
+#   STATION_STATUS_SOURCE=http://127.0.0.1:8765/v3 streamlit run app.py
+#
+#   python station_status.py --source sim --polls 3
+#   python station_status.py --mock 20000 --concurrency 16 --polls 3
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from spans import span
+from station_store import AVAILABILITY_LABELS
+
+STATUS_POLL_SECONDS = 10.0
+STATUS_BATCH_SIZE = 500
+STATUS_CONCURRENCY = 8
+# Labels a live source reports, and how often a status change lands on each
+LIVE_LABELS = ("Available", "In use", "Offline")
+LIVE_LABEL_P = (0.6, 0.35, 0.05)
+
+
+def step_availability(rng, codes, change_p=0.2):
+    # Next status codes (indexes into LIVE_LABELS) for one poll: each station
+    # changes with probability change_p
+    codes = np.asarray(codes, dtype=np.int8)
+    change = rng.random(len(codes)) < change_p
+    out = codes.copy()
+    out[change] = rng.choice(len(LIVE_LABELS), size=int(change.sum()), p=LIVE_LABEL_P)
+    return out
+
+
+# ----------------------------
+# Shared status table
+# ----------------------------
+class StatusTable:
+    # {station_id (str): label}, each entry valid for a TTL. version changes
+    # whenever the set of fresh labels does, so readers can cache on it.
+
+    def __init__(self):
+        self._entries = {}   # station id -> (label, expires at, monotonic)
+        self._lock = threading.Lock()
+        self._changed = False
+        self.version = 0
+        self.updated = None  # wall-clock time of the last update
+
+    def update(self, labels, ttl):
+        expires = time.monotonic() + ttl
+        with self._lock:
+            for sid, label in labels.items():
+                old = self._entries.get(sid)
+                if old is None or old[0] != label:
+                    self._changed = True
+                self._entries[sid] = (label, expires)
+            self.updated = time.time()
+
+    def expire(self):
+        # Drops entries past their TTL; returns how many went
+        now = time.monotonic()
+        with self._lock:
+            stale = [sid for sid, (_, expires) in self._entries.items() if expires <= now]
+            for sid in stale:
+                del self._entries[sid]
+            self._changed |= bool(stale)
+            return len(stale)
+
+    def snapshot(self):
+        # (version, {station_id: label}) of the fresh entries
+        self.expire()
+        with self._lock:
+            if self._changed:
+                self.version += 1
+                self._changed = False
+            return self.version, {sid: label for sid, (label, _) in self._entries.items()}
+
+    def get(self, station_id):
+        with self._lock:
+            hit = self._entries.get(str(station_id))
+        if hit is None or hit[1] <= time.monotonic():
+            return None
+        return hit[0]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ----------------------------
+# Sources: async fetch(station_ids) -> {station_id: label}
+# ----------------------------
+class HttpStatusSource:
+    # Batched status requests against a status endpoint (mock_ocm_server.py).
+    # requests is blocking, so each request runs on the default executor; the
+    # poller's semaphore bounds how many run at once.
+
+    def __init__(self, base_url, api_key=None, pool_size=STATUS_CONCURRENCY, timeout=10):
+        from station_fetcher import make_session
+
+        self.url = f"{base_url.rstrip('/')}/status/"
+        self.timeout = timeout
+        self.session = make_session(api_key, pool_size=pool_size)
+
+    def _get(self, station_ids):
+        from station_fetcher import get_json
+
+        body = get_json(self.session, self.url, {"ids": ",".join(station_ids)}, timeout=self.timeout)
+        return {str(sid): state.get("availability") for sid, state in body.get("stations", {}).items()}
+
+    async def fetch(self, station_ids):
+        return await asyncio.to_thread(self._get, station_ids)
+
+    def close(self):
+        self.session.close()
+
+
+class SimulatedStatusSource:
+    # Statuses that drift with step_availability on every fetch. Stations start
+    # from `initial` ({station_id: label}, e.g. data_cache.load_station_status())
+    # when given, otherwise from a random draw. latency stands in for a request.
+
+    def __init__(self, initial=None, seed=0, change_p=0.2, latency=0.0):
+        self.rng = np.random.default_rng(seed)
+        self.change_p = change_p
+        self.latency = latency
+        self._initial = {str(k): v for k, v in (initial or {}).items()}
+        self._codes = {}
+
+    def _first(self, sid):
+        label = self._initial.get(sid)
+        if label in LIVE_LABELS:
+            return LIVE_LABELS.index(label)
+        return int(self.rng.choice(len(LIVE_LABELS), p=LIVE_LABEL_P))
+
+    async def fetch(self, station_ids):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        codes = [self._codes.get(sid) for sid in station_ids]
+        seen = np.array([c is not None for c in codes], dtype=bool)
+        current = np.array([c if c is not None else self._first(sid) for sid, c in zip(station_ids, codes)],
+                           dtype=np.int8)
+        # stations seen before move on; new ones report their starting status
+        current[seen] = step_availability(self.rng, current[seen], self.change_p)
+        self._codes.update(zip(station_ids, current.tolist()))
+        return {sid: LIVE_LABELS[c] for sid, c in zip(station_ids, current.tolist())}
+
+    def close(self):
+        pass
+
+
+def source_from_env(initial=None):
+    # STATION_STATUS_SOURCE: "sim", or the base URL of a status server; None when unset
+    spec = os.getenv("STATION_STATUS_SOURCE", "").strip()
+    if not spec:
+        return None
+    if spec.lower() == "sim":
+        return SimulatedStatusSource(initial)
+    return HttpStatusSource(spec, api_key=os.getenv("OPENCHARGEMAP_API_KEY"))
+
+
+# ----------------------------
+# Poller
+# ----------------------------
+class StatusPoller:
+    # Polls `source` for every station in the watched catalogue each interval.
+    # Batches are written to the table as they arrive; a failed batch is
+    # counted and retried on the next poll, its old entries aging out via ttl.
+
+    def __init__(self, source, station_ids=(), table=None, interval=STATUS_POLL_SECONDS, ttl=None,
+                 concurrency=STATUS_CONCURRENCY, batch_size=STATUS_BATCH_SIZE):
+        self.source = source
+        self.table = table if table is not None else StatusTable()
+        self.interval = interval
+        self.ttl = ttl if ttl is not None else 3 * interval
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_poll_seconds = None
+        self._ids = None
+        self._station_ids = None
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self.watch(station_ids)
+
+    def watch(self, station_ids):
+        # Stations to poll from the next cycle on (a StationTable.station_id column or any iterable)
+        if station_ids is not self._station_ids:
+            self._station_ids = station_ids
+            self._ids = [str(sid) for sid in np.asarray(station_ids).tolist()]
+
+    async def poll_once(self):
+        ids = self._ids
+        batches = [ids[i:i + self.batch_size] for i in range(0, len(ids), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(batch):
+            async with semaphore:
+                return await self.source.fetch(batch)
+
+        t0 = time.perf_counter()
+        with span("status.poll", stations=len(ids), batches=len(batches)) as poll_span:
+            errors = 0
+            for done in asyncio.as_completed([fetch(b) for b in batches]):
+                try:
+                    labels = await done
+                except Exception as e:
+                    errors += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    continue
+                self.table.update(labels, self.ttl)
+            poll_span.set(errors=errors)
+        self.polls += 1
+        self.errors += errors
+        self.last_poll_seconds = time.perf_counter() - t0
+        return len(batches) - errors
+
+    async def run(self, polls=None):
+        # Polls every interval (measured start to start) until stop() or `polls` cycles
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        while not self._stop.is_set() and (polls is None or self.polls < polls):
+            started = self._loop.time()
+            await self.poll_once()
+            if polls is not None and self.polls >= polls:
+                break
+            try:
+                await asyncio.wait_for(self._stop.wait(), max(0.0, self.interval - (self._loop.time() - started)))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        # Runs the poll loop on a daemon thread with its own event loop
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="status-poller",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.source.close()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+def status_counts(labels):
+    counts = {label: 0 for label in AVAILABILITY_LABELS}
+    for label in labels.values():
+        counts[label if label in counts else "Unknown"] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll live station status and print each cycle")
+    parser.add_argument("--source", default="sim", help='"sim" or the base URL of a status server')
+    parser.add_argument("--mock", type=int, metavar="N", help="serve N mock stations locally and poll those")
+    parser.add_argument("--stations", default="data/ev_api_results.json")
+    parser.add_argument("--interval", type=float, default=STATUS_POLL_SECONDS)
+    parser.add_argument("--concurrency", type=int, default=STATUS_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=STATUS_BATCH_SIZE)
+    parser.add_argument("--polls", type=int, default=3)
+    args = parser.parse_args()
+
+    server = None
+    if args.mock:
+        from mock_ocm_server import MockCatalogue, start_mock_server
+
+        catalogue = MockCatalogue(args.mock)
+        server, base_url = start_mock_server(catalogue)
+        ids = catalogue.ids.tolist()
+        source = HttpStatusSource(base_url, pool_size=args.concurrency)
+    else:
+        with open(args.stations) as f:
+            ids = [s.get("id", s.get("station_id")) for s in json.load(f)]
+        source = SimulatedStatusSource() if args.source == "sim" else HttpStatusSource(args.source)
+
+    poller = StatusPoller(source, ids, interval=args.interval, concurrency=args.concurrency,
+                          batch_size=args.batch_size)
+
+    async def main():
+        for i in range(args.polls):
+            if i:
+                await asyncio.sleep(args.interval)
+            await poller.poll_once()
+            version, labels = poller.table.snapshot()
+            counts = ", ".join(f"{k} {v}" for k, v in status_counts(labels).items())
+            print(f"poll {poller.polls}: {len(labels)} stations in {poller.last_poll_seconds:.3f}s "
+                  f"(errors {poller.errors}, version {version}) - {counts}")
+
+    try:
+        asyncio.run(main())
+    finally:
+        source.close()
+        if server is not None:
+            server.shutdown()
@@ -0,0 +1,210 @@
+# station_store.py
+# Columnar station table: one NumPy array per field, normalized once at load time.
+# Filtering, search and sorting become vectorized masks and argsorts.
+
+import numpy as np
+
+# Charger level -> bit in StationTable.level_mask
+LEVEL_BITS = {1: 1, 2: 2, 3: 4}
+
+# Availability codes double as the map's sort priority (Available first)
+AVAILABILITY_LABELS = ("Available", "In use", "Offline", "Unknown")
+UNKNOWN_AVAILABILITY = AVAILABILITY_LABELS.index("Unknown")
+_AVAILABILITY_CODES = {label.lower(): code for code, label in enumerate(AVAILABILITY_LABELS)}
+
+
+# ----------------------------
+# Normalize raw station records (JSON versions use different key names)
+# ----------------------------
+def normalize_station(s):
+    # canonical id/title/coords keys, rewritten in place
+    s["station_id"] = (
+        s.get("station_id")
+        or s.get("id")
+        or s.get("stationId")
+        or s.get("station_id_str")
+        or str(s.get("id", "") or "")
+    )
+    s["title"] = (
+        s.get("title")
+        or s.get("station_name")
+        or s.get("name")
+        or s.get("title_name")
+        or "Unknown Station"
+    )
+
+    # latitude/longitude: try common variants, coerce to float or None
+    lat = s.get("latitude") or s.get("lat") or s.get("y") or s.get("Latitude")
+    lon = s.get("longitude") or s.get("lng") or s.get("lon") or s.get("x") or s.get("Longitude")
+    try:
+        s["latitude"] = float(lat) if lat not in (None, "", "NaN") else None
+        s["longitude"] = float(lon) if lon not in (None, "", "NaN") else None
+    except Exception:
+        s["latitude"] = None
+        s["longitude"] = None
+    return s
+
+
+def availability_code(label):
+    return _AVAILABILITY_CODES.get(str(label or "").lower(), UNKNOWN_AVAILABILITY)
+
+
+def levels_to_mask(levels):
+    mask = 0
+    for lvl in levels or ():
+        mask |= LEVEL_BITS.get(lvl, 0)
+    return mask
+
+
+def mask_to_levels(mask):
+    return [lvl for lvl, bit in LEVEL_BITS.items() if mask & bit]
+
+
+def _id_column(ids):
+    # int64 when every id is an integer (OpenChargeMap), otherwise strings
+    if ids and all(isinstance(i, (int, np.integer)) and not isinstance(i, bool) for i in ids):
+        return np.array(ids, dtype=np.int64)
+    return np.array([str(i) for i in ids], dtype=object)
+
+
+class StationTable:
+    # Rows are stations; every attribute below is an array of the same length.
+    # distance_miles is NaN until with_distances() attaches a user location.
+
+    COLUMNS = ("station_id", "title", "latitude", "longitude", "level_mask", "availability", "distance_miles")
+
+    def __init__(self, station_id, title, latitude, longitude, level_mask, availability, distance_miles=None):
+        self.station_id = station_id
+        self.title = title
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.level_mask = np.asarray(level_mask, dtype=np.uint8)
+        self.availability = np.asarray(availability, dtype=np.int8)
+        if distance_miles is None:
+            distance_miles = np.full(len(self.latitude), np.nan)
+        self.distance_miles = np.asarray(distance_miles, dtype=np.float64)
+        self._title_lower = None
+
+    @classmethod
+    def from_records(cls, records):
+        n = len(records)
+        ids, titles = [], []
+        lats = np.full(n, np.nan)
+        lons = np.full(n, np.nan)
+        level_mask = np.zeros(n, dtype=np.uint8)
+        availability = np.full(n, UNKNOWN_AVAILABILITY, dtype=np.int8)
+        distance = np.full(n, np.nan)
+        for i, raw in enumerate(records):
+            s = normalize_station(dict(raw))
+            ids.append(s["station_id"])
+            titles.append(s["title"])
+            if s["latitude"] is not None and s["longitude"] is not None:
+                lats[i], lons[i] = s["latitude"], s["longitude"]
+            level_mask[i] = levels_to_mask(s.get("charger_levels"))
+            availability[i] = availability_code(s.get("availability"))
+            if s.get("distance_miles") is not None:
+                distance[i] = s["distance_miles"]
+        table = cls(_id_column(ids), np.array(titles, dtype=object), lats, lons, level_mask, availability, distance)
+        table._title_lower = np.array([t.lower() for t in titles], dtype=str)
+        return table
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def take(self, positions):
+        # Row subset (boolean mask or integer positions) as a new table
+        t = StationTable(*(getattr(self, c)[positions] for c in self.COLUMNS))
+        if self._title_lower is not None:
+            t._title_lower = self._title_lower[positions]
+        return t
+
+    def with_distances(self, miles):
+        # Same rows with a new distance column; the table itself is never mutated
+        t = StationTable(*(getattr(self, c) for c in self.COLUMNS[:-1]), distance_miles=miles)
+        t._title_lower = self._title_lower
+        return t
+
+    def with_status(self, status_by_id):
+        # Same rows with availability taken from a {station_id: label} mapping
+        # (e.g. the occupancy simulator's snapshot); unknown ids keep their value
+        codes = self.availability.copy()
+        for i, sid in enumerate(self.station_id.tolist()):
+            label = status_by_id.get(str(sid))
+            if label is not None:
+                codes[i] = availability_code(label)
+        return self.with_availability(codes)
+
+    def with_availability(self, codes):
+        # Same rows with a new availability code column (e.g. another table's
+        # of the same catalogue)
+        t = StationTable(*(getattr(self, c) for c in self.COLUMNS[:5]), codes, self.distance_miles)
+        t._title_lower = self._title_lower
+        return t
+
+    # ----------------------------
+    # Vectorized filters
+    # ----------------------------
+    def level_filter_mask(self, levels):
+        # Stations offering any of the given levels; no levels selected = no filter
+        if not levels:
+            return np.ones(len(self), dtype=bool)
+        return (self.level_mask & levels_to_mask(levels)) != 0
+
+    def title_search_mask(self, query):
+        # Case-insensitive substring match on titles
+        query = (query or "").strip().lower()
+        if not query:
+            return np.ones(len(self), dtype=bool)
+        if self._title_lower is None:
+            self._title_lower = np.array([t.lower() for t in self.title], dtype=str)
+        return np.char.find(self._title_lower, query) >= 0
+
+    def has_coords(self):
+        return ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+
+    # ----------------------------
+    # Sorting
+    # ----------------------------
+    def max_level(self):
+        # Highest charger level per station, 0 when unknown
+        out = np.zeros(len(self), dtype=np.int8)
+        for lvl, bit in LEVEL_BITS.items():
+            out[(self.level_mask & bit) != 0] = lvl
+        return out
+
+    def sort_order(self, sort_by="Distance", reverse=False):
+        # Row positions in display order (stable, like sorted())
+        if sort_by == "Distance":
+            key = np.where(np.isnan(self.distance_miles), np.inf, self.distance_miles)
+        elif sort_by == "Availability":
+            key = self.availability.astype(np.float64)
+        elif sort_by == "Charger Level":
+            # Level 3 > 2 > 1, stations without levels last
+            top = self.max_level()
+            key = np.where(top > 0, -top.astype(np.float64), np.inf)
+        else:
+            return np.arange(len(self))
+        return np.argsort(-key if reverse else key, kind="stable")
+
+    # ----------------------------
+    # Row access
+    # ----------------------------
+    def id_at(self, i):
+        # Plain Python id (not a NumPy scalar), safe for session_state
+        return self.station_id[i : i + 1].tolist()[0]
+
+    def levels(self, i):
+        return mask_to_levels(int(self.level_mask[i]))
+
+    def availability_label(self, i):
+        return AVAILABILITY_LABELS[int(self.availability[i])]
+
+    def all_levels(self):
+        present = np.bitwise_or.reduce(self.level_mask) if len(self) else 0
+        return mask_to_levels(int(present))
+
+    def distance_series(self):
+        # station_id -> distance_miles, for joining onto session frames
+        import pandas as pd
+        series = pd.Series(self.distance_miles, index=self.station_id)
+        return series[~series.index.duplicated(keep="last")]
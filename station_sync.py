@@ -0,0 +1,180 @@
+# station_sync.py
+# Incremental station sync. Only records modified since the last sync's
+# watermark are requested; each normalized station is hashed so only real
+# changes count, and every add/update/removal is appended to a change log that
+# downstream caches can replay instead of reloading the whole catalogue.
+#
+# get_ev_data.py --sync is the command-line entry point.
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from data_cache import write_json_atomic
+from distance import attach_distances
+from station_fetcher import FETCH_JOURNAL, OCM_BASE_URL, TILE_DEG, fetch_region, tile_key
+
+SYNC_STATE = "data/ev_sync_state.json"
+CHANGE_LOG = "data/ev_changes.jsonl"
+
+# Derived or simulated fields; changes to these are not catalogue changes
+VOLATILE_FIELDS = ("availability", "distance_miles")
+
+
+def station_key(s):
+    return s.get("id", s.get("station_id"))
+
+
+def station_hash(s):
+    # Stable content hash of a normalized station record
+    content = {k: v for k, v in s.items() if k not in VOLATILE_FIELDS}
+    blob = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def in_bbox(s, bbox):
+    south, west, north, east = bbox
+    lat, lon = s.get("latitude"), s.get("longitude")
+    return lat is not None and lon is not None and south <= lat <= north and west <= lon <= east
+
+
+# ----------------------------
+# Diffs
+# ----------------------------
+def diff_stations(existing, fetched, dropped=(), full_bbox=None):
+    # Changes that turn `existing` into the fetched state:
+    #   {"op": "add" | "update", "id": ..., "station": {...}}
+    #   {"op": "remove", "id": ...}
+    # dropped: ids the API reported as removed or unusable. full_bbox: set when
+    # `fetched` is a complete listing of that box, so existing stations inside it
+    # that were not returned are removals too.
+    hashes = {station_key(s): station_hash(s) for s in existing}
+    changes = []
+    seen = set()
+    for s in fetched:
+        sid = s["id"]
+        seen.add(sid)
+        old = hashes.get(sid)
+        if old is None:
+            changes.append({"op": "add", "id": sid, "station": s})
+        elif old != station_hash(s):
+            changes.append({"op": "update", "id": sid, "station": s})
+    gone = {sid for sid in dropped if sid in hashes and sid not in seen}
+    if full_bbox is not None:
+        gone.update(station_key(s) for s in existing
+                    if station_key(s) not in seen and in_bbox(s, full_bbox))
+    changes.extend({"op": "remove", "id": sid} for sid in sorted(gone, key=str))
+    return changes
+
+
+def apply_changes(stations, changes):
+    # New station list with changes applied. Idempotent: re-applying a change
+    # (e.g. replaying an overlapping stretch of the log) gives the same result.
+    by_id = {station_key(s): s for s in stations}
+    for change in changes:
+        if change["op"] == "remove":
+            by_id.pop(change["id"], None)
+        else:
+            by_id[change["id"]] = change["station"]
+    return list(by_id.values())
+
+
+# ----------------------------
+# Change log
+# ----------------------------
+def last_seq(path=CHANGE_LOG):
+    # Sequence number of the last complete line in the change log (0 if none)
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(0, end - 65536))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            return json.loads(line)["seq"]
+        except (ValueError, KeyError):
+            continue
+    return 0
+
+
+def append_changes(changes, synced_at, path=CHANGE_LOG):
+    # Appends changes with consecutive seq numbers; returns the last seq written
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    seq = last_seq(path)
+    with open(path, "a") as f:
+        for change in changes:
+            seq += 1
+            f.write(json.dumps({"seq": seq, "synced_at": synced_at, **change}, separators=(",", ":")) + "\n")
+    return seq
+
+
+def read_changes(after_seq=0, path=CHANGE_LOG):
+    # Changes with seq > after_seq, oldest first; a consumer remembers the last
+    # seq it applied and asks for what came after
+    if not os.path.exists(path):
+        return []
+    changes = []
+    with open(path) as f:
+        for line in f:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                break
+            if change["seq"] > after_seq:
+                changes.append(change)
+    return changes
+
+
+# ----------------------------
+# Sync
+# ----------------------------
+def load_sync_state(path=SYNC_STATE):
+    if not os.path.exists(path):
+        return {"regions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def sync_stations(stations_path, bbox, tile_deg=TILE_DEG, base_url=OCM_BASE_URL, api_key=None, workers=8,
+                  full=False, state_path=SYNC_STATE, log_path=CHANGE_LOG, journal_path=FETCH_JOURNAL,
+                  progress=None, origin=None):
+    # One sync of bbox into stations_path. The first sync of a region (or
+    # full=True) fetches everything and also detects removals by absence; later
+    # ones fetch only what changed since the region's watermark. Returns the
+    # list of changes written to the log. origin: refresh distance_miles from it.
+    #
+    # Write order is log -> stations -> state: a crash in between makes the
+    # next run fetch and log the same changes again, which apply_changes
+    # tolerates, rather than losing any.
+    state = load_sync_state(state_path)
+    region = state["regions"].get(tile_key(bbox), {})
+    watermark = None if full else region.get("watermark")
+
+    result = fetch_region(bbox, tile_deg=tile_deg, base_url=base_url, api_key=api_key, workers=workers,
+                          journal_path=journal_path, progress=progress, modified_since=watermark)
+
+    existing = []
+    if os.path.exists(stations_path):
+        with open(stations_path) as f:
+            existing = json.load(f)
+    changes = diff_stations(existing, result.stations, result.dropped,
+                            full_bbox=bbox if watermark is None else None)
+
+    synced_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    seq = append_changes(changes, synced_at, log_path)
+    if changes:
+        stations = apply_changes(existing, changes)
+        if origin is not None:
+            attach_distances(stations, origin)
+        write_json_atomic(stations_path, stations, indent=2)
+
+    state["regions"][tile_key(bbox)] = {
+        "watermark": max(filter(None, (watermark, result.modified)), default=None),
+        "synced_at": synced_at,
+        "seq": seq,
+    }
+    write_json_atomic(state_path, state, indent=2)
+    return changes
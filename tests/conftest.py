@@ -0,0 +1,8 @@
+# tests/conftest.py
+# The modules live at the repo root (no package), so tests import them from there
+#   python -m pytest -q
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
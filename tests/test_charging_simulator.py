@@ -0,0 +1,22 @@
+# tests/test_charging_simulator.py
+
+import pandas as pd
+
+from charging_simulator import ChargingSession, append_sessions_csv
+
+
+def test_append_follows_in_place_rewrite(tmp_path):
+    path = tmp_path / "log.csv"
+    append_sessions_csv([ChargingSession("100")], str(path))
+    append_sessions_csv([ChargingSession("101")], str(path))   # header now cached
+    # another simulator rewrites the log in place with other columns
+    with open(path, "r+") as f:
+        f.seek(0)
+        f.write("station_id,wait_min,session_id,start_time,duration_min,energy_kwh,cost_usd,"
+                "charger_level,availability\n")
+        f.truncate()
+    append_sessions_csv([ChargingSession("102")], str(path))
+    append_sessions_csv([ChargingSession("103")], str(path))
+    df = pd.read_csv(path)
+    assert df["station_id"].tolist() == [102, 103]
+    assert df["wait_min"].isna().all()
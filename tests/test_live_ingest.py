@@ -0,0 +1,93 @@
+# tests/test_live_ingest.py
+
+import pandas as pd
+import pytest
+
+from live_ingest import CsvLogTail
+from rollups import RollupFollower
+
+OLD_COLUMNS = "session_id,station_id,start_time,duration_min,energy_kwh,cost_usd,charger_level,availability\n"
+NEW_COLUMNS = ("session_id,station_id,start_time,duration_min,energy_kwh,cost_usd,charger_level,availability,"
+               "arrival_time,wait_min,port\n")
+
+
+def old_rows(n, start=0):
+    return "".join(f"S{i:03d},34{i % 7},2025-09-0{1 + i % 5} 10:00:00.000000,30,{i}.5,1.25,2,Available\n"
+                   for i in range(start, start + n))
+
+
+def new_rows(n):
+    return "".join(f"S{i:03d},34{i % 7},2025-09-0{1 + i % 5} 10:00:00.000000,30,2.0,0.5,2,Available,"
+                   f"2025-09-01 09:55:00.000000,5.0,1\n" for i in range(n))
+
+
+def rewrite_in_place(path, text):
+    # Same inode, new contents (what open(path, "w") does)
+    with open(path, "r+") as f:
+        f.seek(0)
+        f.write(text)
+        f.truncate()
+
+
+def test_appends_are_read_once(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text(OLD_COLUMNS + old_rows(5))
+    tail = CsvLogTail(str(path), block_bytes=64)
+    assert len(tail.poll()) == 5
+    with open(path, "a") as f:
+        f.write(old_rows(3, start=5) + "S999,1,2025")   # last line still being written
+    assert len(tail.poll()) == 3
+    assert tail.totals.sessions == 8
+
+
+def test_in_place_rewrite_with_new_columns_starts_over(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text(OLD_COLUMNS + old_rows(5))
+    tail = CsvLogTail(str(path))
+    tail.poll()
+    inode = path.stat().st_ino
+
+    rewrite_in_place(path, NEW_COLUMNS + new_rows(40))
+    assert path.stat().st_ino == inode and path.stat().st_size > 0
+    batch = tail.poll()
+    assert len(batch) == 40
+    assert "wait_min" in batch.columns
+    assert tail.totals.sessions == 40
+    assert tail.totals.sums["energy_kwh"] == pytest.approx(80.0)
+
+
+def test_in_place_rewrite_with_same_header_starts_over(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text(OLD_COLUMNS + old_rows(5))
+    tail = CsvLogTail(str(path))
+    tail.poll()
+
+    rewrite_in_place(path, OLD_COLUMNS + old_rows(20, start=100))
+    tail.poll()
+    assert tail.totals.sessions == 20
+
+
+def test_failed_parse_does_not_skip_rows(tmp_path, monkeypatch):
+    path = tmp_path / "log.csv"
+    path.write_text(OLD_COLUMNS + old_rows(5))
+    tail = CsvLogTail(str(path))
+
+    def broken(*args, **kwargs):
+        raise pd.errors.ParserError("boom")
+
+    with monkeypatch.context() as m:
+        m.setattr(pd, "read_csv", broken)
+        with pytest.raises(pd.errors.ParserError):
+            tail.poll()
+    assert tail.offset == 0
+    assert len(tail.poll()) == 5
+
+
+def test_rollups_follow_an_in_place_rewrite(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text(OLD_COLUMNS + old_rows(5))
+    follower = RollupFollower(str(path), str(tmp_path / "no_store"))
+    assert follower.refresh().totals()["count"] == 5
+
+    rewrite_in_place(path, NEW_COLUMNS + new_rows(40))
+    assert follower.refresh().totals()["count"] == 40
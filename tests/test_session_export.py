@@ -0,0 +1,33 @@
+# tests/test_session_export.py
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from session_export import write_export
+
+
+def test_parquet_widens_types_across_chunks(tmp_path):
+    chunks = [
+        pd.DataFrame({"session_id": ["S1", "S2"], "wait_min": [0, 3], "port": [None, None]}),
+        pd.DataFrame({"session_id": ["S3"], "wait_min": [24.6], "port": ["A"]}),
+        pd.DataFrame({"session_id": ["S4"], "wait_min": [7], "port": [None]}),
+    ]
+    path = tmp_path / "sessions.parquet"
+    assert write_export(iter(chunks), str(path), "parquet") == 4
+    df = pq.read_table(path).to_pandas()
+    assert df["session_id"].tolist() == ["S1", "S2", "S3", "S4"]
+    assert df["wait_min"].tolist() == [0.0, 3.0, 24.6, 7.0]
+    assert df["port"].tolist() == [None, None, "A", None]
+    assert [p.name for p in tmp_path.iterdir()] == ["sessions.parquet"]
+
+
+def test_parquet_export_of_a_csv_log_with_drifting_dtypes(tmp_path):
+    log = tmp_path / "log.csv"
+    log.write_text("session_id,station_id,wait_min,end_time\n"
+                   + "".join(f"S{i},{i},{i},\n" for i in range(5))
+                   + "".join(f"S{i},{i},{i}.5,2025-09-01 10:00:00\n" for i in range(5, 10)))
+    path = tmp_path / "sessions.parquet"
+    assert write_export(pd.read_csv(log, chunksize=5), str(path), "parquet") == 10
+    df = pq.read_table(path).to_pandas()
+    assert df["wait_min"].tolist() == [0, 1, 2, 3, 4, 5.5, 6.5, 7.5, 8.5, 9.5]
+    assert df["end_time"].notna().tolist() == [False] * 5 + [True] * 5